@@ -1,7 +1,18 @@
+import asyncio
+import logging
+import math
 import os
+import time
 import aiohttp
 from dotenv import load_dotenv
 
+from api_clients.http_session import HttpSessionManager
+from api_clients.models import Station
+from api_clients.station_index import StationIndex
+from api_clients.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
 # Načtení klíčů z .env (pouze pro testování klienta)
 load_dotenv()
 
@@ -15,11 +26,36 @@ class AirQualityClient:
     # Základní URL pro API
     BASE_URL = "https://api.waqi.info/feed/"
 
-    def __init__(self):
-        """Inicializace klienta s API tokenem."""
+    # AQI se mění pomalu - čerstvost a tolerance zastaralé hodnoty (s)
+    AQI_TTL = 10 * 60
+    AQI_STALE_TTL = 20 * 60
+
+    # Hromadný režim: všechny stanice v obdélníku jedním dotazem
+    MAP_BOUNDS_URL = "https://api.waqi.info/v2/map/bounds"
+    BOUNDS_PADDING = 0.25  # stupně kolem krajních měst
+    MAX_TILE_SPAN = 10.0  # větší oblast se dělí na dlaždice
+    MAX_STATION_DISTANCE_KM = 25
+    SNAPSHOT_MAX_AGE = 45 * 60  # s
+    # Po selhání všech dlaždic (výpadek, chybný token) se další pokus odkládá,
+    # odklad se s každým dalším selháním zdvojnásobí až do maxima
+    BULK_RETRY_BACKOFF = 5 * 60  # s
+    BULK_RETRY_MAX_BACKOFF = 60 * 60  # s
+
+    # Deadliny volání včetně opakování (s)
+    FEED_DEADLINE = 5
+    BOUNDS_DEADLINE = 15
+
+    def __init__(self, http: HttpSessionManager | None = None):
+        """Inicializace klienta s API tokenem a sdílenou HTTP vrstvou."""
+        self.http = http or HttpSessionManager()
+        self.aqi_cache = TTLCache(self.AQI_TTL, self.AQI_STALE_TTL)
+        self._snapshot: StationIndex | None = None
+        self._snapshot_time = 0.0
+        self._bulk_failures = 0
+        self._bulk_retry_at = 0.0
         self.api_token = os.getenv('AQI_API_TOKEN')
         if not self.api_token:
-            print("CHYBA: AQI_API_TOKEN není nastaven v .env. Klient bude nefunkční.")
+            logger.error("CHYBA: AQI_API_TOKEN není nastaven v .env. Klient bude nefunkční.")
 
     # ----------------------------------------------------
     # VEŘEJNÉ METODY (Interface - rozhraní pro zbytek bota)
@@ -29,49 +65,74 @@ class AirQualityClient:
         """
         Hlavní metoda: Získá aktuální AQI (Air Quality Index) pro dané město.
         Vrací AQI jako celé číslo nebo None při chybě.
+        Výsledek se drží v krátkodobé cache; souběžné dotazy na stejnou
+        stanici sdílí jeden požadavek.
         """
-        # Formátování URL pro volání
-        full_url = f"{self.BASE_URL}{city}/?token={self.api_token}"
+        key = " ".join(city.casefold().split())
+        return await self.aqi_cache.get_or_fetch(key, lambda: self._fetch_aqi(city))
 
-        # Použití aiohttp pro asynchronní HTTP volání
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Volání API (Skrytá složitost 1)
-                async with session.get(full_url) as response:
-
-                    # Kontrola HTTP kódu (Skrytá složitost 2)
-                    if response.status != 200:
-                        print(
-                            f"Chyba API volání pro AQI: HTTP Status {response.status}")
-                        return None
-
-                    # Parsování JSON (Skrytá složitost 3)
-                    data = await response.json()
-
-                    # Kontrola statusu v JSON (Skrytá složitost 4)
-                    if data.get('status') == 'ok':
-                        # Parsování AQI hodnoty (Skrytá složitost 5)
-                        aqi_value = data['data'].get('aqi')
-
-                        # Kontrola, zda je hodnota číselná
-                        if aqi_value is not None and isinstance(aqi_value, int):
-                            return aqi_value
-
-                        # V případě chyby v datech
-                        print(
-                            f"Chyba: AQI hodnota není číselná nebo chybí: {aqi_value}")
-                        return None
-
-                    print(
-                        f"Chyba: Status v JSON není 'ok': {data.get('data')}")
-                    return None
-
-            except aiohttp.ClientError as e:
-                print(f"Chyba připojení při volání AQI API: {e}")
-                return None
-            except Exception as e:
-                print(f"Neočekávaná chyba při zpracování AQI dat: {e}")
-                return None
+    async def get_aqi_many(self, locations: list[tuple[float, float, str]]) -> list[int | None]:
+        """
+        AQI pro více míst (lat, lon, název) ve stejném pořadí: nejdřív z hromadného
+        snímku bez volání API, zbylá města souběžně přes cache s jedním letem.
+        """
+        async def one(lat, lon, name):
+            aqi = self.get_snapshot_aqi(lat, lon)
+            return aqi if aqi is not None else await self.get_current_aqi(name)
+
+        return await asyncio.gather(*(one(lat, lon, name) for lat, lon, name in locations))
+
+    async def refresh_bulk(self, coords: list[tuple[float, float]]) -> int:
+        """
+        Stáhne všechny stanice v obdélníku pokrývajícím zadané souřadnice
+        (jedním nebo několika dlaždicovými dotazy na WAQI map/bounds)
+        a postaví z nich prostorový index. Vrací počet načtených stanic.
+        Při úplném selhání zůstává v platnosti předchozí snímek
+        a další pokus se odloží (viz bulk_refresh_due).
+        """
+        if not coords:
+            return 0
+
+        tiles = self._bounds_tiles(coords)
+        results = await asyncio.gather(*(self._fetch_bounds(tile) for tile in tiles))
+        if all(stations is None for stations in results):
+            self._bulk_failures += 1
+            backoff = min(self.BULK_RETRY_BACKOFF * 2 ** (self._bulk_failures - 1),
+                          self.BULK_RETRY_MAX_BACKOFF)
+            self._bulk_retry_at = time.monotonic() + backoff
+            logger.warning("Hromadný AQI snímek se nepodařilo stáhnout, další pokus za %d s.", backoff)
+            return 0
+
+        stations = [station for tile_stations in results if tile_stations
+                    for station in tile_stations]
+        self._snapshot = StationIndex(stations)
+        self._snapshot_time = time.monotonic()
+        self._bulk_failures = 0
+        return len(stations)
+
+    def bulk_refresh_due(self, interval: float) -> bool:
+        """Je snímek starší než interval a neběží odklad po selhání?"""
+        if time.monotonic() < self._bulk_retry_at:
+            return False
+        return self.snapshot_age() >= interval
+
+    def snapshot_age(self) -> float:
+        """Stáří posledního hromadného snímku v sekundách (nekonečno, pokud žádný není)."""
+        if self._snapshot is None:
+            return float("inf")
+        return time.monotonic() - self._snapshot_time
+
+    def get_snapshot_aqi(self, lat: float, lon: float) -> int | None:
+        """
+        AQI nejbližší stanice z posledního hromadného snímku (bez volání API).
+        Vrací None, pokud snímek chybí, je příliš starý nebo žádná stanice není blízko.
+        """
+        if self._snapshot is None:
+            return None
+        if time.monotonic() - self._snapshot_time > self.SNAPSHOT_MAX_AGE:
+            return None
+        station = self._snapshot.nearest(lat, lon, self.MAX_STATION_DISTANCE_KM)
+        return station.aqi if station else None
 
     def get_aqi_status(self, aqi: int) -> tuple[str, str]:
         """
@@ -89,3 +150,96 @@ class AirQualityClient:
             return "Velmi nevhodná", "#800080"
         else:
             return "Nebezpečná", "#800000"
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _bounds_tiles(self, coords: list[tuple[float, float]]) -> list[tuple[float, float, float, float]]:
+        """Rozdělí obdélník kolem všech souřadnic na dlaždice o hraně nejvýše MAX_TILE_SPAN."""
+        lat_min = min(lat for lat, _ in coords) - self.BOUNDS_PADDING
+        lat_max = max(lat for lat, _ in coords) + self.BOUNDS_PADDING
+        lon_min = min(lon for _, lon in coords) - self.BOUNDS_PADDING
+        lon_max = max(lon for _, lon in coords) + self.BOUNDS_PADDING
+
+        lat_steps = max(1, math.ceil((lat_max - lat_min) / self.MAX_TILE_SPAN))
+        lon_steps = max(1, math.ceil((lon_max - lon_min) / self.MAX_TILE_SPAN))
+        lat_size = (lat_max - lat_min) / lat_steps
+        lon_size = (lon_max - lon_min) / lon_steps
+
+        tiles = []
+        for i in range(lat_steps):
+            for j in range(lon_steps):
+                south = lat_min + i * lat_size
+                west = lon_min + j * lon_size
+                tile = (south, west, south + lat_size, west + lon_size)
+                # Prázdné dlaždice (bez měst) se nestahují
+                if any(tile[0] <= lat <= tile[2] and tile[1] <= lon <= tile[3]
+                       for lat, lon in coords):
+                    tiles.append(tile)
+        return tiles
+
+    async def _fetch_bounds(self, tile: tuple[float, float, float, float]) -> list[Station] | None:
+        """Jeden dotaz na WAQI map/bounds; vrací stanice s číselným AQI."""
+        latlng = ",".join(f"{value:.4f}" for value in tile)
+        url = f"{self.MAP_BOUNDS_URL}?latlng={latlng}&networks=all&token={self.api_token}"
+        try:
+            data = await self.http.get_json(url, self.BOUNDS_DEADLINE, "waqi_bounds")
+            if data.get('status') != 'ok':
+                logger.warning("Chyba: Status v JSON není 'ok': %s", data.get('data'))
+                return None
+
+            stations = []
+            for item in data.get('data', []):
+                # WAQI vrací AQI jako text, "-" znamená nedostupnou hodnotu
+                aqi = str(item.get('aqi', ''))
+                if not aqi.isdigit():
+                    continue
+                stations.append(Station(
+                    item['lat'], item['lon'], int(aqi), item.get('station', {}).get('name')))
+            return stations
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Chyba připojení při hromadném volání AQI API: %s", e)
+            return None
+        except Exception as e:
+            logger.exception("Neočekávaná chyba při zpracování hromadných AQI dat: %s", e)
+            return None
+
+    async def _fetch_aqi(self, city: str) -> int | None:
+        """Jeden požadavek na /feed/{city}/ endpoint WAQI."""
+        # Formátování URL pro volání
+        full_url = f"{self.BASE_URL}{city}/?token={self.api_token}"
+
+        try:
+            # Volání API přes sdílený pool spojení (Skrytá složitost 1)
+            # Kontrola HTTP kódu (Skrytá složitost 2) a parsování JSON (Skrytá složitost 3)
+            data = await self.http.get_json(full_url, self.FEED_DEADLINE, "waqi_feed")
+
+            # Kontrola statusu v JSON (Skrytá složitost 4)
+            if data.get('status') == 'ok':
+                # Parsování AQI hodnoty (Skrytá složitost 5)
+                aqi_value = data['data'].get('aqi')
+
+                # Kontrola, zda je hodnota číselná
+                if aqi_value is not None and isinstance(aqi_value, int):
+                    return aqi_value
+
+                # V případě chyby v datech
+                logger.warning(
+                    "Chyba: AQI hodnota není číselná nebo chybí: %s", aqi_value)
+                return None
+
+            logger.warning(
+                "Chyba: Status v JSON není 'ok': %s", data.get('data'))
+            return None
+
+        except aiohttp.ClientResponseError as e:
+            logger.warning(
+                "Chyba API volání pro AQI: HTTP Status %s", e.status)
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Chyba připojení při volání AQI API: %s", e)
+            return None
+        except Exception as e:
+            logger.exception("Neočekávaná chyba při zpracování AQI dat: %s", e)
+            return None
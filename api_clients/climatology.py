@@ -0,0 +1,160 @@
+import os
+import warnings
+from datetime import date
+
+import numpy as np
+
+from api_clients.models import ClimateStats
+
+
+class ClimatologyStore:
+    """
+    Klimatologie místa z dlouhé řady ERA5 (denní maxima teploty).
+    Řada jednoho místa je matice roky × 366 dní (float32, NaN = chybí),
+    uložená jako .npy soubor a čtená přes memory-map - do paměti se
+    načítají jen stránky, které se opravdu použijí.
+    Statistiky pro každý den roku (průměr, percentily, rekordy) se počítají
+    vektorově pro všech 366 dní najednou a drží se v paměti.
+    """
+
+    YEARS = 30
+    DAYS = 366
+    # Statistika dne se počítá z okna ± WINDOW_DAYS kolem data (víc vzorků, hladší průběh)
+    WINDOW_DAYS = 7
+    PERCENTILES = (10, 50, 90)
+    COORD_PRECISION = 2
+
+    def __init__(self, directory: str | None = None):
+        """Bez directory se matice drží jen v paměti (např. v testech)."""
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._matrices: dict[tuple[float, float], np.ndarray] = {}
+        self._profiles: dict[tuple[float, float], dict] = {}
+
+    @staticmethod
+    def day_index(day: date) -> int:
+        """Sloupec dne v roce; 29. únor má vlastní sloupec (počítá se s přestupným rokem)."""
+        return (date(2000, day.month, day.day) - date(2000, 1, 1)).days
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def has(self, lat: float, lon: float) -> bool:
+        return self._matrix(self._key(lat, lon)) is not None
+
+    def put_series(self, lat: float, lon: float, days: list[str], max_temps: list[float | None]):
+        """Uloží stažené denní řady jako matici roky × dny (nejnovějších YEARS let)."""
+        key = self._key(lat, lon)
+        dates = np.array(days, dtype="datetime64[D]")
+        temps = np.array(max_temps, dtype=np.float32)  # None -> NaN
+        keep = ~np.isnan(temps)
+        dates, temps = dates[keep], temps[keep]
+        if dates.size == 0:
+            return
+        # Rok a sloupec dne vektorově; v nepřestupných letech se dny od 1. 3. posunou
+        # o jeden sloupec, aby 29. únor měl vlastní sloupec
+        years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        day_of_year = (dates - dates.astype("datetime64[Y]")).astype(np.int64)
+        leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+        columns = day_of_year + ((~leap) & (day_of_year >= 59))
+        rows = self.YEARS - 1 - (years.max() - years)
+        keep = rows >= 0
+
+        matrix = np.full((self.YEARS, self.DAYS), np.nan, dtype=np.float32)
+        matrix[rows[keep], columns[keep]] = temps[keep]
+
+        if self.directory:
+            path = self._path(key)
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, matrix)
+            os.replace(tmp_path, path)  # atomicky - čtenáři nikdy neuvidí půlku souboru
+            matrix = np.load(path, mmap_mode="r")
+        self._matrices[key] = matrix
+        self._profiles.pop(key, None)
+
+    def day_stats(self, lat: float, lon: float, day: date) -> ClimateStats | None:
+        """
+        Klimatologie daného data: průměr, percentily (p10, p50, p90),
+        rekordní maximum a minimum a počet vzorků. None, pokud místo nemá data.
+        """
+        profile = self._profile(self._key(lat, lon))
+        if profile is None:
+            return None
+        i = self.day_index(day)
+        if profile["samples"][i] == 0:
+            return None
+        return ClimateStats(
+            samples=int(profile["samples"][i]),
+            **{name: round(float(values[i]), 1) for name, values in profile.items()
+               if name != "samples"})
+
+    def percentile_of(self, lat: float, lon: float, day: date, value: float) -> float | None:
+        """Kolik procent historických hodnot pro dané datum (okno kolem něj) je nižších než value."""
+        matrix = self._matrix(self._key(lat, lon))
+        if matrix is None:
+            return None
+        samples = np.asarray(matrix)[:, self._window_columns(self.day_index(day))].ravel()
+        samples = samples[~np.isnan(samples)]
+        if samples.size == 0:
+            return None
+        return float(np.count_nonzero(samples < value)) / samples.size * 100
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _key(self, lat: float, lon: float) -> tuple[float, float]:
+        return round(lat, self.COORD_PRECISION), round(lon, self.COORD_PRECISION)
+
+    def _path(self, key: tuple[float, float]) -> str:
+        return os.path.join(self.directory, f"era5_{key[0]:.2f}_{key[1]:.2f}.npy")
+
+    def _window_columns(self, day_index):
+        """Sloupce okna ± WINDOW_DAYS kolem dne (přes přelom roku)."""
+        return (day_index + np.arange(-self.WINDOW_DAYS, self.WINDOW_DAYS + 1)) % self.DAYS
+
+    def _matrix(self, key: tuple[float, float]) -> np.ndarray | None:
+        matrix = self._matrices.get(key)
+        if matrix is None and self.directory and os.path.exists(self._path(key)):
+            matrix = np.load(self._path(key), mmap_mode="r")
+            self._matrices[key] = matrix
+        return matrix
+
+    def _profile(self, key: tuple[float, float]) -> dict | None:
+        """Statistiky pro všech 366 dní jedním vektorovým výpočtem (výsledek se drží v paměti)."""
+        profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+        matrix = self._matrix(key)
+        if matrix is None:
+            return None
+
+        # Okno kolem každého dne: (366, 2W+1) sloupců -> vzorky (366, roky * okno)
+        columns = self._window_columns(np.arange(self.DAYS)[:, None])
+        windows = np.asarray(matrix)[:, columns].transpose(1, 0, 2).reshape(self.DAYS, -1)
+
+        samples = np.count_nonzero(~np.isnan(windows), axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # dny bez jediného vzorku (All-NaN slice)
+            profile = {
+                "mean": np.nanmean(windows, axis=1),
+                "record_high": np.nanmax(windows, axis=1),
+                "record_low": np.nanmin(windows, axis=1),
+            }
+        # Percentily z jednoho seřazení všech řádků (NaN skončí na konci řádku);
+        # np.nanpercentile by počítal každý z 366 řádků zvlášť
+        ordered = np.sort(windows, axis=1)
+        last = np.maximum(samples - 1, 0)
+        for pct in self.PERCENTILES:
+            position = last * pct / 100
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, last)
+            low_values = np.take_along_axis(ordered, lower[:, None], axis=1)[:, 0]
+            high_values = np.take_along_axis(ordered, upper[:, None], axis=1)[:, 0]
+            values = low_values + (high_values - low_values) * (position - lower)
+            profile[f"p{pct}"] = np.where(samples > 0, values, np.nan)
+        profile["samples"] = samples
+        self._profiles[key] = profile
+        return profile
@@ -0,0 +1,240 @@
+import argparse
+import difflib
+import unicodedata
+
+import numpy as np
+
+
+class Gazetteer:
+    """
+    Lokální rejstřík obcí sestavený z výpisu GeoNames (např. cities500.txt, CZ.txt).
+    Geokódování známých jmen proběhne bez sítě v řádu mikrosekund.
+    Data jsou v kompaktních polích NumPy: souřadnice a populace míst,
+    seřazené klíče jmen jako jeden UTF-8 blok s offsety (binární hledání),
+    ke každému klíči index místa a původní zápis jména, ke každému místu
+    položka s jeho vlastním (kanonickým) jménem.
+    Klíč je jméno bez diakritiky, malými písmeny ("Plzeň" i "plzen" -> "plzen").
+    Stejný klíč může mít víc míst - řadí se podle populace sestupně.
+    """
+
+    # Sloupce výpisu GeoNames (tabulátorem oddělené)
+    COL_NAME, COL_ASCII, COL_ALTERNATES = 1, 2, 3
+    COL_LAT, COL_LON, COL_FEATURE_CLASS, COL_COUNTRY, COL_POPULATION = 4, 5, 6, 8, 14
+    # Podobná jména (překlepy): minimální shoda a kolik nejlidnatějších kandidátů porovnat
+    FUZZY_CUTOFF = 0.7
+    FUZZY_CANDIDATES = 3000
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, population: np.ndarray,
+                 key_blob: bytes, key_offsets: np.ndarray, key_place: np.ndarray,
+                 key_own: np.ndarray, display_blob: bytes, display_offsets: np.ndarray,
+                 place_name: np.ndarray):
+        self.lat = lat
+        self.lon = lon
+        self.population = population
+        self._key_blob = key_blob
+        self._key_offsets = key_offsets
+        self._key_place = key_place
+        self._key_own = key_own  # vlastní jméno místa (ne alternativní)
+        self._display_blob = display_blob
+        self._display_offsets = display_offsets
+        self._place_name = place_name  # místo -> položka s jeho vlastním jménem
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Klíč jména: bez diakritiky, casefold, bez nadbytečných mezer."""
+        decomposed = unicodedata.normalize("NFKD", name)
+        stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+        return " ".join(stripped.casefold().split())
+
+    def __len__(self):
+        return len(self._key_place)
+
+    # ----------------------------------------------------
+    # SESTAVENÍ A ULOŽENÍ
+    # ----------------------------------------------------
+
+    @classmethod
+    def from_geonames(cls, path: str, min_population: int = 0,
+                      countries: set[str] | None = None, alternates: bool = True) -> "Gazetteer":
+        """
+        Sestaví rejstřík z výpisu GeoNames. Bere jen obydlená místa (feature class P),
+        volitelně jen vybrané státy a místa s populací alespoň min_population.
+        Alternativní jména (např. "Praha" k "Prague") se přidají, pokud jsou v latince.
+        """
+        lats, lons, populations = [], [], []
+        entries: dict[tuple[str, int], tuple[str, bool]] = {}
+        name_keys: list[str] = []  # klíč vlastního jména každého místa
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) <= cls.COL_POPULATION or cols[cls.COL_FEATURE_CLASS] != "P":
+                    continue
+                if countries and cols[cls.COL_COUNTRY] not in countries:
+                    continue
+                population = int(cols[cls.COL_POPULATION] or 0)
+                if population < min_population:
+                    continue
+
+                place = len(lats)
+                lats.append(float(cols[cls.COL_LAT]))
+                lons.append(float(cols[cls.COL_LON]))
+                populations.append(population)
+                spellings = [(cols[cls.COL_NAME], True), (cols[cls.COL_ASCII], True)]
+                if alternates and cols[cls.COL_ALTERNATES]:
+                    spellings += [(alt, False) for alt in cols[cls.COL_ALTERNATES].split(",")]
+                for spelling, own_name in spellings:
+                    key = cls.normalize(spelling)
+                    # Alternativní jména jen v latince; první zápis vyhrává
+                    # (vlastní jméno s diakritikou před ASCII tvarem)
+                    if key and (own_name or key.isascii()) and (key, place) not in entries:
+                        entries[(key, place)] = (spelling.strip(), own_name)
+                        if own_name and len(name_keys) == place:
+                            name_keys.append(key)
+
+        ordered = sorted(entries.items(), key=lambda item: (item[0][0], -populations[item[0][1]]))
+        key_blob, key_offsets = cls._pack([key for (key, _), _ in ordered])
+        display_blob, display_offsets = cls._pack([display for _, (display, _) in ordered])
+        position = {entry: i for i, (entry, _) in enumerate(ordered)}
+        place_name = np.array([position[(key, place)] for place, key in enumerate(name_keys)],
+                              dtype=np.int32)
+        return cls(np.array(lats, dtype=np.float32), np.array(lons, dtype=np.float32),
+                   np.array(populations, dtype=np.int64),
+                   key_blob, key_offsets, np.array([place for (_, place), _ in ordered], dtype=np.int32),
+                   np.array([own for _, (_, own) in ordered], dtype=bool),
+                   display_blob, display_offsets, place_name)
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        data = np.load(path)
+        return cls(data["lat"], data["lon"], data["population"],
+                   data["key_blob"].tobytes(), data["key_offsets"], data["key_place"],
+                   data["key_own"], data["display_blob"].tobytes(), data["display_offsets"],
+                   data["place_name"])
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, lat=self.lat, lon=self.lon, population=self.population,
+            key_blob=np.frombuffer(self._key_blob, dtype=np.uint8),
+            key_offsets=self._key_offsets, key_place=self._key_place, key_own=self._key_own,
+            display_blob=np.frombuffer(self._display_blob, dtype=np.uint8),
+            display_offsets=self._display_offsets, place_name=self._place_name)
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def lookup(self, name: str) -> tuple[float, float, str] | None:
+        """
+        Přesná shoda jména (bez ohledu na diakritiku a velikost písmen) -> (lat, lon, jméno).
+        Vrací vlastní jméno místa, i když se shodlo alternativní ("Prag" -> "Prague").
+        """
+        key = self.normalize(name).encode("utf-8")
+        i = self._lower_bound(key)
+        if i >= len(self) or self._key(i) != key:
+            return None
+        # Položky se stejným klíčem jsou seřazené podle populace - první je nejlidnatější
+        place = self._key_place[i]
+        return float(self.lat[place]), float(self.lon[place]), self._display(self._place_name[place])
+
+    def complete(self, prefix: str, limit: int = 5) -> list[str]:
+        """Jména začínající prefixem, nejlidnatější místa první (vlastní jméno před alternativním)."""
+        key = self.normalize(prefix).encode("utf-8")
+        if not key:
+            return []
+        return self._ranked(*self._prefix_range(key), limit)
+
+    def similar(self, name: str, limit: int = 5) -> list[str]:
+        """Podobná jména (překlepy) mezi nejlidnatějšími místy se stejným počátečním písmenem."""
+        key = self.normalize(name)
+        if not key:
+            return []
+        lo, hi = self._prefix_range(key[0].encode("utf-8"))
+        indices = np.arange(lo, hi)
+        if len(indices) > self.FUZZY_CANDIDATES:
+            pops = self.population[self._key_place[indices]]
+            indices = indices[np.argsort(-pops, kind="stable")[:self.FUZZY_CANDIDATES]]
+
+        matcher = difflib.SequenceMatcher(b=key)
+        scored = []
+        for i in indices.tolist():
+            matcher.set_seq1(self._key(i).decode("utf-8"))
+            if (matcher.real_quick_ratio() >= self.FUZZY_CUTOFF
+                    and matcher.quick_ratio() >= self.FUZZY_CUTOFF
+                    and matcher.ratio() >= self.FUZZY_CUTOFF):
+                scored.append((-matcher.ratio(), -int(self.population[self._key_place[i]]), i))
+        scored.sort()
+        return self._unique_names([i for _, _, i in scored], limit)
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    @staticmethod
+    def _pack(strings: list[str]) -> tuple[bytes, np.ndarray]:
+        """Seznam řetězců -> jeden UTF-8 blok a pole offsetů (n + 1 hodnot)."""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return b"".join(encoded), offsets
+
+    def _key(self, i: int) -> bytes:
+        return self._key_blob[self._key_offsets[i]:self._key_offsets[i + 1]]
+
+    def _display(self, i: int) -> str:
+        return self._display_blob[self._display_offsets[i]:self._display_offsets[i + 1]].decode("utf-8")
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Binární hledání první položky s klíčem >= key (pořadí bajtů UTF-8 = pořadí znaků)."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _prefix_range(self, prefix: bytes) -> tuple[int, int]:
+        # 0xFF se v UTF-8 nevyskytuje - horní mez všech klíčů s daným prefixem
+        return self._lower_bound(prefix), self._lower_bound(prefix + b"\xff")
+
+    def _ranked(self, lo: int, hi: int, limit: int) -> list[str]:
+        """Položky z rozsahu seřazené podle populace, každé místo jen jednou."""
+        indices = np.arange(lo, hi)
+        # lexsort řadí podle posledního klíče: populace sestupně, pak vlastní jména
+        order = indices[np.lexsort((~self._key_own[indices],
+                                    -self.population[self._key_place[indices]]))]
+        return self._unique_names(order.tolist(), limit)
+
+    def _unique_names(self, indices: list[int], limit: int) -> list[str]:
+        """Jména položek v daném pořadí, každé místo i jméno jen jednou (nejvýše limit)."""
+        names, places = [], set()
+        for i in indices:
+            place = int(self._key_place[i])
+            if place not in places:
+                places.add(place)
+                name = self._display(i)
+                if name in names:
+                    continue
+                names.append(name)
+                if len(names) >= limit:
+                    break
+        return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sestavení lokálního rejstříku obcí z výpisu GeoNames.")
+    parser.add_argument("dump", help="výpis GeoNames, např. cities500.txt nebo CZ.txt")
+    parser.add_argument("output", nargs="?", default="gazetteer.npz")
+    parser.add_argument("--countries", default="", help="kódy států oddělené čárkou, např. CZ,SK")
+    parser.add_argument("--min-population", type=int, default=0)
+    args = parser.parse_args()
+
+    countries = {c.strip().upper() for c in args.countries.split(",") if c.strip()} or None
+    gazetteer = Gazetteer.from_geonames(args.dump, args.min_population, countries)
+    gazetteer.save(args.output)
+    print(f"Rejstřík: {len(gazetteer.lat)} míst, {len(gazetteer)} jmen -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
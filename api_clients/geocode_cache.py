@@ -0,0 +1,127 @@
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+class GeocodeCache:
+    """
+    Dvouúrovňová cache výsledků geokódování.
+    1. úroveň: paměťová LRU cache s omezenou velikostí.
+    2. úroveň: SQLite soubor, který přežije restart bota.
+    Souřadnice města se nemění, kladné výsledky proto nemají expiraci.
+    Výsledek "nenalezeno" se ukládá jen na krátkou dobu (negativní cache),
+    aby překlepy neustále nezatěžovaly API.
+    """
+
+    MAX_MEMORY_ENTRIES = 1024
+    NEGATIVE_TTL = 15 * 60  # sekundy
+
+    # Značka pro "město nebylo nalezeno" (odlišná od None = "není v cache")
+    NOT_FOUND = object()
+
+    def __init__(self, db_path: str | None = None):
+        """Bez db_path funguje cache pouze v paměti (např. v testech)."""
+        self._memory: OrderedDict[str, tuple] = OrderedDict()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path)
+            # WAL + NORMAL: zápis (commit) nečeká na fsync a neblokuje event loop
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY,"
+                " lat REAL, lon REAL, name TEXT,"
+                " found INTEGER NOT NULL,"
+                " cached_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(city: str) -> str:
+        """Klíč cache: sjednocený Unicode tvar, malá písmena, bez nadbytečných mezer."""
+        city = unicodedata.normalize("NFC", city)
+        return " ".join(city.casefold().split())
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def get(self, city: str):
+        """
+        Vrátí (lat, lon, name), GeocodeCache.NOT_FOUND pro čerstvý negativní
+        záznam, nebo None, pokud město v cache není.
+        """
+        key = self.normalize(city)
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+        else:
+            self._memory.move_to_end(key)
+
+        result, cached_at = entry
+        if result is None:
+            if time.time() - cached_at > self.NEGATIVE_TTL:
+                self._forget(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.NOT_FOUND
+        self.hits += 1
+        return result
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._memory)}
+
+    def put(self, city: str, result: tuple | None):
+        """Uloží výsledek geokódování; None znamená "město nenalezeno"."""
+        key = self.normalize(city)
+        entry = (tuple(result) if result is not None else None, time.time())
+        self._remember(key, entry)
+        if self._db is not None:
+            lat, lon, name = entry[0] if entry[0] is not None else (None, None, None)
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, name, int(entry[0] is not None), entry[1]),
+            )
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.MAX_MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _forget(self, key: str):
+        self._memory.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM geocode WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _load(self, key: str):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT lat, lon, name, found, cached_at FROM geocode WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        lat, lon, name, found, cached_at = row
+        return ((lat, lon, name) if found else None, cached_at)
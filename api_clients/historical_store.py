@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+from datetime import date
+
+
+class HistoricalStore:
+    """
+    Lokální úložiště denních hodnot z ERA5 reanalýzy (Open-Meteo Archive).
+    Data za uplynulé dny se už nemění, proto se každá hodnota stahuje
+    z API jen jednou a pak se čte z disku.
+    Klíčem je (zaokrouhlená lat, zaokrouhlená lon, datum).
+    Ukládání celé řady smí běžet ve vlákně (asyncio.to_thread), přístup
+    k databázi proto hlídá zámek.
+    """
+
+    # 2 desetinná místa ~ 1 km, mřížka ERA5 je hrubší (~25 km)
+    COORD_PRECISION = 2
+
+    def __init__(self, db_path: str | None = None):
+        """Bez db_path se data drží jen v paměti (např. v testech)."""
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        # WAL + NORMAL: uložení řady (commit) nečeká na fsync a neblokuje event loop
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS era5_daily ("
+            " lat REAL NOT NULL, lon REAL NOT NULL, day TEXT NOT NULL,"
+            " max_temp REAL NOT NULL,"
+            " PRIMARY KEY (lat, lon, day))"
+        )
+        self._db.commit()
+
+    def _key(self, lat: float, lon: float) -> tuple[float, float]:
+        return round(lat, self.COORD_PRECISION), round(lon, self.COORD_PRECISION)
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def get_max_temp(self, lat: float, lon: float, day: date) -> float | None:
+        """Vrátí uloženou maximální teplotu pro daný den, nebo None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT max_temp FROM era5_daily WHERE lat = ? AND lon = ? AND day = ?",
+                (*self._key(lat, lon), day.isoformat()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_series(self, lat: float, lon: float, days: list[str], max_temps: list[float | None]):
+        """
+        Uloží celou řadu denních hodnot najednou.
+        Chybějící hodnoty (None - ERA5 ještě nemá data) se neukládají.
+        """
+        key = self._key(lat, lon)
+        rows = [(*key, day, temp)
+                for day, temp in zip(days, max_temps) if temp is not None]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO era5_daily VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from api_clients.metrics import metrics
+from api_clients.rate_limit import TokenBucket
+from api_clients.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class HttpSessionManager:
+    """
+    Sdílená HTTP vrstva pro všechny API klienty bota.
+    Drží jednu dlouhožijící aiohttp.ClientSession s poolem spojení
+    (keep-alive, limit spojení na host, DNS cache) a explicitními timeouty.
+    Vlastníkem je bot - session se zavírá při jeho vypnutí metodou close().
+    """
+
+    # Parametry poolu spojení
+    TOTAL_CONNECTION_LIMIT = 100
+    PER_HOST_CONNECTION_LIMIT = 20
+    KEEPALIVE_TIMEOUT = 30  # sekundy
+    DNS_CACHE_TTL = 300  # sekundy
+
+    # Timeouty (sekundy)
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 10
+    TOTAL_TIMEOUT = 20
+    # Výchozí deadline celého volání včetně opakování (sekundy)
+    DEFAULT_DEADLINE = 15
+
+    # Tempo požadavků na jednotlivé upstreamy: host -> (požadavků/s, burst)
+    RATE_LIMITS = {
+        "geocoding-api.open-meteo.com": (5, 10),
+        "api.open-meteo.com": (10, 20),
+        "archive-api.open-meteo.com": (5, 10),
+        "api.waqi.info": (10, 20),
+    }
+
+    def __init__(self, rate_limits: dict[str, tuple[float, float]] | None = None):
+        """
+        Session se vytváří líně až při prvním požadavku (potřebuje běžící event loop).
+        rate_limits přepisuje výchozí RATE_LIMITS; hosty bez limitu se neomezují.
+        """
+        self._session: aiohttp.ClientSession | None = None
+        limits = self.RATE_LIMITS if rate_limits is None else rate_limits
+        self.rate_limiters = {host: TokenBucket(rate, burst)
+                              for host, (rate, burst) in limits.items()}
+        self.retry_policy = RetryPolicy()
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Vrátí sdílenou session, případně ji (znovu) vytvoří."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.TOTAL_CONNECTION_LIMIT,
+                limit_per_host=self.PER_HOST_CONNECTION_LIMIT,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=self.DNS_CACHE_TTL,
+                use_dns_cache=True,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.TOTAL_TIMEOUT,
+                sock_connect=self.CONNECT_TIMEOUT,
+                sock_read=self.READ_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout)
+        return self._session
+
+    async def get_json(self, url: str, deadline: float | None = None,
+                       endpoint: str | None = None):
+        """
+        Provede GET požadavek přes sdílený pool a vrátí naparsovaný JSON.
+        `endpoint` je pevný název volání pro metriky (např. "waqi_feed"); cesta URL
+        se do labelů nedává, protože obsahuje parametry od uživatelů (název města).
+        - celé volání včetně opakování musí skončit do `deadline` sekund,
+        - přechodné chyby (timeout, spojení, 429/5xx) se opakují s jitterem,
+        - jistič hostu při výpadku odmítá požadavky hned (CircuitOpenError).
+        Při HTTP chybě vyhodí aiohttp.ClientResponseError, při vypršení deadline
+        asyncio.TimeoutError.
+        """
+        parts = urlsplit(url)
+        endpoint = endpoint or parts.hostname
+        breaker = self._breaker(parts.hostname)
+        expires = time.monotonic() + (deadline or self.DEFAULT_DEADLINE)
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                metrics.inc("http_errors_total", endpoint=endpoint, kind="circuit_open")
+                raise CircuitOpenError(f"Jistič pro {parts.hostname} je rozpojený.")
+
+            # Čekání na token je lokální tempo, ne chyba hostu - do jističe se nepočítá
+            try:
+                await self._acquire_token(parts.hostname, expires)
+            except asyncio.TimeoutError:
+                metrics.inc("http_errors_total", endpoint=endpoint, kind="rate_limited")
+                raise
+
+            try:
+                data = await asyncio.wait_for(
+                    self._request(url, endpoint),
+                    max(0.0, expires - time.monotonic()))
+            except Exception as e:
+                metrics.inc("http_errors_total", endpoint=endpoint, kind=self._error_kind(e))
+                retryable = self.retry_policy.is_retryable(e)
+                if retryable or not isinstance(e, aiohttp.ClientResponseError):
+                    self._record_failure(parts.hostname, breaker)
+                else:
+                    # 4xx - host odpovídá, chyba je v dotazu
+                    self._record_success(parts.hostname, breaker)
+
+                attempt += 1
+                delay = self.retry_policy.delay(attempt)
+                if (not retryable or attempt >= self.retry_policy.attempts
+                        or time.monotonic() + delay >= expires):
+                    raise
+                metrics.inc("http_retries_total", endpoint=endpoint)
+                await asyncio.sleep(delay)
+                continue
+
+            self._record_success(parts.hostname, breaker)
+            return data
+
+    def is_degraded(self, host: str) -> bool:
+        """Selhal poslední požadavek na host, nebo je jeho jistič rozpojený?"""
+        breaker = self.breakers.get(host)
+        return breaker is not None and (
+            breaker.state != CircuitBreaker.CLOSED or breaker.failures > 0)
+
+    async def close(self):
+        """Uzavře session a všechna spojení v poolu (volá se při vypnutí bota)."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    async def _acquire_token(self, host: str, expires: float):
+        """Počká na token z bucketu hostu, nejdéle do vypršení deadline (asyncio.TimeoutError)."""
+        limiter = self.rate_limiters.get(host)
+        if limiter is not None:
+            await asyncio.wait_for(limiter.acquire(), max(0.0, expires - time.monotonic()))
+
+    async def _request(self, url: str, endpoint: str):
+        """Jeden pokus: GET a měření latence."""
+        started = time.perf_counter()
+        try:
+            session = self.get_session()
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.json()
+        finally:
+            metrics.observe("http_request_duration_seconds",
+                            time.perf_counter() - started, endpoint=endpoint)
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker()
+        return breaker
+
+    def _record_success(self, host: str, breaker: CircuitBreaker):
+        if breaker.state != CircuitBreaker.CLOSED:
+            logger.info("Jistič pro %s je znovu sepnutý.", host)
+            metrics.set_gauge("circuit_open", 0, host=host)
+        breaker.record_success()
+
+    def _record_failure(self, host: str, breaker: CircuitBreaker):
+        if breaker.record_failure():
+            logger.warning("Jistič pro %s rozpojen po %d selháních.", host, breaker.failures)
+            metrics.inc("circuit_opened_total", host=host)
+            metrics.set_gauge("circuit_open", 1, host=host)
+
+    @staticmethod
+    def _error_kind(error: Exception) -> str:
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        if isinstance(error, aiohttp.ClientResponseError):
+            return f"http_{error.status}"
+        if isinstance(error, aiohttp.ClientError):
+            return "connection"
+        return "invalid_response"
@@ -0,0 +1,30 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def configure_logging(level: str = "INFO"):
+    """
+    Nastaví logování bota tak, aby neblokovalo event loop.
+    Záznamy se jen vloží do fronty (QueueHandler) a samotný zápis na výstup
+    provádí samostatné vlákno (QueueListener). Zprávy pod zvolenou úrovní
+    se zahodí hned na začátku - debug výpisy v produkci nic nestojí.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
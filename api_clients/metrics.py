@@ -0,0 +1,158 @@
+import bisect
+import os
+import time
+
+
+class Histogram:
+    """Histogram s pevnými hranicemi košů (kumulativní export jako v Prometheu)."""
+
+    # Hranice košů v sekundách - od rychlých cache zásahů po pomalé upstreamy
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # poslední koš = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Odhad kvantilu jako horní hranice koše, do kterého kvantil padne."""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Jednoduchý registr metrik bota (čítače, gauge, histogramy s labely).
+    Zápis je jen úprava čísla v paměti - levné i na horké cestě.
+    Čte se přes !stats (summary) nebo jako Prometheus text (render_prometheus).
+    """
+
+    def __init__(self):
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+        self._collectors = []
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    @staticmethod
+    def _escape(value) -> str:
+        """Escapuje hodnotu labelu podle textového formátu Prometheus (\\, " a nový řádek)."""
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    # ----------------------------------------------------
+    # ZÁPIS
+    # ----------------------------------------------------
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def register_collector(self, collector):
+        """
+        Přidá funkci, která při čtení vrátí aktuální hodnoty gauge
+        jako seznam (název, labely, hodnota) - např. statistiky cache.
+        """
+        self._collectors.append(collector)
+
+    # ----------------------------------------------------
+    # ČTENÍ
+    # ----------------------------------------------------
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(self._key(name, labels), 0)
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        return self._histograms.get(self._key(name, labels))
+
+    def histograms(self, name: str) -> dict[tuple, Histogram]:
+        """Všechny histogramy daného jména podle labelů."""
+        return {labels: histogram for (metric, labels), histogram in self._histograms.items()
+                if metric == name}
+
+    def counters(self, name: str) -> dict[tuple, float]:
+        return {labels: value for (metric, labels), value in self._counters.items()
+                if metric == name}
+
+    def collected_gauges(self) -> dict[tuple, float]:
+        gauges = dict(self._gauges)
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                gauges[self._key(name, labels)] = value
+        return gauges
+
+    def render_prometheus(self) -> str:
+        """Export všech metrik v textovém formátu Prometheus."""
+        lines = []
+
+        def fmt(name, labels, value, extra=()):
+            pairs = list(labels) + list(extra)
+            label_str = ",".join(f'{k}="{self._escape(v)}"' for k, v in pairs)
+            return f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}"
+
+        for (name, labels), value in sorted(self._counters.items()):
+            lines.append(fmt(name, labels, value))
+        for (name, labels), value in sorted(self.collected_gauges().items()):
+            lines.append(fmt(name, labels, value))
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(fmt(f"{name}_bucket", labels, cumulative, [("le", bound)]))
+            lines.append(fmt(f"{name}_bucket", labels, histogram.count, [("le", "+Inf")]))
+            lines.append(fmt(f"{name}_sum", labels, round(histogram.sum, 6)))
+            lines.append(fmt(f"{name}_count", labels, histogram.count))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Atomicky zapíše Prometheus text do souboru (např. pro node_exporter textfile)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Sdílený registr celého bota
+metrics = Metrics()
+
+
+async def start_metrics_server(port: int, registry: Metrics = metrics):
+    """Spustí lokální HTTP endpoint /metrics (jen 127.0.0.1). Vrací runner pro ukončení."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=registry.render_prometheus(),
+                            content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
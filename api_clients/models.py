@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+
+# Popisy WMO kódů počasí - jedna tabulka místo řetězce podmínek při každém volání
+WMO_GROUPS = {
+    (0, 1): "Jasno ☀️",
+    (2, 3): "Polojasno / Zataženo ☁️",
+    (51, 53, 55): "Mrholení 🌧️",
+    (61, 63, 65): "Déšť 🌧️",
+    (71, 73, 75): "Sněžení ❄️",
+    (80, 81, 82): "Přeháňky ⛈️",
+}
+WMO_DESCRIPTIONS = {code: text for codes, text in WMO_GROUPS.items() for code in codes}
+UNKNOWN_WEATHER = "Neznámý jev ❓"
+
+
+def describe_weather(code: int | None) -> str:
+    """Převádí WMO kód na čitelný popis (zjednodušená verze)."""
+    return WMO_DESCRIPTIONS.get(code, UNKNOWN_WEATHER)
+
+
+@dataclass(slots=True)
+class CurrentWeather:
+    """Aktuální počasí místa (blok 'current' z Open-Meteo)."""
+
+    temperature: float | None
+    precipitation: float
+    weather_code: int | None
+
+    @property
+    def description(self) -> str:
+        return describe_weather(self.weather_code)
+
+
+@dataclass(slots=True)
+class HistoricalWeather:
+    """Maximální teplota ze stejného data před rokem (ERA5)."""
+
+    date: str
+    max_temp: float
+
+
+@dataclass(slots=True)
+class ClimateStats:
+    """Klimatologie data za YEARS let; percentile = kam spadá dnešní teplota (nebo None)."""
+
+    mean: float
+    record_high: float
+    record_low: float
+    p10: float
+    p50: float
+    p90: float
+    samples: int
+    percentile: float | None = None
+
+
+@dataclass(slots=True)
+class HourlyForecast:
+    """Hodinová předpověď místa po sloupcích (časy v místním čase)."""
+
+    time: list[str]
+    weather_code: list[int | None]
+    precipitation: list[float | None]
+    wind_gusts: list[float | None]
+
+
+@dataclass(slots=True)
+class WeatherReport:
+    """Výsledek get_weather_data: kanonický název, souřadnice a data pro !pocasi."""
+
+    city_name: str
+    lat: float
+    lon: float
+    current: CurrentWeather
+    historical: HistoricalWeather | None
+    climate: ClimateStats | None
+
+
+@dataclass(slots=True)
+class Station:
+    """Měřicí stanice kvality ovzduší z hromadného snímku WAQI."""
+
+    lat: float
+    lon: float
+    aqi: int
+    name: str | None
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket pro řízení tempa požadavků na jeden upstream.
+    Tokeny přibývají rychlostí `rate` za sekundu až do `capacity` (povolený burst).
+    Každý požadavek spotřebuje jeden token; když žádný není, počká se
+    přesně tak dlouho, než nějaký přibude (žádné pevné sleep mezi požadavky).
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Počká na volný token a spotřebuje ho."""
+        # Zámek zajistí férové pořadí čekajících (FIFO)
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
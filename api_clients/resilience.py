@@ -0,0 +1,88 @@
+import asyncio
+import random
+import time
+
+import aiohttp
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Požadavek odmítnut bez volání API - jistič pro daný host je rozpojený."""
+
+
+class CircuitBreaker:
+    """
+    Jistič pro jeden upstream host.
+    - closed: požadavky procházejí, počítají se po sobě jdoucí selhání,
+    - open: po FAILURE_THRESHOLD selháních se požadavky okamžitě odmítají,
+    - half-open: po RESET_TIMEOUT projde jeden zkušební požadavek;
+      úspěch jistič sepne, selhání ho znovu rozpojí.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+
+    def allow(self) -> bool:
+        """Smí se požadavek odeslat?"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        # half-open: pouze jeden zkušební požadavek najednou
+        # (zkouška, která se nikdy nevrátila - např. zrušená - po RESET_TIMEOUT propadne)
+        now = time.monotonic()
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started = None
+
+    def record_failure(self) -> bool:
+        """Zaznamená selhání; vrací True, pokud se jistič právě rozpojil."""
+        self._probe_started = None
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            return not was_open
+        return False
+
+
+class RetryPolicy:
+    """
+    Opakování idempotentních GET požadavků s exponenciálním čekáním
+    a plným jitterem (náhodná pauza 0 až base * 2^pokus, nejvýše max_delay).
+    """
+
+    # HTTP stavy, u kterých má smysl to zkusit znovu
+    RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in self.RETRYABLE_STATUSES
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
@@ -0,0 +1,56 @@
+import math
+
+from api_clients.models import Station
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Vzdálenost dvou bodů na Zemi v kilometrech."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class StationIndex:
+    """
+    Jednoduchý prostorový index měřicích stanic (mřížka po CELL_SIZE stupních).
+    Hledání nejbližší stanice prochází jen okolní buňky po "prstencích",
+    místo porovnání se všemi stanicemi.
+    """
+
+    CELL_SIZE = 0.5  # stupně
+    KM_PER_DEGREE = 111.2
+
+    def __init__(self, stations: list[Station]):
+        self._cells: dict[tuple[int, int], list[Station]] = {}
+        for station in stations:
+            self._cells.setdefault(self._cell(station.lat, station.lon), []).append(station)
+        self.size = len(stations)
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.CELL_SIZE), math.floor(lon / self.CELL_SIZE)
+
+    def nearest(self, lat: float, lon: float, max_km: float) -> Station | None:
+        """Vrátí nejbližší stanici do vzdálenosti max_km, nebo None."""
+        if not self._cells:
+            return None
+
+        # Nejkratší vzdálenost odpovídající jedné buňce (délka se k pólům zkracuje)
+        cell_km = self.CELL_SIZE * self.KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        max_ring = math.ceil(max_km / cell_km) + 1
+        center_lat, center_lon = self._cell(lat, lon)
+
+        best, best_km = None, max_km
+        for ring in range(max_ring + 1):
+            for d_lat in range(-ring, ring + 1):
+                for d_lon in range(-ring, ring + 1):
+                    if max(abs(d_lat), abs(d_lon)) != ring:
+                        continue  # jen buňky na obvodu prstence
+                    for station in self._cells.get((center_lat + d_lat, center_lon + d_lon), ()):
+                        distance = haversine_km(lat, lon, station.lat, station.lon)
+                        if distance <= best_km:
+                            best, best_km = station, distance
+            # Stanice za tímto prstencem už nemohou být blíž než nalezená
+            if best is not None and best_km <= ring * cell_km:
+                break
+        return best
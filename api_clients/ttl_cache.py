@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+
+class TTLCache:
+    """
+    Krátkodobá asynchronní cache výsledků API volání.
+    - čerstvá hodnota (mladší než ttl) se vrací bez dotazu na API,
+    - souběžní volající pro stejný klíč čekají na jediný běžící požadavek
+      (single-flight / coalescing),
+    - zastaralá hodnota (do ttl + stale_ttl) se vrátí okamžitě a na pozadí
+      se spustí obnovení (stale-while-revalidate).
+    Výsledek None (chyba API) se neukládá.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 4096):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: dict = {}  # klíč -> (hodnota, čas uložení)
+        self._inflight: dict = {}  # klíč -> běžící asyncio.Task
+
+        # Statistiky
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Vrátí hodnotu pro klíč; při chybějící hodnotě zavolá fetch()
+        (bezparametrická funkce vracející coroutine).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age <= self.ttl:
+                self.hits += 1
+                return value
+            if age <= self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_fetch(key, fetch)
+                return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_fetch(key, fetch)
+        # shield: zrušení jednoho čekajícího nesmí zrušit požadavek ostatním
+        return await asyncio.shield(task)
+
+    def peek(self, key):
+        """Čerstvá hodnota bez spouštění požadavku, jinak None (hromadné cesty si chybějící stáhnou samy)."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Vloží hodnotu získanou jinou cestou (např. hromadným dotazem)."""
+        if value is None:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            # Nejstarší vložený záznam je první v pořadí slovníku
+            self._entries.pop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+        }
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _start_fetch(self, key, fetch) -> asyncio.Task:
+        async def run():
+            value = await fetch()
+            self.put(key, value)
+            return value
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+
+        def done(finished: asyncio.Task):
+            self._inflight.pop(key, None)
+            # Chyba obnovy na pozadí nesmí skončit jako "never retrieved"
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+        return task
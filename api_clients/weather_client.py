@@ -1,6 +1,18 @@
 import aiohttp
 import asyncio
+import logging
 from datetime import datetime, timedelta, date
+from urllib.parse import urlsplit
+
+from api_clients.climatology import ClimatologyStore
+from api_clients.gazetteer import Gazetteer
+from api_clients.geocode_cache import GeocodeCache
+from api_clients.historical_store import HistoricalStore
+from api_clients.http_session import HttpSessionManager
+from api_clients.models import ClimateStats, CurrentWeather, HistoricalWeather, HourlyForecast, WeatherReport
+from api_clients.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 
 class WeatherClient:
@@ -9,6 +21,60 @@ class WeatherClient:
     Poskytuje aktuální i archivní data a zajišťuje robustní geokódování.
     """
 
+    GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+    FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+    ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/era5"
+    CURRENT_FIELDS = "precipitation,temperature,weathercode"
+    HOURLY_FIELDS = "weather_code,precipitation,wind_gusts_10m"
+
+    # Počet souřadnic v jednom hromadném dotazu na Open-Meteo
+    BATCH_SIZE = 100
+    # Kolik měst se smí geokódovat souběžně (jen první průchod, pak cache)
+    GEOCODE_CONCURRENCY = 10
+    # Při chybějící archivní hodnotě se stáhne rovnou celý rok dopředu
+    ARCHIVE_RANGE_DAYS = 365
+    # Kolik dlouhých řad pro klimatologii se smí stahovat souběžně (na pozadí)
+    CLIMATE_CONCURRENCY = 2
+    # Jak dlouho (s) je aktuální počasí čerstvé a jak dlouho se smí vrátit zastaralé
+    CURRENT_TTL = 5 * 60
+    CURRENT_STALE_TTL = 10 * 60
+
+    # Deadliny jednotlivých volání včetně opakování (s)
+    GEOCODE_DEADLINE = 5
+    CURRENT_DEADLINE = 8
+    HOURLY_DEADLINE = 10
+    ARCHIVE_DEADLINE = 10
+    CLIMATE_DEADLINE = 30
+    # Jak dlouho po aktuálních datech se ještě čeká na archiv (s). Archiv běží
+    # souběžně, takže má celkem latenci aktuálního počasí + HISTORICAL_GRACE;
+    # když archiv selhává nebo má rozpojený jistič, stačí čas na čtení lokálního archivu
+    HISTORICAL_GRACE = 1.5
+    HISTORICAL_GRACE_DEGRADED = 0.1
+
+    def __init__(self, http: HttpSessionManager | None = None,
+                 geocode_cache: GeocodeCache | None = None,
+                 historical_store: HistoricalStore | None = None,
+                 climatology: ClimatologyStore | None = None,
+                 gazetteer: Gazetteer | None = None):
+        """
+        Klient používá sdílenou HTTP vrstvu bota, případně si vytvoří vlastní.
+        Bez předané cache geokódování, archivu a klimatologie se použijí úložiště pouze v paměti.
+        Je-li předán lokální rejstřík obcí, geokóduje se nejdřív z něj (bez sítě).
+        """
+        self.gazetteer = gazetteer
+        self.http = http or HttpSessionManager()
+        self.geocode_cache = geocode_cache or GeocodeCache()
+        self.historical_store = historical_store or HistoricalStore()
+        self.climatology = climatology or ClimatologyStore()
+        self.current_cache = TTLCache(self.CURRENT_TTL, self.CURRENT_STALE_TTL)
+        self._climate_downloads: dict[tuple[float, float], asyncio.Task] = {}
+        self._climate_semaphore = asyncio.Semaphore(self.CLIMATE_CONCURRENCY)
+
+    @staticmethod
+    def coords_key(lat: float, lon: float) -> tuple[float, float]:
+        """Klíč místa v cache aktuálního počasí (~1 km)."""
+        return round(lat, 2), round(lon, 2)
+
     async def get_weather_data(self, city: str):
         """
         Získá aktuální a historická data pro dané město z Open-Meteo.
@@ -21,124 +87,336 @@ class WeatherClient:
         lat, lon, validated_city_name = result
 
         # 2. Asynchronní příprava úloh (TADY BYLO TO POMÍCHANÉ)
-        current_task = self._fetch_current_weather(lat, lon)
-        historical_task = self._fetch_historical_weather_open_meteo(lat, lon)
+        current_task = asyncio.ensure_future(self._get_current_cached(lat, lon))
+        historical_task = asyncio.ensure_future(
+            self._fetch_historical_weather_open_meteo(lat, lon))
 
         try:
-            # 3. Spuštění obou úloh současně (konkurentně)
-            current_data, historical_data = await asyncio.gather(current_task, historical_task)
+            # 3. Obě úlohy běží současně (konkurentně); na archiv se po aktuálních
+            # datech čeká jen krátce - nedokončené stahování pokračuje na pozadí
+            # a naplní lokální archiv pro příští dotaz
+            current_data = await current_task
+            historical_data = await asyncio.wait_for(
+                asyncio.shield(historical_task), self._historical_grace())
+        except asyncio.TimeoutError:
+            logger.info("Archiv neodpověděl včas, odpověď bez historického srovnání.")
+            historical_data = None
         except Exception as e:
-            print(f"Chyba při souběžném získávání dat: {e}")
+            logger.error("Chyba při souběžném získávání dat: %s", e)
             return None, "Nastala chyba při komunikaci s API."
 
         if current_data is None:
             return None, f"Nepodařilo se získat aktuální data o počasí pro {validated_city_name}."
 
-        # 4. Vrácení finálních dat
-        return {
-            "city_name": validated_city_name,
-            "current": current_data,
-            "historical": historical_data
-        }, None
+        # 4. Vrácení finálních dat (klimatologie jen z lokálního úložiště, bez sítě)
+        return WeatherReport(
+            validated_city_name, lat, lon, current_data, historical_data,
+            self.get_climatology(lat, lon, current_data.temperature)), None
+
+    async def get_weather_data_many(self, cities: list[str]) -> list[tuple[WeatherReport | None, str | None]]:
+        """
+        Hromadná varianta get_weather_data pro více měst (např. !porovnej).
+        Města se geokódují souběžně, aktuální počasí míst, která nejsou čerstvá
+        v cache, se stáhne jedním víc-souřadnicovým dotazem a archiv se čte souběžně.
+        Vrací dvojice (data, chyba) ve stejném pořadí jako vstup.
+        """
+        locations = await self.geocode_many(cities)
+        coords = list(dict.fromkeys((lat, lon) for lat, lon, _ in filter(None, locations)))
+
+        historical_tasks = {
+            (lat, lon): asyncio.ensure_future(self._fetch_historical_weather_open_meteo(lat, lon))
+            for lat, lon in coords}
+        currents = {(lat, lon): self.current_cache.peek(self.coords_key(lat, lon))
+                    for lat, lon in coords}
+        missing = [coord for coord, current in currents.items() if current is None]
+        if missing:
+            currents.update(zip(missing, await self.get_current_many(missing)))
+        # Na archiv se čeká jen krátce, nedokončené stahování doběhne na pozadí
+        if historical_tasks:
+            await asyncio.wait(historical_tasks.values(), timeout=self._historical_grace())
+
+        results = []
+        for city, location in zip(cities, locations):
+            if location is None:
+                results.append((None, f"Chyba: Město '{city.title()}' nebylo nalezeno."))
+                continue
+            lat, lon, name = location
+            current = currents[(lat, lon)]
+            if current is None:
+                results.append((None, f"Nepodařilo se získat aktuální data o počasí pro {name}."))
+                continue
+            task = historical_tasks[(lat, lon)]
+            results.append((WeatherReport(
+                name, lat, lon, current, task.result() if task.done() else None,
+                self.get_climatology(lat, lon, current.temperature)), None))
+        return results
+
+    async def geocode(self, city: str) -> tuple | None:
+        """Souřadnice a kanonický název města (lat, lon, name), nebo None."""
+        return await self._geocode_city(city)
+
+    def suggest_cities(self, city: str, limit: int = 3) -> list[str]:
+        """Návrhy názvů z lokálního rejstříku (překlepy, pak začátek jména)."""
+        if self.gazetteer is None:
+            return []
+        return self.gazetteer.similar(city, limit) or self.gazetteer.complete(city, limit)
+
+    async def geocode_many(self, cities: list[str]) -> list[tuple | None]:
+        """
+        Geokóduje více měst souběžně (s omezeným paralelismem).
+        Vrací seznam (lat, lon, name) nebo None ve stejném pořadí jako vstup.
+        """
+        semaphore = asyncio.Semaphore(self.GEOCODE_CONCURRENCY)
+
+        async def geocode(city):
+            async with semaphore:
+                return await self._geocode_city(city)
+
+        return await asyncio.gather(*(geocode(city) for city in cities))
+
+    async def get_current_many(self, coords: list[tuple[float, float]]) -> list[CurrentWeather | None]:
+        """
+        Hromadně získá aktuální počasí pro více souřadnic.
+        Využívá víc-souřadnicové dotazy Open-Meteo (lat/lon oddělené čárkou)
+        po dávkách BATCH_SIZE - jeden HTTP požadavek místo jednoho na město.
+        Vrací seznam ve stejném pořadí jako vstup (None při chybě dávky).
+        """
+        chunks = [coords[i:i + self.BATCH_SIZE]
+                  for i in range(0, len(coords), self.BATCH_SIZE)]
+        results = await asyncio.gather(*(self._fetch_current_batch(chunk) for chunk in chunks))
+        currents = [current for chunk_result in results for current in chunk_result]
+
+        # Výsledky monitoru zahřejí cache pro !pocasi
+        for (lat, lon), current in zip(coords, currents):
+            self.current_cache.put(self.coords_key(lat, lon), current)
+        return currents
+
+    async def get_hourly_many(self, coords: list[tuple[float, float]],
+                              hours: int) -> list[HourlyForecast | None]:
+        """
+        Hodinová předpověď (WMO kód, srážky, nárazy větru) na `hours` hodin
+        dopředu pro více souřadnic - stejné hromadné dávky jako get_current_many.
+        Časy jsou v místním čase daného místa.
+        """
+        query = f"hourly={self.HOURLY_FIELDS}&forecast_hours={hours}&timezone=auto"
+        chunks = [coords[i:i + self.BATCH_SIZE]
+                  for i in range(0, len(coords), self.BATCH_SIZE)]
+        results = await asyncio.gather(*(
+            self._fetch_forecast_batch(chunk, query, self._parse_hourly, self.HOURLY_DEADLINE)
+            for chunk in chunks))
+        return [forecast for chunk_result in results for forecast in chunk_result]
+
+    def get_climatology(self, lat: float, lon: float, temperature: float | None,
+                        day: date | None = None) -> ClimateStats | None:
+        """
+        Klimatologie dnešního data z lokálně uložené řady ERA5: průměr, percentily,
+        rekordy a percentil, do kterého spadá zadaná teplota. None, pokud místo
+        ještě nemá staženou řadu (viz prefetch_climatology).
+        """
+        day = day or datetime.now().date()
+        stats = self.climatology.day_stats(lat, lon, day)
+        if stats is None:
+            return None
+        if temperature is not None:
+            stats.percentile = self.climatology.percentile_of(lat, lon, day, temperature)
+        return stats
+
+    def prefetch_climatology(self, coords: list[tuple[float, float]], limit: int | None = None) -> int:
+        """
+        Naplánuje na pozadí stažení dlouhé řady ERA5 pro místa, která ji ještě nemají
+        (nejvýše `limit` nových stahování). Vrací počet nově naplánovaných.
+        """
+        scheduled = 0
+        for lat, lon in coords:
+            if limit is not None and scheduled >= limit:
+                break
+            key = self.coords_key(lat, lon)
+            if key in self._climate_downloads or self.climatology.has(lat, lon):
+                continue
+            task = asyncio.ensure_future(self._download_climatology(lat, lon))
+            self._climate_downloads[key] = task
+            task.add_done_callback(lambda _, key=key: self._climate_downloads.pop(key, None))
+            scheduled += 1
+        return scheduled
+
     # ----------------------------------------------------
     # PRIVÁTNÍ METODY
     # ----------------------------------------------------
 
     async def _geocode_city(self, city: str):
         """Převádí název města na lat/lon a vrátí korektní název."""
+        # Lokální rejstřík obcí - známá jména bez volání API
+        if self.gazetteer is not None:
+            local = self.gazetteer.lookup(city)
+            if local is not None:
+                return local
+
+        # Souřadnice se nemění - zkusíme cache (včetně negativních záznamů)
+        cached = self.geocode_cache.get(city)
+        if cached is GeocodeCache.NOT_FOUND:
+            return None
+        if cached is not None:
+            return cached
+
         # Použity Open-Meteo Geocoding
-        GEO_URL = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1&language=cs&format=json"
-        print(f"Geocoding city: {city}")
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(GEO_URL) as response:
-                    data = await response.json()
-                    print(f"Geocoding data: {data}")
-
-                    if not data or 'results' not in data or not data['results']:
-                        print("No results")
-                        return None
-
-                    result = data['results'][0]
-                    lat = result.get('latitude')
-                    lon = result.get('longitude')
-                    name = result.get('name')
-                    print(f"Lat: {lat}, Lon: {lon}, Name: {name}")
-                    return lat, lon, name
-
-            except aiohttp.ClientError as e:
-                print(f"Chyba Geokódování: {e}")
+        GEO_URL = f"{self.GEOCODING_URL}?name={city}&count=1&language=cs&format=json"
+        logger.debug("Geocoding city: %s", city)
+        try:
+            data = await self.http.get_json(GEO_URL, self.GEOCODE_DEADLINE, "geocoding")
+            logger.debug("Geocoding data: %s", data)
+
+            if not data or 'results' not in data or not data['results']:
+                logger.info("Geokódování: město %r nenalezeno.", city)
+                self.geocode_cache.put(city, None)
                 return None
 
-    async def _fetch_historical_weather_open_meteo(self, lat: float, lon: float) -> dict | None:
+            result = data['results'][0]
+            lat = result.get('latitude')
+            lon = result.get('longitude')
+            name = result.get('name')
+            logger.debug("Lat: %s, Lon: %s, Name: %s", lat, lon, name)
+            self.geocode_cache.put(city, (lat, lon, name))
+            return lat, lon, name
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Chyba Geokódování: %s", e)
+            return None
+
+    def _historical_grace(self) -> float:
+        """Jak dlouho po aktuálních datech čekat na archiv - zkráceně, když archiv nefunguje."""
+        if self.http.is_degraded(urlsplit(self.ARCHIVE_URL).hostname):
+            return self.HISTORICAL_GRACE_DEGRADED
+        return self.HISTORICAL_GRACE
+
+    async def _fetch_historical_weather_open_meteo(self, lat: float, lon: float) -> HistoricalWeather | None:
         """
-        Získá maximální denní teplotu ze stejného data před 5 lety
+        Získá maximální denní teplotu ze stejného data před 1 rokem
         pomocí Open-Meteo Archive API (ERA5 Reanalysis).
+        Hodnota se čte z lokálního archivu; při chybějícím záznamu se
+        stáhne celý rok od daného data, aby další dny už nepotřebovaly síť.
         """
         try:
             # Určení data: před 1 rokem
-            today = datetime.now()
-            date_x_years_ago = today.date() - timedelta(days=365)
-
-            # API endpoint pro historická data (Reanalysis)
-            url = (
-                f"https://archive-api.open-meteo.com/v1/era5?"
-                f"latitude={lat}&longitude={lon}&start_date={date_x_years_ago}&end_date={date_x_years_ago}"
-                f"&daily=temperature_2m_max&timezone=auto"
-            )
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    # Kontrola HTTP statusu
-                    response.raise_for_status()
-                    data = await response.json()
-
-            # Zpracování dat z Open-Meteo
-            if data.get('daily', {}).get('time'):
-                max_temp = data['daily']['temperature_2m_max'][0]
-                return {
-                    "date": date_x_years_ago.strftime("%Y-%m-%d"),
-                    "max_temp": max_temp
-                }
+            today = datetime.now().date()
+            date_x_years_ago = today - timedelta(days=365)
 
-            return None
+            # Archiv čteme ve vlákně - na zámku úložiště se nečeká v event loopu
+            get_max_temp = self.historical_store.get_max_temp
+            max_temp = await asyncio.to_thread(get_max_temp, lat, lon, date_x_years_ago)
+            if max_temp is None:
+                await self._download_archive_range(lat, lon, date_x_years_ago, today)
+                max_temp = await asyncio.to_thread(get_max_temp, lat, lon, date_x_years_ago)
+
+            if max_temp is None:
+                return None
+
+            return HistoricalWeather(date_x_years_ago.strftime("%Y-%m-%d"), max_temp)
         except Exception as e:
-            print(f"Chyba při stahování historických dat z Open-Meteo: {e}")
+            logger.warning("Chyba při stahování historických dat z Open-Meteo: %s", e)
             return None
 
+    async def _download_archive_range(self, lat: float, lon: float, start: date, today: date):
+        """Stáhne denní maxima od start na ARCHIVE_RANGE_DAYS dní (nejvýše do včerejška) a uloží je."""
+        end = min(start + timedelta(days=self.ARCHIVE_RANGE_DAYS - 1),
+                  today - timedelta(days=1))
+
+        # API endpoint pro historická data (Reanalysis)
+        url = (
+            f"{self.ARCHIVE_URL}?"
+            f"latitude={lat}&longitude={lon}&start_date={start}&end_date={end}"
+            f"&daily=temperature_2m_max&timezone=auto"
+        )
+
+        # Kontrola HTTP statusu probíhá ve sdílené HTTP vrstvě
+        data = await self.http.get_json(url, self.ARCHIVE_DEADLINE, "archive")
+
+        # Zpracování dat z Open-Meteo
+        daily = data.get('daily', {})
+        if daily.get('time'):
+            # Zápis roku hodnot do SQLite mimo event loop
+            await asyncio.to_thread(
+                self.historical_store.put_series,
+                lat, lon, daily['time'], daily['temperature_2m_max'])
+
+    async def _download_climatology(self, lat: float, lon: float):
+        """Stáhne denní maxima za ClimatologyStore.YEARS let jedním dotazem a uloží je."""
+        today = datetime.now().date()
+        start = date(today.year - self.climatology.YEARS + 1, 1, 1)
+        end = today - timedelta(days=1)
+        url = (
+            f"{self.ARCHIVE_URL}?"
+            f"latitude={lat}&longitude={lon}&start_date={start}&end_date={end}"
+            f"&daily=temperature_2m_max&timezone=auto"
+        )
+        try:
+            async with self._climate_semaphore:
+                data = await self.http.get_json(url, self.CLIMATE_DEADLINE, "climatology")
+            daily = data.get('daily', {})
+            if daily.get('time'):
+                # Převod na matici a zápis souboru mimo event loop
+                await asyncio.to_thread(
+                    self.climatology.put_series,
+                    lat, lon, daily['time'], daily['temperature_2m_max'])
+        except Exception as e:
+            logger.warning("Chyba při stahování klimatologické řady: %s", e)
+
+    async def _get_current_cached(self, lat: float, lon: float):
+        """Aktuální počasí přes TTL cache - souběžné dotazy na stejné místo sdílí jeden požadavek."""
+        return await self.current_cache.get_or_fetch(
+            self.coords_key(lat, lon),
+            lambda: self._fetch_current_weather(lat, lon))
+
     async def _fetch_current_weather(self, lat: float, lon: float):
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=precipitation,temperature,weathercode"
+        url = f"{self.FORECAST_URL}?latitude={lat}&longitude={lon}&current={self.CURRENT_FIELDS}"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    response.raise_for_status()
-                    data = await response.json()  # Tady se definuje to 'data'
-
-                    cw = data.get("current", {})
-                    return {
-                        "temperature": cw.get("temperature"),
-                        # Přidáno, výchozí 0.0 pokud není
-                        "precipitation": cw.get("precipitation", 0.0),
-                        # Důležité pro monitoring!
-                        "weather_code": cw.get("weathercode"),
-                        "description": self._get_weather_description(cw.get("weathercode", 0))
-                    }
+            data = await self.http.get_json(url, self.CURRENT_DEADLINE, "forecast")  # Tady se definuje to 'data'
+            return self._parse_current(data)
         except Exception as e:
-            print(f"Chyba při fetchování aktuálního počasí: {e}")
+            logger.warning("Chyba při fetchování aktuálního počasí: %s", e)
             return None
 
-    def _get_weather_description(self, code: int) -> str:
-        """Převádí WMO kód na čitelný popis (zjednodušená verze)."""
-        if code in [0, 1]:
-            return "Jasno ☀️"
-        if code in [2, 3]:
-            return "Polojasno / Zataženo ☁️"
-        if code in [51, 53, 55]:
-            return "Mrholení 🌧️"
-        if code in [61, 63, 65]:
-            return "Déšť 🌧️"
-        if code in [71, 73, 75]:
-            return "Sněžení ❄️"
-        if code in [80, 81, 82]:
-            return "Přeháňky ⛈️"
-        return "Neznámý jev ❓"
+    async def _fetch_current_batch(self, coords: list[tuple[float, float]]) -> list[CurrentWeather | None]:
+        """Jeden víc-souřadnicový dotaz na aktuální počasí pro dávku míst."""
+        return await self._fetch_forecast_batch(
+            coords, f"current={self.CURRENT_FIELDS}", self._parse_current, self.CURRENT_DEADLINE)
+
+    async def _fetch_forecast_batch(self, coords: list[tuple[float, float]], query: str,
+                                    parse, deadline: float) -> list:
+        """Jeden víc-souřadnicový dotaz na forecast endpoint; `parse` převede položku každého místa."""
+        latitudes = ",".join(str(lat) for lat, _ in coords)
+        longitudes = ",".join(str(lon) for _, lon in coords)
+        url = f"{self.FORECAST_URL}?latitude={latitudes}&longitude={longitudes}&{query}"
+        try:
+            data = await self.http.get_json(url, deadline, "forecast")
+            # Pro jedno místo vrací API objekt, pro více míst seznam objektů
+            if isinstance(data, dict):
+                data = [data]
+            if len(data) != len(coords):
+                logger.error(
+                    "Chyba: API vrátilo %d míst místo %d.", len(data), len(coords))
+                return [None] * len(coords)
+            return [parse(item) for item in data]
+        except Exception as e:
+            logger.warning("Chyba při hromadném fetchování předpovědi: %s", e)
+            return [None] * len(coords)
+
+    @staticmethod
+    def _parse_current(data: dict) -> CurrentWeather:
+        """Převede blok 'current' z odpovědi Open-Meteo na výsledek pro bota."""
+        cw = data.get("current", {})
+        return CurrentWeather(
+            cw.get("temperature"),
+            cw.get("precipitation", 0.0),  # výchozí 0.0 pokud není
+            cw.get("weathercode"))  # důležité pro monitoring (popis se dohledá z tabulky WMO)
+
+    @staticmethod
+    def _parse_hourly(data: dict) -> HourlyForecast | None:
+        """Převede blok 'hourly' z odpovědi Open-Meteo na sloupce pro detekci."""
+        hourly = data.get("hourly")
+        if not hourly or not hourly.get("time"):
+            return None
+        return HourlyForecast(
+            hourly["time"],
+            hourly.get("weather_code", []),
+            hourly.get("precipitation", []),
+            hourly.get("wind_gusts_10m", []))
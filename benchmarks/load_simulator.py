@@ -0,0 +1,282 @@
+"""
+Zátěžový simulátor příkazů bota (bez Discordu a bez sítě).
+
+Volá skutečné korutiny příkazů (!pocasi, !add, !remove, !list) s falešným
+ctx proti lokálním stub upstreamům. Měří latenci od vyvolání příkazu
+do první odpovědi (ctx.send) a zpoždění event loopu - pravidelně plánovaná
+pauza, která se probudí pozdě, znamená, že loop blokoval synchronní kód
+(souborové I/O, parsování velkého JSON, ...).
+Stub server běží v samostatném procesu, takže naměřené zpoždění
+patří jen botovi.
+
+Spuštění:
+    python -m benchmarks.load_simulator --commands 2000 --concurrency 200 \
+        --mix pocasi=70,add=10,remove=10,list=10 --output load_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.run_benchmarks import peak_rss_mb, percentile
+from benchmarks.stub_server import StubUpstreams
+
+
+class FakeContext:
+    """Náhrada discord ctx: zaznamená čas první odpovědi a obsah zpráv."""
+
+    def __init__(self, guild_id: int):
+        self.guild = type("Guild", (), {"id": guild_id})()
+        self.sent: list = []
+        self.replied_at: float | None = None
+
+    async def send(self, content=None, **kwargs):
+        if self.replied_at is None:
+            self.replied_at = time.perf_counter()
+        self.sent.append(content if content is not None else kwargs)
+
+
+class LoopLagMonitor:
+    """
+    Měří zpoždění event loopu: každých `interval` s naplánuje probuzení
+    a zaznamená, o kolik přišlo později. Zpoždění nad `stall_threshold`
+    se počítá jako zaseknutí (blokující kód na loopu).
+    """
+
+    def __init__(self, interval: float = 0.01, stall_threshold: float = 0.05):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+        self._expected: float | None = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        # Probuzení, které se kvůli blokování ještě nestihlo, se započítá také
+        if self._expected is not None and time.perf_counter() > self._expected:
+            self.samples.append(time.perf_counter() - self._expected)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def report(self) -> dict:
+        return {
+            "samples": len(self.samples),
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 2),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 2),
+            "stalls": sum(1 for lag in self.samples if lag > self.stall_threshold),
+        }
+
+    async def _run(self):
+        while True:
+            self._expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - self._expected))
+            self._expected = None
+
+
+class StubProcess:
+    """
+    Stub upstreamy v samostatném procesu - jejich práce (generování JSON)
+    nesdílí s botem GIL ani event loop, takže nezkresluje měření zpoždění.
+    """
+
+    def __init__(self, **stub_options):
+        self.stub_options = stub_options
+        self.stub = StubUpstreams(**stub_options)  # jen pro URL a configure_clients
+        self.request_counts: dict[str, int] = {}
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve_stub, args=(stub_options, child_conn), daemon=True)
+
+    def start(self) -> str:
+        self._process.start()
+        self.stub.base_url = self._conn.recv()
+        return self.stub.base_url
+
+    def stop(self) -> dict[str, int]:
+        self._conn.send("stop")
+        self.request_counts = self._conn.recv()
+        self._process.join()
+        return self.request_counts
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.request_counts.values())
+
+
+def _serve_stub(stub_options: dict, conn):
+    """Hlavní funkce procesu se stubem: nahlásí URL, čeká na stop, vrátí počty požadavků."""
+    async def serve():
+        stub = StubUpstreams(**stub_options)
+        conn.send(await stub.start())
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send(stub.request_counts)
+        await stub.stop()
+
+    asyncio.run(serve())
+
+
+# ----------------------------------------------------
+# SIMULACE
+# ----------------------------------------------------
+
+def build_plan(mix: dict[str, int], commands: int, cities: int, seed: int) -> list[tuple[str, str]]:
+    """Náhodné (ale opakovatelné) pořadí příkazů podle vah v mixu."""
+    rnd = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    return [(rnd.choices(names, weights)[0], f"Město {rnd.randrange(cities)}")
+            for _ in range(commands)]
+
+
+async def invoke(bot_main, command: str, city: str, guild_id: int) -> FakeContext:
+    ctx = FakeContext(guild_id)
+    if command == "pocasi":
+        await bot_main.pocasi.callback(ctx, city=city)
+    elif command == "add":
+        await bot_main.add_city.callback(ctx, city=city)
+    elif command == "remove":
+        await bot_main.remove_city.callback(ctx, city=city)
+    elif command == "list":
+        await bot_main.list_cities.callback(ctx)
+    else:
+        raise ValueError(f"Neznámý příkaz: {command}")
+    return ctx
+
+
+async def simulate(bot_main, plan: list[tuple[str, str]], concurrency: int,
+                   guilds: int) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    """Spustí plán se souběžností `concurrency`; vrací latence a chyby podle příkazu."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+
+    async def one(index: int, command: str, city: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ctx = await invoke(bot_main, command, city, index % guilds)
+            except Exception:
+                errors[command] = errors.get(command, 0) + 1
+                return
+            replied = ctx.replied_at if ctx.replied_at is not None else time.perf_counter()
+            latencies.setdefault(command, []).append(replied - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, command, city) for i, (command, city) in enumerate(plan)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run(args) -> dict:
+    stub = StubProcess(latency=args.latency, error_rate=args.error_rate)
+    stub.start()
+
+    import main as bot_main
+    bot_main.init_services()
+    bot_main.http_session.rate_limiters = {}
+    stub.stub.configure_clients(bot_main.weather_client, bot_main.aqi_client)
+
+    lag = LoopLagMonitor(stall_threshold=args.stall_ms / 1000)
+    lag.start()
+    try:
+        plan = build_plan(args.mix, args.commands, args.cities, args.seed)
+        latencies, errors, duration = await simulate(
+            bot_main, plan, args.concurrency, args.guilds)
+    finally:
+        await lag.stop()
+        await bot_main.http_session.close()
+        stub.stop()
+
+    results = [summarize_command(command, values, errors.get(command, 0))
+               for command, values in sorted(latencies.items())]
+    for item in results:
+        print(f"{item['command']:<10} {item['operations']:>6} příkazů  "
+              f"p50 {item['p50_ms']:>8.1f} ms  p95 {item['p95_ms']:>8.1f} ms  "
+              f"p99 {item['p99_ms']:>8.1f} ms  chyby {item['errors']}")
+    loop_report = lag.report()
+    print(f"Event loop: p99 zpoždění {loop_report['p99_ms']} ms, max {loop_report['max_ms']} ms, "
+          f"zaseknutí > {args.stall_ms} ms: {loop_report['stalls']}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commands": args.commands,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "cities": args.cities,
+            "latency_s": args.latency,
+            "error_rate": args.error_rate,
+            "duration_s": round(duration, 3),
+            "upstream_requests": stub.total_requests,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "commands": results,
+        "event_loop": loop_report,
+    }
+
+
+def summarize_command(command: str, latencies: list[float], errors: int) -> dict:
+    """Latence jednoho příkazu od vyvolání do první odpovědi."""
+    return {
+        "command": f"!{command}",
+        "operations": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Zátěžový simulátor příkazů Discord Weather Bota.")
+    parser.add_argument("--commands", type=int, default=1000, help="celkový počet příkazů")
+    parser.add_argument("--concurrency", type=int, default=200, help="kolik příkazů běží najednou")
+    parser.add_argument("--mix", type=parse_mix, default="pocasi=70,add=10,remove=10,list=10",
+                        help="váhy příkazů, např. pocasi=70,add=10,remove=10,list=10")
+    parser.add_argument("--cities", type=int, default=200, help="počet různých měst v příkazech")
+    parser.add_argument("--guilds", type=int, default=50, help="počet simulovaných serverů")
+    parser.add_argument("--latency", type=float, default=0.02, help="latence stubu v sekundách")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="podíl odpovědí HTTP 500")
+    parser.add_argument("--stall-ms", type=float, default=50, help="práh zaseknutí event loopu (ms)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_results.json", help="cesta k výsledkům (JSON)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    # Stav bota (SQLite, cache) vznikne v dočasném adresáři - ne v produkčních datech
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp(prefix="weather-bot-load-"))
+
+    report = asyncio.run(run(args))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Výsledky uloženy do {output}")
+
+
+if __name__ == "__main__":
+    main()
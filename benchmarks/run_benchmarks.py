@@ -0,0 +1,226 @@
+"""
+Offline benchmarky bota proti lokálním stub upstreamům (bez sítě).
+
+Měří WeatherClient.get_weather_data, AirQualityClient.get_current_aqi
+a jeden celý cyklus weather_monitor_task pro 10/100/1000 měst.
+Výsledky (operace/s, upstream požadavky/s, p50/p95/p99, peak RSS)
+se ukládají do JSON souboru, aby šlo běhy porovnávat.
+
+Spuštění:
+    python -m benchmarks.run_benchmarks --sizes 10,100,1000 --output bench_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.stub_server import StubUpstreams
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil metodou nejbližšího pořadí (values nemusí být seřazené)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Maximální RSS procesu od startu (Linux vrací kB, macOS bajty)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(name: str, size: int, latencies: list[float], duration: float,
+              errors: int, upstream_requests: int) -> dict:
+    return {
+        "benchmark": name,
+        "size": size,
+        "operations": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "ops_per_s": round(len(latencies) / duration, 2) if duration else None,
+        "upstream_requests": upstream_requests,
+        "upstream_requests_per_s": round(upstream_requests / duration, 2) if duration else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def timed_calls(calls, concurrency: int):
+    """Spustí coroutine factory `calls` s omezenou souběžností; vrací (latence, chyby, doba)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def run(call):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            ok = await call()
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(call) for call in calls))
+    return latencies, errors, time.perf_counter() - started
+
+
+# ----------------------------------------------------
+# JEDNOTLIVÉ BENCHMARKY
+# ----------------------------------------------------
+
+async def bench_weather_data(stub: StubUpstreams, size: int, concurrency: int) -> dict:
+    from api_clients.http_session import HttpSessionManager
+    from api_clients.weather_client import WeatherClient
+
+    http = HttpSessionManager(rate_limits={})
+    client = WeatherClient(http)
+    stub.configure_clients(weather_client=client)
+    before = stub.total_requests
+
+    async def call(city):
+        result, _ = await client.get_weather_data(city)
+        return result is not None
+
+    cities = [f"Město {i}" for i in range(size)]
+    latencies, errors, duration = await timed_calls(
+        [lambda city=city: call(city) for city in cities], concurrency)
+    await http.close()
+    return summarize("weather_client.get_weather_data", size, latencies, duration,
+                     errors, stub.total_requests - before)
+
+
+async def bench_current_aqi(stub: StubUpstreams, size: int, concurrency: int) -> dict:
+    from api_clients.air_quality_client import AirQualityClient
+    from api_clients.http_session import HttpSessionManager
+
+    http = HttpSessionManager(rate_limits={})
+    client = AirQualityClient(http)
+    stub.configure_clients(aqi_client=client)
+    before = stub.total_requests
+
+    async def call(city):
+        return await client.get_current_aqi(city) is not None
+
+    cities = [f"mesto-{i}" for i in range(size)]
+    latencies, errors, duration = await timed_calls(
+        [lambda city=city: call(city) for city in cities], concurrency)
+    await http.close()
+    return summarize("air_quality_client.get_current_aqi", size, latencies, duration,
+                     errors, stub.total_requests - before)
+
+
+async def bench_monitor_cycle(stub: StubUpstreams, size: int, cycles: int) -> list[dict]:
+    """První (studený - geokódování) a další (teplé) cykly weather_monitor_task."""
+    import main
+    from api_clients.geocode_cache import GeocodeCache
+    from api_clients.ttl_cache import TTLCache
+    from monitoring.scheduler import CityScheduler
+
+    main.init_services()
+    # Čisté cache pro každou velikost, URL klientů na stub, bez rate limitů
+    main.http_session.rate_limiters = {}
+    main.monitor_engine.climate_prefetch = 0  # 30leté řady na pozadí by zkreslily počty dotazů
+    main.weather_client.geocode_cache = GeocodeCache()
+    stub.configure_clients(main.weather_client, main.aqi_client)
+    main.monitored_cities = [f"Město {i}" for i in range(size)]
+
+    results = []
+    for phase, count in (("cold", 1), ("warm", cycles)):
+        latencies = []
+        before = stub.total_requests
+        started = time.perf_counter()
+        for _ in range(count):
+            # Nový rozvrh = všechna města jsou na řadě (celý průchod, ne jeden slot)
+            main.city_scheduler = CityScheduler(main.MONITOR_INTERVAL, main.MONITOR_SLOT_SECONDS)
+            # Monitor přeskakuje místa s čerstvým počasím v cache - měříme skutečné stahování
+            main.weather_client.current_cache = TTLCache(
+                main.weather_client.CURRENT_TTL, main.weather_client.CURRENT_STALE_TTL)
+            cycle_started = time.perf_counter()
+            await main.weather_monitor_task.coro()
+            latencies.append(time.perf_counter() - cycle_started)
+        duration = time.perf_counter() - started
+        results.append(summarize(f"weather_monitor_task.{phase}", size, latencies, duration,
+                                 0, stub.total_requests - before))
+    return results
+
+
+# ----------------------------------------------------
+# SPUŠTĚNÍ
+# ----------------------------------------------------
+
+async def run(args) -> dict:
+    stub = StubUpstreams(latency=args.latency, error_rate=args.error_rate)
+    await stub.start()
+    results = []
+    try:
+        for size in args.sizes:
+            results.append(await bench_weather_data(stub, size, args.concurrency))
+            results.append(await bench_current_aqi(stub, size, args.concurrency))
+            results.extend(await bench_monitor_cycle(stub, size, args.cycles))
+            for item in results[-4:]:
+                print(f"{item['benchmark']:<40} n={item['size']:<5} "
+                      f"{item['ops_per_s'] or 0:>9.1f} ops/s  p50 {item['p50_ms']:>8.1f} ms  "
+                      f"p99 {item['p99_ms']:>8.1f} ms  upstream {item['upstream_requests']}")
+    finally:
+        await stub.stop()
+        import main
+        await main.http_session.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_s": args.latency,
+            "error_rate": args.error_rate,
+            "concurrency": args.concurrency,
+            "sizes": args.sizes,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarky Discord Weather Bota.")
+    parser.add_argument("--sizes", default="10,100,1000",
+                        type=lambda value: [int(size) for size in value.split(",")],
+                        help="počty měst, např. 10,100,1000")
+    parser.add_argument("--latency", type=float, default=0.02, help="latence stubu v sekundách")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="podíl odpovědí HTTP 500")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="souběžnost volání klientů")
+    parser.add_argument("--cycles", type=int, default=3, help="počet teplých cyklů monitoru")
+    parser.add_argument("--output", default="bench_results.json", help="cesta k výsledkům (JSON)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    # Stav bota a cache (relativní cesty v main.py) vzniknou v dočasném adresáři -
+    # benchmark nesmí sahat na produkční data
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp(prefix="weather-bot-bench-"))
+
+    report = asyncio.run(run(args))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Výsledky uloženy do {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import asyncio
+import random
+import zlib
+from datetime import date, datetime, timedelta
+
+from aiohttp import web
+
+
+class StubUpstreams:
+    """
+    Lokální aiohttp server napodobující všechny upstreamy bota:
+    geokódování, předpověď a ERA5 archiv Open-Meteo a WAQI (feed + map/bounds).
+    Odpovědi jsou deterministické podle názvu města / souřadnic.
+    Nastavitelná je latence (s náhodným rozptylem) a podíl chybových odpovědí.
+    """
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.005,
+                 error_rate: float = 0.0, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.request_counts: dict[str, int] = {}
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Spustí server (port 0 = libovolný volný) a vrátí jeho základní URL."""
+        app = web.Application(middlewares=[self._simulate_network])
+        app.router.add_get("/v1/search", self._geocoding)
+        app.router.add_get("/v1/forecast", self._forecast)
+        app.router.add_get("/v1/era5", self._archive)
+        app.router.add_get("/feed/{city}/", self._aqi_feed)
+        app.router.add_get("/v2/map/bounds", self._aqi_bounds)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def configure_clients(self, weather_client=None, aqi_client=None):
+        """Přesměruje URL klientů na tento server."""
+        if weather_client is not None:
+            weather_client.GEOCODING_URL = f"{self.base_url}/v1/search"
+            weather_client.FORECAST_URL = f"{self.base_url}/v1/forecast"
+            weather_client.ARCHIVE_URL = f"{self.base_url}/v1/era5"
+        if aqi_client is not None:
+            aqi_client.BASE_URL = f"{self.base_url}/feed/"
+            aqi_client.MAP_BOUNDS_URL = f"{self.base_url}/v2/map/bounds"
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.request_counts.values())
+
+    @staticmethod
+    def city_coords(name: str) -> tuple[float, float]:
+        """Deterministické souřadnice města ve střední Evropě."""
+        h = zlib.crc32(name.casefold().encode("utf-8"))
+        return round(45 + (h % 10000) / 1000, 4), round(5 + (h // 10000 % 20000) / 1000, 4)
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    @web.middleware
+    async def _simulate_network(self, request, handler):
+        resource = request.match_info.route.resource
+        endpoint = resource.canonical if resource is not None else request.path
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.error_rate:
+            raise web.HTTPInternalServerError()
+        return await handler(request)
+
+    async def _geocoding(self, request):
+        name = request.query.get("name", "")
+        if name.casefold().startswith("neexistuje"):
+            return web.json_response({"generationtime_ms": 0.1})
+        lat, lon = self.city_coords(name)
+        return web.json_response({"results": [
+            {"latitude": lat, "longitude": lon, "name": name.title()}]})
+
+    async def _forecast(self, request):
+        latitudes = request.query["latitude"].split(",")
+        longitudes = request.query["longitude"].split(",")
+        items = []
+        for lat, lon in zip(latitudes, longitudes):
+            seed = zlib.crc32(f"{lat},{lon}".encode())
+            items.append({
+                "latitude": float(lat),
+                "longitude": float(lon),
+                "current": {
+                    "temperature": round(-5 + seed % 350 / 10, 1),
+                    "precipitation": round(seed % 70 / 10, 1),
+                    "weathercode": (0, 2, 61, 65, 80, 95)[seed % 6],
+                },
+            })
+            if "hourly" in request.query:
+                items[-1]["hourly"] = self._hourly(seed, int(request.query.get("forecast_hours", 24)))
+        return web.json_response(items if len(items) > 1 else items[0])
+
+    @staticmethod
+    def _hourly(seed: int, hours: int) -> dict:
+        start = datetime(2024, 6, 1, 12)
+        return {
+            "time": [(start + timedelta(hours=h)).isoformat(timespec="minutes") for h in range(hours)],
+            "weather_code": [(0, 2, 61, 65, 80, 95)[(seed + h) % 6] for h in range(hours)],
+            "precipitation": [round((seed + h) % 150 / 10, 1) for h in range(hours)],
+            "wind_gusts_10m": [round((seed * 7 + h) % 900 / 10, 1) for h in range(hours)],
+        }
+
+    async def _archive(self, request):
+        start = date.fromisoformat(request.query["start_date"])
+        end = date.fromisoformat(request.query["end_date"])
+        days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        temps = [round(10 + 12 * ((i % 365) / 365), 1) for i in range(len(days))]
+        return web.json_response({"daily": {"time": days, "temperature_2m_max": temps}})
+
+    async def _aqi_feed(self, request):
+        aqi = zlib.crc32(request.match_info["city"].encode("utf-8")) % 200
+        return web.json_response({"status": "ok", "data": {"aqi": aqi}})
+
+    async def _aqi_bounds(self, request):
+        south, west, north, east = map(float, request.query["latlng"].split(","))
+        stations = []
+        # Pravidelná síť stanic po 0,25° uvnitř obdélníku
+        lat = south
+        while lat <= north:
+            lon = west
+            while lon <= east:
+                stations.append({"lat": round(lat, 4), "lon": round(lon, 4),
+                                 "aqi": str(int(abs(lat * lon)) % 150),
+                                 "station": {"name": f"Stub {lat:.2f},{lon:.2f}"}})
+                lon += 0.25
+            lat += 0.25
+        return web.json_response({"status": "ok", "data": stations})
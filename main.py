@@ -1,7 +1,12 @@
 # main.py - ČISTÁ VERZE
 
-import json
+import time
+# Začátek startu - report měří i import knihoven (discord, aiohttp, NumPy)
+STARTUP_STARTED = time.perf_counter()
+
+import logging
 import os
+import socket
 from discord.ext import commands
 from discord.ext import tasks
 from dotenv import load_dotenv
@@ -11,8 +16,76 @@ import asyncio
 # LOKÁLNÍ IMPORT - TENTO UŽ TEĎ BUDE FUNGOVAT
 from api_clients.air_quality_client import AirQualityClient
 from api_clients.weather_client import WeatherClient
+from api_clients.http_session import HttpSessionManager
+from api_clients.geocode_cache import GeocodeCache
+from api_clients.historical_store import HistoricalStore
+from api_clients.climatology import ClimatologyStore
+from api_clients.gazetteer import Gazetteer
+from api_clients.logging_setup import configure_logging
+from api_clients.metrics import metrics, start_metrics_server
+from api_clients.models import WeatherReport
+from monitoring.engine import MonitorEngine
+from monitoring.alerts import AlertChannelIndex, AlertDispatcher
+from monitoring.state_store import StateStore
+from monitoring.scheduler import CityScheduler
+from monitoring.leader import AlertFeed, LeaderLease
+from monitoring.forecast import ForecastAlert, ForecastScanner
+from monitoring.prefetcher import UsagePrefetcher
+from monitoring.startup import StartupReport
+
+startup_report = StartupReport(STARTUP_STARTED)
+startup_report.mark("import knihoven")
+
+# Načtení proměnných prostředí ze souboru .env (před čtením konfigurace níže)
+load_dotenv()
+DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 
-MONITORED_CITIES_FILE = "monitored_cities.json"
+# Starý JSON se seznamem měst - jen pro jednorázovou migraci do STATE_FILE
+MONITORED_CITIES_FILE = os.getenv("MONITORED_CITIES_FILE", "monitored_cities.json")
+STATE_FILE = os.getenv("BOT_STATE_FILE", "bot_state.db")
+GEOCODE_CACHE_FILE = os.getenv("GEOCODE_CACHE_FILE", "geocode_cache.db")
+HISTORICAL_STORE_FILE = os.getenv("HISTORICAL_STORE_FILE", "era5_archive.db")
+# Lokální rejstřík obcí (sestavený z GeoNames: python -m api_clients.gazetteer CZ.txt)
+GAZETTEER_FILE = os.getenv("GAZETTEER_FILE", "gazetteer.npz")
+# Adresář s dlouhými řadami ERA5 (.npy na místo) pro klimatologii
+CLIMATOLOGY_DIR = os.getenv("CLIMATOLOGY_DIR", "climatology")
+# Kolik nových míst monitor za cyklus zařadí ke stažení klimatologické řady
+CLIMATE_PREFETCH_PER_CYCLE = 5
+# Kolik dávek měst smí monitor zpracovávat souběžně
+MONITOR_CONCURRENCY = int(os.getenv("MONITOR_CONCURRENCY", "4"))
+# Metriky: Prometheus text do souboru po každém cyklu, volitelně i na localhost:METRICS_PORT
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.prom")
+METRICS_PORT = os.getenv("METRICS_PORT")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Monitoring: každé město jednou za interval ve svém slotu (plus úpravy dle počasí)
+MONITOR_INTERVAL = 30 * 60  # s
+MONITOR_SLOT_SECONDS = 60
+# Jak často se obnovuje hromadný AQI snímek celé oblasti
+AQI_REFRESH_INTERVAL = 15 * 60  # s
+# Včasná varování: na kolik hodin dopředu se čte hodinová předpověď (0 = vypnuto)
+# a jak často se předpověď všech měst stahuje
+FORECAST_HOURS = int(os.getenv("FORECAST_HOURS", "12"))
+FORECAST_SCAN_INTERVAL = 30 * 60  # s
+# Prefetch populárních měst: kolik jich držet v paměti, rozpočet upstream
+# požadavků za hodinu a jak často se obnova spouští
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "20"))
+PREFETCH_BUDGET = int(os.getenv("PREFETCH_BUDGET", "600"))
+PREFETCH_INTERVAL = 60  # s
+# !porovnej: nejvýše tolik měst v jedné tabulce
+MAX_COMPARE_CITIES = 10
+# Sharding: SHARD_COUNT celkem, SHARD_IDS shardy tohoto procesu (např. "0,1");
+# bez nastavení určí počet shardů Discord a všechny běží v jednom procesu.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = ([int(i) for i in os.getenv("SHARD_IDS").split(",")]
+             if os.getenv("SHARD_IDS") else None)
+# Sdílený soubor procesů bota: volba lídra monitoringu a kanál alertů
+COORDINATION_FILE = os.getenv("BOT_COORDINATION_FILE", "bot_coordination.db")
+# Lídr obnovuje pronájem každý tik; když 3 tiky mlčí, převezme monitoring jiný proces
+LEADER_LEASE_TTL = 3 * MONITOR_SLOT_SECONDS
+# Nejdelší čekání prvního tiku monitoru na zahřátí cache po startu
+WARMUP_TIMEOUT = 30  # s
+
+logger = logging.getLogger("weather_bot")
 
 # WMO kódy pro nebezpečné počasí
 SEVERE_CODES = {
@@ -24,46 +97,230 @@ SEVERE_CODES = {
 }
 
 
-def load_cities():
-    if os.path.exists(MONITORED_CITIES_FILE):
-        with open(MONITORED_CITIES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return ["Praha"]
-
+# Aktivace intents pro čtení obsahu zpráv
+intents = discord.Intents.default()
+intents.message_content = True
 
-monitored_cities = load_cities()
+# Sdílený pool HTTP spojení pro všechny API klienty (vlastní ho bot)
+http_session = HttpSessionManager()
 
 
-def save_cities():
-    with open(MONITORED_CITIES_FILE, "w", encoding="utf-8") as f:
-        json.dump(monitored_cities, f, ensure_ascii=False, indent=4)
+class WeatherBot(commands.AutoShardedBot):
+    """Bot, jehož vypnutí uzavře i sdílenou HTTP vrstvu a předá monitoring jinému procesu."""
 
+    startup_task: asyncio.Task | None = None
 
-# Načtení proměnných prostředí ze souboru .env
-load_dotenv()
-DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
-
-# Aktivace intents pro čtení obsahu zpráv
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
-
-# Inicializace bota a klienta
-aqi_client = AirQualityClient()  # Inicializace klienta (Zapouzdření API)
-weather_client = WeatherClient()  # Inicializace klienta (Zapouzdření API)
+    async def setup_hook(self):
+        # Jediný startovní hook (discord.py ho volá jednou, před připojením k bráně).
+        # Načtení rejstříku a zahřátí cache běží na pozadí souběžně s přihlášením,
+        # první tik monitoru na ně počká (viz before_monitor).
+        global metrics_server
+        startup_report.mark("přihlášení")
+        init_services()
+        self.startup_task = asyncio.create_task(warm_up())
+        if METRICS_PORT and metrics_server is None:
+            metrics_server = await start_metrics_server(int(METRICS_PORT))
+        weather_monitor_task.start()
+        if PREFETCH_TOP_K:
+            prefetch_task.start()
+
+    async def close(self):
+        if leader_lease is not None:
+            try:
+                await asyncio.to_thread(leader_lease.release)
+            except Exception:
+                logger.exception("Uvolnění pronájmu lídra selhalo - převezme se po vypršení.")
+        await http_session.close()
+        await super().close()
+
+
+bot = WeatherBot(command_prefix='!', intents=intents,
+                 shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+
+city_scheduler = CityScheduler(MONITOR_INTERVAL, MONITOR_SLOT_SECONDS)
+forecast_scanner = ForecastScanner(SEVERE_CODES, FORECAST_HOURS)
+last_forecast_scan = 0.0
+
+# Index kanálů #alert (udržovaný z událostí Discordu) a rozesílání alertů
+alert_channels = AlertChannelIndex()
+alert_dispatcher = AlertDispatcher(alert_channels)
+metrics_server = None
+
+# Stav, cache, klienti a koordinace procesů vznikají až při startu (init_services
+# ze setup_hook) - samotný import main (testy, benchmarky) nesahá na disk
+state_store: StateStore | None = None
+monitored_cities = None
+last_alerts = None  # Ukládá poslední alerty pro města (přežije restart)
+aqi_client: AirQualityClient | None = None
+weather_client: WeatherClient | None = None
+monitor_engine: MonitorEngine | None = None
+prefetcher: UsagePrefetcher | None = None
+leader_lease: LeaderLease | None = None
+alert_feed: AlertFeed | None = None
+
+
+def init_services():
+    """
+    Líná inicializace: otevře stav bota, cache a koordinační soubor a vytvoří klienty.
+    Volá ji setup_hook; testy a benchmarky po importu main. Druhé volání nic nedělá.
+    """
+    global state_store, monitored_cities, last_alerts, aqi_client, weather_client, \
+        monitor_engine, prefetcher, leader_lease, alert_feed
+    if state_store is not None:
+        return
 
-last_alerts = {}  # Ukládá poslední alerty pro města
+    # Sledovaná města, odběry serverů a stav alertů (SQLite, WAL)
+    state_store = StateStore(STATE_FILE, MONITORED_CITIES_FILE)
+    monitored_cities = state_store.cities
+    last_alerts = state_store.alerts
+
+    # Klienti (rejstřík obcí se načte až na pozadí při startu, viz warm_up)
+    aqi_client = AirQualityClient(http_session)  # Inicializace klienta (Zapouzdření API)
+    weather_client = WeatherClient(
+        http_session,
+        GeocodeCache(GEOCODE_CACHE_FILE),
+        HistoricalStore(HISTORICAL_STORE_FILE),
+        ClimatologyStore(CLIMATOLOGY_DIR))  # Inicializace klienta (Zapouzdření API)
+    monitor_engine = MonitorEngine(weather_client, aqi_client, MONITOR_CONCURRENCY,
+                                   CLIMATE_PREFETCH_PER_CYCLE)
+    prefetcher = UsagePrefetcher(weather_client, aqi_client, PREFETCH_TOP_K, PREFETCH_BUDGET)
+
+    # Monitoring stahuje jen zvolený lídr, alerty dostanou všechny procesy přes sdílený kanál
+    leader_lease = LeaderLease(
+        COORDINATION_FILE, f"{socket.gethostname()}:{os.getpid()}", LEADER_LEASE_TTL)
+    alert_feed = AlertFeed(COORDINATION_FILE)
+
+    metrics.register_collector(cache_metrics)
+    startup_report.mark("inicializace")
+
+
+def cache_metrics():
+    """Aktuální statistiky všech cache pro registr metrik."""
+    caches = {
+        "current_weather": weather_client.current_cache.stats(),
+        "aqi": aqi_client.aqi_cache.stats(),
+        "geocode": weather_client.geocode_cache.stats(),
+    }
+    gauges = []
+    for cache, stats in caches.items():
+        for stat, value in stats.items():
+            gauges.append((f"cache_{stat}", {"cache": cache}, value))
+        gauges.append(("cache_hit_ratio", {"cache": cache}, round(hit_ratio(stats), 4)))
+    for stat, value in prefetcher.stats().items():
+        gauges.append((f"prefetch_{stat}", {}, value))
+    gauges.append(("prefetch_hit_ratio", {}, round(prefetcher.hit_ratio(), 4)))
+    return gauges
+
+
+def hit_ratio(stats: dict) -> float:
+    """Podíl dotazů obsloužených bez vlastního volání API (zásah, zastaralá hodnota, sloučení)."""
+    served = stats.get("hits", 0) + stats.get("stale_hits", 0) + stats.get("coalesced", 0)
+    total = served + stats.get("misses", 0)
+    return served / total if total else 0.0
+
+
+async def warm_up():
+    """
+    Start na pozadí: líné načtení rejstříku obcí (mimo event loop) a zahřátí
+    cache geokódování a aktuálního počasí všech sledovaných měst.
+    """
+    try:
+        if os.path.exists(GAZETTEER_FILE):
+            weather_client.gazetteer = await asyncio.to_thread(Gazetteer.load, GAZETTEER_FILE)
+        else:
+            logger.info("Rejstřík obcí %s nenalezen - geokódování jen přes API.", GAZETTEER_FILE)
+        started = time.perf_counter()
+        cities = list(monitored_cities)
+        warmed = await monitor_engine.warm_up(cities)
+        logger.info("Zahřátí cache: %d/%d měst za %.2f s.",
+                    warmed, len(cities), time.perf_counter() - started)
+    except Exception:
+        logger.exception("Zahřátí cache po startu selhalo.")
 
 
-@tasks.loop(minutes=30)
+@tasks.loop(seconds=MONITOR_SLOT_SECONDS)
 async def weather_monitor_task():
-    for city in monitored_cities:
-        data, _ = await weather_client.get_weather_data(city)
-        if not data:
-            continue
-
-        current = data['current']
-        w_code = current.get('weather_code')
+    # Chyba jednoho tiku (např. "database is locked" při souběhu procesů) nesmí
+    # ukončit smyčku - tasks.loop by monitoring v tomto procesu zastavil natrvalo
+    try:
+        # Seznam měst mohl změnit jiný proces bota (příkazy !add/!remove na jiném shardu)
+        state_store.cities.reload()
+
+        # Data stahuje jen lídr - při více procesech se stejná města nestahují vícekrát.
+        # Sdílený koordinační soubor může být zamčený jiným procesem - mimo event loop.
+        was_leader = leader_lease.is_leader
+        if await asyncio.to_thread(leader_lease.try_acquire):
+            if not was_leader:
+                logger.info("Monitoring: tento proces (%s) je lídr.", leader_lease.holder_id)
+                last_alerts.reload()  # stav alertů mohl zapsat předchozí lídr
+            alert_lines = await run_monitor_cycle()
+            alert_lines += await run_forecast_scan()
+            if alert_lines:
+                await asyncio.to_thread(alert_feed.publish, alert_lines)
+        elif was_leader:
+            logger.warning("Monitoring: pronájem lídra převzal jiný proces.")
+        metrics.set_gauge("monitor_leader", int(leader_lease.is_leader))
+
+        # Každý proces rozešle alerty jen do kanálů svých serverů (index obsahuje jen je)
+        # a jen pro města, která si server přidal; všechna varování cyklu jako jeden
+        # embed na server, odeslaná souběžně
+        for batch in await asyncio.to_thread(alert_feed.fetch_new):
+            subscriptions = {city: set(state_store.cities.subscribers(city)) for city, _ in batch}
+            await alert_dispatcher.dispatch(batch, subscriptions)
+
+        # Zápis souboru s metrikami mimo event loop
+        await asyncio.to_thread(metrics.write_prometheus, METRICS_FILE)
+    except Exception:
+        logger.exception("Tik monitoringu selhal.")
+        metrics.inc("monitor_tick_errors_total")
+
+
+@tasks.loop(seconds=PREFETCH_INTERVAL)
+async def prefetch_task():
+    # Populární města drží každý proces sám - dotazy chodí z jeho serverů
+    try:
+        await prefetcher.refresh()
+    except Exception:
+        logger.exception("Prefetch populárních měst selhal.")
+
+
+@weather_monitor_task.before_loop
+async def before_monitor():
+    # První tik až po přihlášení (index kanálů #alert) a po zahřátí cache
+    await bot.wait_until_ready()
+    startup_report.mark("připojení k bráně")
+    if bot.startup_task is not None:
+        try:
+            await asyncio.wait_for(asyncio.shield(bot.startup_task), WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Zahřátí cache nestihlo %d s - monitor startuje bez něj.", WARMUP_TIMEOUT)
+    startup_report.mark("zahřátí cache")
+    startup_report.finish()
+
+
+async def run_monitor_cycle() -> list[tuple[str, str]]:
+    """Jeden tik monitoringu (jen lídr). Vrací nové alerty jako (město, řádek)."""
+    # Každý tik zpracuje jen města, která jsou podle rozvrhu na řadě -
+    # zátěž upstreamů je rozložená rovnoměrně přes celý interval.
+    due_cities = city_scheduler.due(list(monitored_cities))
+    if not due_cities:
+        return []
+
+    # Monitor nepotřebuje historická data - stačí aktuální stav měst.
+    # Engine stahuje po dávkách s omezenou souběžností, tempo hlídají token buckety.
+    region_cities = None
+    if aqi_client.bulk_refresh_due(AQI_REFRESH_INTERVAL):
+        region_cities = list(monitored_cities)
+    results = await monitor_engine.run_cycle(due_cities, region_cities)
+
+    checked = set()
+    alert_lines = []
+    for city, current in results:
+        w_code = current.weather_code
+        alert_msg = SEVERE_CODES.get(w_code)  # jedno vyhledání v tabulce pro celé město
+        checked.add(city)
+        # Při nebezpečném jevu se město kontroluje častěji, v klidu řidčeji
+        city_scheduler.record(city, severe=alert_msg is not None)
 
         # --- LOGIKA PROTI OPAKOVANÝM ALERTŮM ---
         # Pokud je aktuální kód stejný jako ten, co jsme nahlásili minule, město přeskočíme
@@ -73,28 +330,79 @@ async def weather_monitor_task():
         last_alerts[city] = w_code  # Aktualizujeme poslední alert
 
         # Pokud je zjištěno nebezpečné počasí
-        if w_code in SEVERE_CODES:
-            # Najdeme kanál 'alert' na všech serverech, kde bot je
-            for guild in bot.guilds:
-                channel = discord.utils.get(guild.text_channels, name="alert")
-                if channel:
-                    alert_msg = SEVERE_CODES[w_code]
-                    await channel.send(f"🚨 **VAROVÁNÍ - {city}**: {alert_msg} ({current['temperature']}°C)")
+        if alert_msg is not None:
+            alert_lines.append(
+                (city, f"**{city}**: {alert_msg} ({current.temperature}°C)"))
+
+    # Města, která se nepodařilo stáhnout, zkusíme znovu v dalším intervalu
+    for city in due_cities:
+        if city not in checked:
+            city_scheduler.record(city, severe=False)
+
+    return alert_lines
+
+
+async def run_forecast_scan() -> list[tuple[str, str]]:
+    """Včasná varování z hodinové předpovědi (jen lídr, jednou za FORECAST_SCAN_INTERVAL)."""
+    global last_forecast_scan
+    if not FORECAST_HOURS or time.time() - last_forecast_scan < FORECAST_SCAN_INTERVAL:
+        return []
+    last_forecast_scan = time.time()
+
+    cities, forecasts = await monitor_engine.fetch_forecasts(list(monitored_cities), FORECAST_HOURS)
+    alert_lines = []
+    for alert in forecast_scanner.scan(cities, forecasts):
+        # Do příchodu jevu se město kontroluje častěji
+        city_scheduler.mark_severe_forecast(alert.city)
+        alert_lines.append(
+            (alert.city, f"**{alert.city}**: očekává se {forecast_reason(alert)} kolem {alert.time:%H:%M}"))
+    metrics.inc("forecast_alerts_total", len(alert_lines))
+    return alert_lines
+
 
-        await asyncio.sleep(2)  # Šetříme API mezi jednotlivými městy
+def forecast_reason(alert: ForecastAlert) -> str:
+    """Popis předpovězeného jevu: WMO kód, jinak překročený práh srážek či větru."""
+    if alert.weather_code in SEVERE_CODES:
+        return SEVERE_CODES[alert.weather_code]
+    if alert.precipitation >= ForecastScanner.PRECIPITATION_THRESHOLD:
+        return f"silný déšť ({alert.precipitation:.1f} mm/h) 🌧️"
+    return f"silný vítr (nárazy {alert.wind_gusts:.0f} km/h) 💨"
 
 
 @bot.event
 async def on_ready():
-    # Spustí se při úspěšném připojení bota k Discordu.
-    print(f'🤖 Bot je připojen jako: {bot.user.name}')
+    # Po každém (opětovném) připojení k Discordu - úlohy spouští setup_hook jen jednou
+    logger.info('🤖 %s je připojen a monitoruje počasí.', bot.user.name)
+    alert_channels.rebuild(bot.guilds)
+
+
+# Udržování indexu kanálů #alert
 
 
 @bot.event
-async def on_ready():
-    print(f'🤖 {bot.user.name} je připojen a monitoruje počasí.')
-    if not weather_monitor_task.is_running():
-        weather_monitor_task.start()
+async def on_guild_join(guild):
+    alert_channels.refresh_guild(guild)
+
+
+@bot.event
+async def on_guild_remove(guild):
+    alert_channels.remove_guild(guild)
+
+
+@bot.event
+async def on_guild_channel_create(channel):
+    alert_channels.refresh_guild(channel.guild)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    alert_channels.refresh_guild(channel.guild)
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if before.name != after.name:
+        alert_channels.refresh_guild(after.guild)
 # REAKTIVNÍ ČÁST: Příkaz pro komplexní Počasí (Standardizovaný název funkce)
 
 
@@ -105,23 +413,39 @@ async def pocasi(ctx, *, city: str):
     # -------------------------------------------------------------------
     # 1. Získání Počasí (Aktuální + Historické)
     # -------------------------------------------------------------------
-    weather_result, weather_error = await weather_client.get_weather_data(city)
+    # Populární města drží prefetcher hotová v paměti - bez čekání na API
+    prefetcher.record(city)
+    prefetched = prefetcher.get(city)
+    if prefetched is not None:
+        weather_result, aqi_value = prefetched
+    else:
+        weather_result, weather_error = await weather_client.get_weather_data(city)
 
-    if weather_result is None:
-        await ctx.send(f"❌ **{weather_error}** Prosím, zkontrolujte název města.")
-        return
+        if weather_result is None:
+            await ctx.send(f"❌ **{weather_error}** Prosím, zkontrolujte název města.")
+            return
 
-    validated_city = weather_result['city_name']
-    current = weather_result['current']
-    historical = weather_result['historical']
+    validated_city = weather_result.city_name
+    current = weather_result.current
+    historical = weather_result.historical
+    climate = weather_result.climate
+    if climate is None:
+        # Dlouhá řada pro toto místo se stáhne na pozadí - příště už bez sítě
+        weather_client.prefetch_climatology([(weather_result.lat, weather_result.lon)])
 
-    current_temp = current['temperature']
+    current_temp = current.temperature
 
     # -------------------------------------------------------------------
     # 2. Získání Kvality Ovzduší (AQI)
     # -------------------------------------------------------------------
-    # Předpoklad: AQI je pro celé město (Praha, Brno atd.)
-    aqi_value = await aqi_client.get_current_aqi(validated_city)
+    # Nejdřív nejbližší stanice z hromadného snímku monitoru (bez API volání),
+    # jinak dotaz na AQI celého města (Praha, Brno atd.)
+    if prefetched is None:
+        aqi_value = aqi_client.get_snapshot_aqi(
+            weather_result.lat, weather_result.lon)
+        if aqi_value is None:
+            aqi_value = await aqi_client.get_current_aqi(validated_city)
+        prefetcher.put(city, weather_result, aqi_value)
 
     if aqi_value is not None:
         aqi_status, color_hex = aqi_client.get_aqi_status(aqi_value)
@@ -136,8 +460,8 @@ async def pocasi(ctx, *, city: str):
 
     # a) Historické srovnání
     historical_summary = ""
-    if historical and historical['max_temp'] is not None:
-        hist_temp = historical['max_temp']
+    if historical and historical.max_temp is not None:
+        hist_temp = historical.max_temp
         diff = current_temp - hist_temp
 
         diff_abs = abs(diff)
@@ -154,13 +478,22 @@ async def pocasi(ctx, *, city: str):
     else:
         historical_summary = ". Archivní data pro srovnání nejsou dostupná."
 
-    # b) Generování finální věty
+    # b) Klimatologie (z lokálně uložených řad, bez volání API)
+    climate_summary = ""
+    if climate and climate.percentile is not None:
+        climate_summary = (
+            f"\nTo je **{climate.percentile:.0f}. percentil** denních maxim pro toto datum "
+            f"za {ClimatologyStore.YEARS} let (průměr {climate.mean}°C, "
+            f"rekord {climate.record_low}°C / {climate.record_high}°C)."
+        )
+
+    # c) Generování finální věty
     response_sentence = (
         f"Ahoj! Dnes je v **{validated_city}** aktuální teplota **{current_temp}°C**"
-        f"{historical_summary}"
+        f"{historical_summary}{climate_summary}"
     )
 
-    # c) Generování embedu
+    # d) Generování embedu
     embed = discord.Embed(
         title=f"☀️ Aktuální Počasí a historie pro {validated_city}",
         description=response_sentence,
@@ -168,21 +501,84 @@ async def pocasi(ctx, *, city: str):
     )
 
     embed.add_field(name="Stav Počasí",
-                    value=current['description'], inline=True)
+                    value=current.description, inline=True)
     embed.add_field(name="Srážky (poslední hodina)",
-                    value=f"{current['precipitation']} mm", inline=True)
+                    value=f"{current.precipitation} mm", inline=True)
     embed.add_field(name="Kvalita Ovzduší (AQI)",
                     value=aqi_status, inline=False)
 
     await ctx.send(embed=embed)
 
 
+@bot.command()
+async def porovnej(ctx, *, cities: str):
+    """Porovnání více měst v jedné tabulce: !porovnej Praha, Brno, Ostrava."""
+    unique = {}
+    for name in (c.strip() for c in cities.split(",")):
+        if name:
+            unique.setdefault(name.casefold(), name)  # "Praha, praha" jen jednou
+    names = list(unique.values())
+    if len(names) < 2:
+        await ctx.send("Zadejte aspoň dvě města oddělená čárkou, např. `!porovnej Praha, Brno`.")
+        return
+    if len(names) > MAX_COMPARE_CITIES:
+        await ctx.send(f"Najednou lze porovnat nejvýše {MAX_COMPARE_CITIES} měst.")
+        return
+    for name in names:
+        prefetcher.record(name)
+
+    # Hromadně: souběžné geokódování, jeden dotaz na aktuální počasí všech měst, AQI ze snímku
+    weather_results = await weather_client.get_weather_data_many(names)
+    found = [result for result, _ in weather_results if result is not None]
+    errors = [error for result, error in weather_results if result is None]
+    if not found:
+        await ctx.send("❌ " + "\n".join(errors))
+        return
+    aqi_values = await aqi_client.get_aqi_many(
+        [(result.lat, result.lon, result.city_name) for result in found])
+
+    # Barva dle nejhoršího AQI ze všech měst
+    worst_aqi = max((value for value in aqi_values if value is not None), default=None)
+    color_hex = aqi_client.get_aqi_status(worst_aqi)[1] if worst_aqi is not None else "#7f8c8d"
+    embed = discord.Embed(
+        title="🌍 Porovnání počasí",
+        description=compare_table(found, aqi_values),
+        color=int(color_hex.strip("#"), 16))
+    if errors:
+        embed.add_field(name="Nenalezeno", value="\n".join(errors), inline=False)
+    await ctx.send(embed=embed)
+
+
+def compare_table(results: list[WeatherReport], aqi_values: list[int | None]) -> str:
+    """Kompaktní tabulka (blok kódu) pro !porovnej: jeden řádek na město."""
+    width = max(len("Město"), *(len(result.city_name) for result in results))
+    rows = [f"{'Město':<{width}}  Teplota  Před rokem  Srážky  AQI  Stav"]
+    for result, aqi_value in zip(results, aqi_values):
+        current = result.current
+        hist_temp = result.historical.max_temp if result.historical else None
+        rows.append(
+            f"{result.city_name:<{width}}  {_format_value(current.temperature, '°C'):>7}  "
+            f"{_format_value(hist_temp, '°C'):>10}  {_format_value(current.precipitation, 'mm'):>6}  "
+            f"{aqi_value if aqi_value is not None else '-':>3}  {current.description}")
+    return "```\n" + "\n".join(rows) + "\n```"
+
+
+def _format_value(value: float | None, unit: str) -> str:
+    return f"{value:.1f}{unit}" if value is not None else "-"
+
+
 @bot.command(name="add")  # pridani mesta do monitoringu
 async def add_city(ctx, *, city: str):
-    city = city.strip().title()
-    if city not in monitored_cities:
-        monitored_cities.append(city)
-        save_cities()
+    # Ověření a sjednocení názvu ("plzen" -> "Plzeň"), z rejstříku obcí bez sítě
+    location = await weather_client.geocode(city.strip())
+    if location is None:
+        suggestions = weather_client.suggest_cities(city.strip())
+        hint = f" Nemysleli jste: {', '.join(suggestions)}?" if suggestions else ""
+        await ctx.send(f"❌ Město **{city.strip()}** se nepodařilo najít.{hint}")
+        return
+    city = location[2]
+    guild_id = ctx.guild.id if ctx.guild else None
+    if monitored_cities.add(city, guild_id):
         await ctx.send(f"✅ Město **{city}** přidáno do monitoringu.")
     else:
         await ctx.send(f"Město {city} už v seznamu je.")
@@ -191,10 +587,24 @@ async def add_city(ctx, *, city: str):
 @bot.command(name="remove")  # odebrani mesta z monitoringu
 async def remove_city(ctx, *, city: str):
     city = city.strip().title()
-    if city in monitored_cities:
-        monitored_cities.remove(city)
-        save_cities()
-        await ctx.send(f"🗑️ Město **{city}** odebráno.")
+    if city not in monitored_cities:
+        # Sledovaná města mají kanonické názvy ("plzen" -> "Plzeň")
+        location = await weather_client.geocode(city)
+        if location is not None:
+            city = location[2]
+    # Ruší se jen odběr tohoto serveru, město zmizí až bez odběratelů
+    guild_id = ctx.guild.id if ctx.guild else None
+    if monitored_cities.remove(city, guild_id):
+        if city in monitored_cities:
+            await ctx.send(f"🗑️ Město **{city}** odebráno z odběrů tohoto serveru "
+                           f"(dál ho sledují jiné servery).")
+        else:
+            city_scheduler.forget(city)
+            forecast_scanner.forget(city)
+            await ctx.send(f"🗑️ Město **{city}** odebráno.")
+    elif city in monitored_cities:
+        await ctx.send(f"Město {city} tento server neodebírá "
+                       f"(sledují ho jiné servery nebo se hlásí všem).")
     else:
         await ctx.send(f"Město {city} v seznamu není.")
 
@@ -205,6 +615,56 @@ async def list_cities(ctx):
         [f"• {c}" for c in monitored_cities]) or "Seznam je prázdný."
     await ctx.send(f"**Sledovaná města:**\n{cities_str}")
 
+
+@bot.command(name="stats")  # provozni statistiky bota
+async def stats(ctx):
+    """Latence a chyby API, úspěšnost cache, doba cyklu monitoru a odeslané alerty."""
+    uptime_min = int((time.time() - metrics.started_at) // 60)
+    lines = [f"**📊 Statistiky bota** (běží {uptime_min // 60} h {uptime_min % 60} min)"]
+
+    # a) API endpointy
+    errors = {}
+    for labels, value in metrics.counters("http_errors_total").items():
+        endpoint = dict(labels)["endpoint"]
+        errors[endpoint] = errors.get(endpoint, 0) + value
+    endpoint_lines = []
+    for labels, histogram in sorted(metrics.histograms("http_request_duration_seconds").items()):
+        endpoint = dict(labels)["endpoint"]
+        endpoint_lines.append(
+            f"`{endpoint}`: {histogram.count} req, p50 ≤ {histogram.quantile(0.5)} s, "
+            f"p95 ≤ {histogram.quantile(0.95)} s, chyby {int(errors.get(endpoint, 0))}")
+    lines.append("**API:**\n" + ("\n".join(endpoint_lines) or "Zatím žádné dotazy."))
+
+    # b) Cache
+    cache_lines = []
+    for name, cache_stats in (("Aktuální počasí", weather_client.current_cache.stats()),
+                              ("AQI", aqi_client.aqi_cache.stats()),
+                              ("Geokódování", weather_client.geocode_cache.stats())):
+        cache_lines.append(f"{name}: {hit_ratio(cache_stats) * 100:.0f} % zásahů "
+                           f"({cache_stats['size']} záznamů)")
+    prefetch_stats = prefetcher.stats()
+    cache_lines.append(f"Populární města: {prefetcher.hit_ratio() * 100:.0f} % dotazů z paměti "
+                       f"({prefetch_stats['entries']} měst), rozpočet "
+                       f"{prefetch_stats['budget_used']}/{prefetch_stats['budget']} požadavků za hodinu")
+    lines.append("**Cache:**\n" + "\n".join(cache_lines))
+
+    # c) Monitor a alerty
+    cycle = metrics.histogram("monitor_cycle_seconds")
+    cycle_count = cycle.count if cycle is not None else 0
+    if monitor_engine.last_cycle_duration is not None:
+        lines.append(f"**Monitor:** poslední cyklus {monitor_engine.last_cycle_duration:.2f} s "
+                     f"({monitor_engine.last_cycle_cities} měst), cyklů celkem {cycle_count}")
+    elif not leader_lease.is_leader:
+        lines.append("**Monitor:** data stahuje jiný proces bota (lídr), zde se jen rozesílají alerty.")
+    else:
+        lines.append("**Monitor:** zatím neproběhl žádný cyklus.")
+    lines.append(f"**Alerty:** {int(metrics.counter('alerts_detected_total'))} varování, "
+                 f"{int(metrics.counter('alert_messages_sent_total'))} odeslaných zpráv")
+    if startup_report.finished:
+        lines.append(f"**Start:** {startup_report.total:.2f} s ({startup_report.summary()})")
+
+    await ctx.send("\n".join(lines))
+
 # REAKTIVNÍ ČÁST: Původní příkaz pro AQI
 
 
@@ -218,8 +678,10 @@ if __name__ == "__main__":
     if DISCORD_TOKEN is None:
         print("CHYBA: Discord Token nebyl nalezen v souboru .env. Nelze spustit bota.")
     else:
+        # Neblokující logování pro celý bot (discord.py si vlastní handler nepřidá)
+        configure_logging(LOG_LEVEL)
         try:
-            bot.run(DISCORD_TOKEN)
+            bot.run(DISCORD_TOKEN, log_handler=None)
         except discord.errors.LoginFailure:
             print(
                 "CHYBA: Neplatný Discord Token. Zkontrolujte, zda je token správně zadán v .env.")
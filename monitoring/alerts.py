@@ -0,0 +1,134 @@
+import asyncio
+import logging
+
+import discord
+
+from api_clients.metrics import metrics
+from monitoring.state_store import ALL_GUILDS
+
+logger = logging.getLogger(__name__)
+
+
+class AlertChannelIndex:
+    """
+    Index kanálů #alert: guild.id -> textový kanál.
+    Staví se jednou při startu a dál se jen aktualizuje z událostí
+    Discordu (připojení/odchod ze serveru, vytvoření/smazání/přejmenování kanálu),
+    takže monitor nemusí při každém alertu procházet všechny servery a kanály.
+    """
+
+    CHANNEL_NAME = "alert"
+
+    def __init__(self):
+        self._channels: dict[int, discord.abc.Messageable] = {}
+
+    def rebuild(self, guilds):
+        """Postaví index znovu pro všechny servery bota."""
+        self._channels.clear()
+        for guild in guilds:
+            self.refresh_guild(guild)
+
+    def refresh_guild(self, guild):
+        """Znovu najde kanál #alert na jednom serveru."""
+        channel = discord.utils.get(guild.text_channels, name=self.CHANNEL_NAME)
+        if channel is not None:
+            self._channels[guild.id] = channel
+        else:
+            self._channels.pop(guild.id, None)
+
+    def remove_guild(self, guild):
+        self._channels.pop(guild.id, None)
+
+    def channels(self) -> list:
+        return list(self._channels.values())
+
+    def items(self) -> list[tuple[int, discord.abc.Messageable]]:
+        """Dvojice (guild.id, kanál) pro rozesílání podle odběrů."""
+        return list(self._channels.items())
+
+    def __len__(self):
+        return len(self._channels)
+
+
+class AlertDispatcher:
+    """
+    Rozesílá alerty jednoho cyklu monitoringu do indexovaných kanálů.
+    Server dostane varování jen pro města, která si přidal (odběry ze StateStore);
+    města s odběrem ALL_GUILDS (výchozí, převedená ze starého JSON, přidaná mimo
+    server) se hlásí všem serverům. Všechna varování cyklu se sloučí do jednoho embedu
+    na server a odesílají se souběžně (s omezením). Limity jednotlivých rout
+    Discord API (429) hlídá HTTP klient discord.py, semafor jen omezuje počet
+    souběžných odeslání.
+    """
+
+    MAX_CONCURRENT_SENDS = 10
+    # Limity Discordu pro embed
+    MAX_DESCRIPTION_LENGTH = 4096
+    MAX_EMBEDS_PER_MESSAGE = 10
+
+    def __init__(self, index: AlertChannelIndex):
+        self.index = index
+
+    async def dispatch(self, alerts: list[tuple[str, str]],
+                       subscriptions: dict[str, set[int]] | None = None) -> int:
+        """
+        Odešle varování (město, řádek) do kanálů #alert.
+        subscriptions: město -> id serverů, které si ho přidaly (nebo ALL_GUILDS);
+        město bez záznamu se hlásí všem.
+        Vrací počet úspěšných odeslání.
+        """
+        if not alerts:
+            return 0
+
+        subscriptions = subscriptions or {}
+        # Servery se stejnou sadou varování sdílí jednou sestavené embedy
+        targets: dict[tuple[str, ...], list] = {}
+        for guild_id, channel in self.index.items():
+            lines = tuple(line for city, line in alerts
+                          if self._receives(guild_id, subscriptions.get(city)))
+            if lines:
+                targets.setdefault(lines, []).append(channel)
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_SENDS)
+
+        async def send(channel, messages):
+            async with semaphore:
+                try:
+                    for message_embeds in messages:
+                        await channel.send(embeds=message_embeds)
+                    return True
+                except discord.HTTPException as e:
+                    logger.warning("Chyba při odesílání alertu do kanálu %s: %s", channel, e)
+                    metrics.inc("alert_send_errors_total")
+                    return False
+
+        sends = []
+        for lines, channels in targets.items():
+            embeds = self._build_embeds(lines)
+            messages = [embeds[i:i + self.MAX_EMBEDS_PER_MESSAGE]
+                        for i in range(0, len(embeds), self.MAX_EMBEDS_PER_MESSAGE)]
+            sends.extend(send(channel, messages) for channel in channels)
+        results = await asyncio.gather(*sends)
+        sent = sum(results)
+        metrics.inc("alerts_detected_total", len(alerts))
+        metrics.inc("alert_messages_sent_total", sent)
+        return sent
+
+    @staticmethod
+    def _receives(guild_id: int, subscribers: set[int] | None) -> bool:
+        return not subscribers or ALL_GUILDS in subscribers or guild_id in subscribers
+
+    def _build_embeds(self, alert_lines: tuple[str, ...]) -> list[discord.Embed]:
+        """Rozdělí řádky varování do embedů tak, aby nepřekročily limit popisu."""
+        descriptions = []
+        current = ""
+        for line in alert_lines:
+            if current and len(current) + 1 + len(line) > self.MAX_DESCRIPTION_LENGTH:
+                descriptions.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        descriptions.append(current)
+
+        return [discord.Embed(title="🚨 VAROVÁNÍ před nebezpečným počasím",
+                              description=description,
+                              color=0xff0000)
+                for description in descriptions]
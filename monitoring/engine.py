@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+
+from api_clients.air_quality_client import AirQualityClient
+from api_clients.metrics import metrics
+from api_clients.models import CurrentWeather, HourlyForecast
+from api_clients.weather_client import WeatherClient
+
+logger = logging.getLogger(__name__)
+
+
+class MonitorEngine:
+    """
+    Jeden průchod monitoringu přes všechna sledovaná města.
+    Města se dělí na dávky (WeatherClient.BATCH_SIZE) a dávky se zpracují
+    souběžně s omezením `concurrency`. Tempo požadavků na jednotlivé upstreamy
+    hlídají token buckety ve sdílené HTTP vrstvě, takže doba cyklu odpovídá
+    počtu měst / povolenému tempu - ne pevné pauze za každé město.
+    """
+
+    def __init__(self, weather_client: WeatherClient, aqi_client: AirQualityClient,
+                 concurrency: int = 4, climate_prefetch: int = 0):
+        """climate_prefetch: kolik nových klimatologických řad smí cyklus naplánovat ke stažení."""
+        self.weather_client = weather_client
+        self.aqi_client = aqi_client
+        self.concurrency = max(1, concurrency)
+        self.climate_prefetch = climate_prefetch
+        self.last_cycle_duration: float | None = None
+        self.last_cycle_cities = 0
+
+    async def run_cycle(self, cities: list[str],
+                        region_cities: list[str] | None = None) -> list[tuple[str, CurrentWeather]]:
+        """
+        Vrátí seznam (město, aktuální počasí) pro všechna města,
+        která se podařilo geokódovat a stáhnout.
+        Je-li zadáno region_cities, obnoví se souběžně i AQI snímek
+        pro celou oblast těchto měst (jeden snímek pro všechna sledovaná města).
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        async def locate(names):
+            # Geokódování po dávkách (po prvním průchodu jde vše z cache)
+            batches = self._batches(names)
+            located = await asyncio.gather(
+                *(bounded(self.weather_client.geocode_many(batch)) for batch in batches))
+            return [(city, location)
+                    for batch, locations in zip(batches, located)
+                    for city, location in zip(batch, locations) if location is not None]
+
+        async def refresh_region():
+            region = await locate(region_cities)
+            return await self.aqi_client.refresh_bulk(
+                [(lat, lon) for _, (lat, lon, _) in region])
+
+        # 1. Souřadnice kontrolovaných měst
+        resolved = await locate(cities)
+        coords = [(lat, lon) for _, (lat, lon, _) in resolved]
+
+        # Dlouhé řady pro klimatologii se stahují na pozadí, po několika za cyklus
+        if self.climate_prefetch:
+            self.weather_client.prefetch_climatology(coords, self.climate_prefetch)
+
+        # 2. Hromadné počasí po dávkách a souběžně případný AQI snímek oblasti.
+        # Místa s čerstvým počasím v cache (zahřátí po startu, prefetch, příkazy)
+        # se znovu nestahují.
+        cache = self.weather_client.current_cache
+        currents = [cache.peek(self.weather_client.coords_key(lat, lon)) for lat, lon in coords]
+        missing = [i for i, current in enumerate(currents) if current is None]
+        coord_batches = self._batches([coords[i] for i in missing])
+        weather = asyncio.gather(*(bounded(self.weather_client.get_current_many(batch))
+                                   for batch in coord_batches))
+        if region_cities is not None:
+            current_batches, _ = await asyncio.gather(weather, refresh_region())
+        else:
+            current_batches = await weather
+        fetched = [current for batch in current_batches for current in batch]
+        for i, current in zip(missing, fetched):
+            currents[i] = current
+
+        self.last_cycle_duration = time.perf_counter() - started
+        self.last_cycle_cities = len(cities)
+        metrics.observe("monitor_cycle_seconds", self.last_cycle_duration)
+        metrics.set_gauge("monitor_cities", len(cities))
+        logger.info("Monitor: %d měst zpracováno za %.2f s (souběžnost %d).",
+                    len(cities), self.last_cycle_duration, self.concurrency)
+
+        return [(city, current)
+                for (city, _), current in zip(resolved, currents) if current]
+
+    async def warm_up(self, cities: list[str]) -> int:
+        """
+        Zahřátí po startu: geokódování a aktuální počasí všech měst po dávkách
+        se stejnou omezenou souběžností jako cyklus monitoru. Výsledky zůstanou
+        v cache, takže první tik monitoru ani první příkazy na API nečekají.
+        Vrací počet měst, pro která se podařilo získat aktuální počasí.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        batches = self._batches(cities)
+        located = await asyncio.gather(
+            *(bounded(self.weather_client.geocode_many(batch)) for batch in batches))
+        coords = [(location[0], location[1])
+                  for locations in located for location in locations if location is not None]
+        current_batches = await asyncio.gather(
+            *(bounded(self.weather_client.get_current_many(batch)) for batch in self._batches(coords)))
+        return sum(1 for batch in current_batches for current in batch if current is not None)
+
+    async def fetch_forecasts(self, cities: list[str],
+                              hours: int) -> tuple[list[str], list[HourlyForecast | None]]:
+        """
+        Hodinová předpověď na `hours` hodin pro všechna města (hromadné dávky).
+        Vrací (města, předpovědi) jen pro města, která se podařilo geokódovat.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        batches = self._batches(cities)
+        located = await asyncio.gather(
+            *(bounded(self.weather_client.geocode_many(batch)) for batch in batches))
+        resolved = [(city, location)
+                    for batch, locations in zip(batches, located)
+                    for city, location in zip(batch, locations) if location is not None]
+
+        coord_batches = self._batches([(lat, lon) for _, (lat, lon, _) in resolved])
+        forecast_batches = await asyncio.gather(
+            *(bounded(self.weather_client.get_hourly_many(batch, hours)) for batch in coord_batches))
+        forecasts = [forecast for batch in forecast_batches for forecast in batch]
+        return [city for city, _ in resolved], forecasts
+
+    def _batches(self, items: list) -> list[list]:
+        size = self.weather_client.BATCH_SIZE
+        return [items[i:i + size] for i in range(0, len(items), size)]
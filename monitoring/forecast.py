@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from api_clients.models import HourlyForecast
+
+
+@dataclass(slots=True)
+class ForecastAlert:
+    """První nebezpečná hodina v předpovědi města."""
+
+    city: str
+    time: datetime
+    weather_code: int
+    precipitation: float
+    wind_gusts: float
+
+
+class ForecastScanner:
+    """
+    Včasná varování z hodinové předpovědi.
+    Předpovědi všech měst se složí do matic města × hodiny (WMO kód, srážky,
+    nárazy větru) a nebezpečné hodiny se najdou jedním vektorovým průchodem
+    místo podmínek pro každé město zvlášť.
+    Každé město se hlásí jen jednou za předpovědní okno (WINDOW_HOURS),
+    takže opakované skenování stejné bouřky nezpůsobí opakované varování.
+    """
+
+    # Prahy pro nebezpečné počasí bez ohledu na WMO kód
+    PRECIPITATION_THRESHOLD = 10.0  # mm/h
+    WIND_GUST_THRESHOLD = 75.0  # km/h
+    # Délka předpovědního okna pro deduplikaci varování (h)
+    WINDOW_HOURS = 3
+
+    def __init__(self, severe_codes, horizon_hours: int = 12):
+        # Tabulka kód -> nebezpečný (WMO kódy jsou 0-99); indexace polem místo np.isin,
+        # chybějící kód -1 padne na poslední položku (False)
+        self.severe_lookup = np.zeros(256, dtype=bool)
+        self.severe_lookup[list(severe_codes)] = True
+        self.horizon_hours = horizon_hours
+        # město -> začátek posledního nahlášeného okna
+        self._announced: dict[str, datetime] = {}
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def scan(self, cities: list[str], forecasts: list[HourlyForecast | None]) -> list[ForecastAlert]:
+        """
+        Vrátí nová včasná varování: pro každé město první nebezpečnou hodinu
+        v horizontu. Města bez předpovědi (None) se přeskočí.
+        """
+        rows = [(city, forecast) for city, forecast in zip(cities, forecasts) if forecast]
+        if not rows:
+            return []
+        codes, precipitation, gusts = self.build_arrays([forecast for _, forecast in rows])
+
+        # Jeden průchod přes celou matici: kód v seznamu nebezpečných nebo překročený práh
+        # (NaN v chybějících hodnotách porovnání nikdy nesplní)
+        with np.errstate(invalid="ignore"):
+            severe = (self.severe_lookup[np.clip(codes, -1, 255)]
+                      | (precipitation >= self.PRECIPITATION_THRESHOLD)
+                      | (gusts >= self.WIND_GUST_THRESHOLD))
+        hit_rows = np.flatnonzero(severe.any(axis=1))
+        first_hours = severe[hit_rows].argmax(axis=1)
+
+        alerts = []
+        for row, hour in zip(hit_rows.tolist(), first_hours.tolist()):
+            city, forecast = rows[row]
+            when = datetime.fromisoformat(forecast.time[hour])
+            if not self._announce(city, when):
+                continue
+            alerts.append(ForecastAlert(
+                city, when, int(codes[row, hour]),
+                float(precipitation[row, hour]), float(gusts[row, hour])))
+        return alerts
+
+    def build_arrays(self, forecasts: list[HourlyForecast]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Složí předpovědi do matic města × hodiny (horizon_hours sloupců).
+        Chybějící hodnoty: kód -1, srážky a nárazy NaN.
+        """
+        shape = (len(forecasts), self.horizon_hours)
+        codes = np.full(shape, -1, dtype=np.int16)
+        precipitation = np.full(shape, np.nan, dtype=np.float32)
+        gusts = np.full(shape, np.nan, dtype=np.float32)
+        for row, forecast in enumerate(forecasts):
+            self._fill(codes[row], forecast.weather_code, -1)
+            self._fill(precipitation[row], forecast.precipitation, np.nan)
+            self._fill(gusts[row], forecast.wind_gusts, np.nan)
+        return codes, precipitation, gusts
+
+    def forget(self, city: str):
+        self._announced.pop(city, None)
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _fill(self, target: np.ndarray, values: list, missing):
+        values = values[:self.horizon_hours]
+        target[:len(values)] = [missing if value is None else value for value in values]
+
+    def _announce(self, city: str, when: datetime) -> bool:
+        """Zaznamená okno varování; vrací False, pokud už bylo město v tomto okně nahlášeno."""
+        window = when.replace(hour=when.hour - when.hour % self.WINDOW_HOURS,
+                              minute=0, second=0, microsecond=0)
+        if self._announced.get(city) == window:
+            return False
+        self._announced[city] = window
+        return True
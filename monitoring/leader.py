@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class LeaderLease:
+    """
+    Volba jediného lídra mezi procesy bota (shardy) přes sdílený SQLite soubor.
+    Lídr drží pronájem (lease) s expirací a v každém tiku ho obnovuje.
+    Když lídr spadne, pronájem vyprší a převezme ho jiný proces.
+    Monitoring (stahování dat) tak běží jen v jednom procesu.
+    Zámek souboru může čekat až 5 s, bot proto volá metody ve vlákně
+    (asyncio.to_thread) - přístup k databázi hlídá zámek.
+    """
+
+    def __init__(self, db_path: str, holder_id: str, ttl: float = 180, name: str = "monitor"):
+        self.holder_id = holder_id
+        self.ttl = ttl
+        self.name = name
+        # isolation_level=None: transakce řídíme sami (BEGIN IMMEDIATE)
+        self._db = sqlite3.connect(db_path, isolation_level=None, timeout=5,
+                                   check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS lease ("
+            " name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)")
+        self.is_leader = False
+
+    def try_acquire(self, now: float | None = None) -> bool:
+        """Získá nebo obnoví pronájem. Vrací True, pokud je tento proces lídrem."""
+        now = time.time() if now is None else now
+        with self._lock:
+            # BEGIN IMMEDIATE zamkne databázi pro zápis - čtení a zápis proběhnou atomicky
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT holder, expires_at FROM lease WHERE name = ?", (self.name,)).fetchone()
+                if row is None or row[0] == self.holder_id or row[1] < now:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO lease VALUES (?, ?, ?)",
+                        (self.name, self.holder_id, now + self.ttl))
+                    self.is_leader = True
+                else:
+                    self.is_leader = False
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.is_leader
+
+    def release(self):
+        """Uvolní pronájem (při řádném vypnutí) - jiný proces převezme hned."""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM lease WHERE name = ? AND holder = ?", (self.name, self.holder_id))
+        self.is_leader = False
+
+    def close(self):
+        self._db.close()
+
+
+class AlertFeed:
+    """
+    Kanál alertů od lídra ke všem shardům (tabulka ve sdíleném SQLite souboru).
+    Lídr zapisuje dávky alertů, každý proces si čte nové dávky od posledního
+    přečteného pořadového čísla a rozešle je do kanálů svých serverů.
+    Metody smí běžet ve vlákně (asyncio.to_thread), přístup k databázi hlídá zámek.
+    """
+
+    RETENTION = 24 * 60 * 60  # s
+
+    def __init__(self, db_path: str):
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS alert_feed ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " created_at REAL NOT NULL, payload TEXT NOT NULL)")
+        # Nový proces nepřehrává staré alerty - čte až to, co přibude po startu
+        self._last_seq = self._db.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM alert_feed").fetchone()[0]
+
+    def publish(self, alerts: list[tuple[str, str]]):
+        """Zveřejní dávku alertů (město, řádek) jednoho cyklu (volá jen lídr)."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO alert_feed (created_at, payload) VALUES (?, ?)",
+                (now, json.dumps(alerts, ensure_ascii=False)))
+            self._db.execute(
+                "DELETE FROM alert_feed WHERE created_at < ?", (now - self.RETENTION,))
+
+    def fetch_new(self) -> list[list[tuple[str, str]]]:
+        """Vrátí dávky alertů, které tento proces ještě nezpracoval."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, payload FROM alert_feed WHERE seq > ? ORDER BY seq",
+                (self._last_seq,)).fetchall()
+            if rows:
+                self._last_seq = rows[-1][0]
+        return [[tuple(alert) for alert in json.loads(payload)] for _, payload in rows]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from api_clients.air_quality_client import AirQualityClient
+from api_clients.geocode_cache import GeocodeCache
+from api_clients.metrics import metrics
+from api_clients.models import WeatherReport
+from api_clients.weather_client import WeatherClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PrefetchEntry:
+    """Hotová data pro !pocasi jednoho města v paměti."""
+
+    weather: WeatherReport
+    aqi: int | None
+    fetched_at: float
+
+
+class UsagePrefetcher:
+    """
+    Drží v paměti hotová data pro !pocasi u nejčastěji dotazovaných měst.
+    Popularita města je klesající čítač: každý dotaz přičte 1 a skóre
+    exponenciálně klesá s poločasem HALF_LIFE - města, na která se lidé
+    přestanou ptát, z top-K postupně vypadnou.
+    Obnova na pozadí stáhne pro top-K měst aktuální počasí (jeden hromadný
+    dotaz na dávku), historické srovnání a AQI. Počet upstream požadavků
+    za poslední hodinu hlídá rozpočet - co se do něj nevejde, počká
+    na další obnovu (a !pocasi pro taková města jde klasicky přes API).
+    """
+
+    # Poločas popularity: dotaz starý HALF_LIFE váží polovinu čerstvého
+    HALF_LIFE = 6 * 60 * 60  # s
+    # Pod tímto skóre (nebo nad MAX_TRACKED měst) se město přestane sledovat
+    MIN_SCORE = 0.05
+    MAX_TRACKED = 5000
+    # Okno, ve kterém platí rozpočet upstream požadavků
+    BUDGET_WINDOW = 60 * 60  # s
+
+    def __init__(self, weather_client: WeatherClient, aqi_client: AirQualityClient,
+                 top_k: int = 20, budget_per_hour: int = 600,
+                 refresh_age: float = WeatherClient.CURRENT_TTL,
+                 max_age: float = WeatherClient.CURRENT_STALE_TTL):
+        """
+        refresh_age: od jakého stáří se záznam při obnově stahuje znovu,
+        max_age: nejstarší záznam, který se ještě smí vrátit uživateli.
+        """
+        self.weather_client = weather_client
+        self.aqi_client = aqi_client
+        self.top_k = top_k
+        self.budget_per_hour = budget_per_hour
+        self.refresh_age = refresh_age
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._scores: dict[str, tuple[float, float]] = {}  # klíč -> (skóre, čas posledního dotazu)
+        self._entries: dict[str, PrefetchEntry] = {}
+        self._top_keys: set[str] = set()
+        self._spent: deque[tuple[float, int]] = deque()  # (čas, počet požadavků)
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def record(self, city: str, now: float | None = None):
+        """Započítá dotaz na město do jeho popularity."""
+        now = time.time() if now is None else now
+        key = GeocodeCache.normalize(city)
+        self._scores[key] = (self._score(key, now) + 1, now)
+        if len(self._scores) > self.MAX_TRACKED:
+            self._prune(now)
+
+    def top(self, now: float | None = None) -> list[str]:
+        """Nejpopulárnější města (klíče), nejvýše top_k, od nejčastějšího."""
+        now = time.time() if now is None else now
+        ranked = sorted(self._scores, key=lambda key: self._score(key, now), reverse=True)
+        return ranked[:self.top_k]
+
+    def get(self, city: str, now: float | None = None) -> tuple[WeatherReport, int | None] | None:
+        """
+        Data pro !pocasi z paměti: (výsledek get_weather_data, AQI),
+        nebo None, pokud město v paměti není nebo je záznam příliš starý.
+        """
+        now = time.time() if now is None else now
+        entry = self._entries.get(GeocodeCache.normalize(city))
+        if entry is None or now - entry.fetched_at > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.weather, entry.aqi
+
+    def put(self, city: str, weather: WeatherReport, aqi: int | None, now: float | None = None):
+        """Uloží data stažená dotazem uživatele - jen pro města v top-K (zdarma, bez API)."""
+        key = GeocodeCache.normalize(city)
+        if key in self._top_keys:
+            self._entries[key] = PrefetchEntry(weather, aqi, time.time() if now is None else now)
+
+    def budget_used(self, now: float | None = None) -> int:
+        """Počet upstream požadavků obnovy za posledních BUDGET_WINDOW sekund."""
+        now = time.time() if now is None else now
+        while self._spent and now - self._spent[0][0] >= self.BUDGET_WINDOW:
+            self._spent.popleft()
+        return sum(cost for _, cost in self._spent)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "budget_used": self.budget_used(),
+            "budget": self.budget_per_hour,
+        }
+
+    async def refresh(self, now: float | None = None) -> int:
+        """
+        Obnoví zastaralé záznamy top-K měst v rámci rozpočtu.
+        Vrací počet obnovených měst.
+        """
+        now = time.time() if now is None else now
+        self._prune(now)
+        top = self.top(now)
+        self._top_keys = set(top)
+        for key in list(self._entries):
+            if key not in self._top_keys:
+                del self._entries[key]
+
+        stale = [key for key in top
+                 if key not in self._entries
+                 or now - self._entries[key].fetched_at >= self.refresh_age]
+        if not stale:
+            return 0
+
+        # Populární města už jsou v cache geokódování - bez API
+        locations = await self.weather_client.geocode_many(stale)
+        selected, cost = self._within_budget(
+            [(key, location) for key, location in zip(stale, locations) if location is not None],
+            self.budget_per_hour - self.budget_used(now))
+        if not selected:
+            metrics.inc("prefetch_budget_exhausted_total")
+            return 0
+
+        # 1. Aktuální počasí hromadně - zahřeje cache, get_weather_data ho pak vezme odtud
+        await self.weather_client.get_current_many([(lat, lon) for _, (lat, lon, _) in selected])
+
+        # 2. Celá data pro !pocasi (historie z archivu) a AQI, souběžně za všechna města
+        async def load(key, location):
+            lat, lon, name = location
+            weather, _ = await self.weather_client.get_weather_data(name)
+            if weather is None:
+                return
+            aqi = self.aqi_client.get_snapshot_aqi(lat, lon)
+            if aqi is None:
+                aqi = await self.aqi_client.get_current_aqi(name)
+            self._entries[key] = PrefetchEntry(weather, aqi, now)
+
+        await asyncio.gather(*(load(key, location) for key, location in selected))
+        self._spent.append((now, cost))
+        metrics.inc("prefetch_upstream_requests_total", cost)
+        logger.debug("Prefetch: obnoveno %d měst (%d požadavků).", len(selected), cost)
+        return len(selected)
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _score(self, key: str, now: float) -> float:
+        score, last = self._scores.get(key, (0.0, now))
+        return score * 0.5 ** ((now - last) / self.HALF_LIFE)
+
+    def _prune(self, now: float):
+        """
+        Zapomene města s nízkým skóre; při přeplnění i ta nejméně populární
+        (s rezervou, aby se řazení neopakovalo při každém dalším dotazu).
+        """
+        ranked = sorted(self._scores, key=lambda key: self._score(key, now), reverse=True)
+        limit = self.MAX_TRACKED * 3 // 4
+        keep = [key for key in ranked[:limit] if self._score(key, now) >= self.MIN_SCORE]
+        self._scores = {key: self._scores[key] for key in keep}
+
+    def _within_budget(self, candidates: list[tuple[str, tuple]], remaining: int):
+        """
+        Vybere od nejpopulárnějšího tolik měst, kolik unese zbývající rozpočet.
+        Odhad ceny: jeden hromadný dotaz na dávku BATCH_SIZE měst,
+        AQI dotaz, pokud město nepokrývá hromadný snímek, a stažení archivu
+        pro města, která dosud nemají historické srovnání.
+        """
+        selected, cost = [], 0
+        for key, location in candidates:
+            city_cost = 1 if len(selected) % self.weather_client.BATCH_SIZE == 0 else 0
+            if self.aqi_client.get_snapshot_aqi(location[0], location[1]) is None:
+                city_cost += 1
+            entry = self._entries.get(key)
+            if entry is None or entry.weather.historical is None:
+                city_cost += 1
+            if cost + city_cost > remaining:
+                break
+            selected.append((key, location))
+            cost += city_cost
+        return selected, cost
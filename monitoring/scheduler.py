@@ -0,0 +1,88 @@
+import time
+import zlib
+
+
+class CityScheduler:
+    """
+    Rozvrh kontrol sledovaných měst.
+    Interval monitoringu je rozdělený na sloty (SLOT_SECONDS) a každé město
+    má podle hashe svého jména pevný slot - kontroly se tak rozprostřou
+    rovnoměrně přes celý interval místo jedné špičky každých 30 minut.
+    Frekvence kontrol se přizpůsobuje počasí:
+    - při nebezpečném jevu (aktuálním nebo předpovězeném) častěji,
+    - po několika klidných kontrolách za sebou méně často.
+    """
+
+    def __init__(self, interval: float = 30 * 60, slot_seconds: float = 60,
+                 severe_factor: float = 0.25, calm_factor: float = 2.0, calm_after: int = 3):
+        self.interval = interval
+        self.slot_seconds = slot_seconds
+        self.slot_count = max(1, int(interval // slot_seconds))
+        self.severe_factor = severe_factor
+        self.calm_factor = calm_factor
+        self.calm_after = calm_after
+        self._next_due: dict[str, float] = {}
+        self._calm_streak: dict[str, int] = {}
+
+    def slot_of(self, city: str) -> int:
+        """Pevný slot města v rámci intervalu (stabilní i po restartu)."""
+        return zlib.crc32(city.casefold().encode("utf-8")) % self.slot_count
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def due(self, cities, now: float | None = None) -> list[str]:
+        """
+        Města, která jsou na řadě. Dosud nekontrolovaná města jsou na řadě
+        hned (po startu chceme znát aktuální stav), pak už jen ve svém slotu.
+        """
+        now = time.time() if now is None else now
+        return [city for city in cities if self._next_due.get(city, now) <= now]
+
+    def record(self, city: str, severe: bool, now: float | None = None):
+        """Zaznamená provedenou kontrolu a naplánuje další podle počasí."""
+        now = time.time() if now is None else now
+
+        if severe:
+            self._calm_streak[city] = 0
+            period = self.interval * self.severe_factor
+        else:
+            streak = self._calm_streak.get(city, 0) + 1
+            self._calm_streak[city] = streak
+            period = self.interval * (self.calm_factor if streak > self.calm_after else 1)
+
+        # Další termín se počítá od začátku slotu, ne od konce kontroly - jinak by
+        # doba síťových volání posouvala město každý cyklus o slot dál.
+        # První kontrola (mimo rozvrh) tím město zároveň zarovná do jeho slotu.
+        self._next_due[city] = self._next_slot_time(city, now, period)
+
+    def mark_severe_forecast(self, city: str, now: float | None = None):
+        """Předpověď hlásí nebezpečný jev - město se zkontroluje nejpozději za zkrácený interval."""
+        now = time.time() if now is None else now
+        self._calm_streak[city] = 0
+        soon = now + self.interval * self.severe_factor
+        self._next_due[city] = min(self._next_due.get(city, soon), soon)
+
+    def forget(self, city: str):
+        self._next_due.pop(city, None)
+        self._calm_streak.pop(city, None)
+
+    def next_due(self, city: str) -> float | None:
+        return self._next_due.get(city)
+
+    # ----------------------------------------------------
+    # PRIVÁTNÍ METODY
+    # ----------------------------------------------------
+
+    def _next_slot_time(self, city: str, now: float, period: float | None = None) -> float:
+        """
+        Termín o `period` (výchozí interval) po posledním začátku slotu města.
+        Zkrácená perioda má sloty i uvnitř intervalu (slot + k * perioda),
+        takže termín je vždy v budoucnu a město zůstává ve své fázi.
+        """
+        period = self.interval if period is None else period
+        step = min(period, self.interval)
+        offset = self.slot_of(city) * self.slot_seconds
+        slot_start = now - (now - offset) % step
+        return slot_start + period
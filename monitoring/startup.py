@@ -0,0 +1,48 @@
+import logging
+import time
+
+from api_clients.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """
+    Časy jednotlivých fází startu bota (import, inicializace, přihlášení, zahřátí).
+    Každá fáze trvá od konce předchozí. Po dokončení startu se report
+    zaloguje a fáze se zapíší jako metriky startup_phase_seconds.
+    """
+
+    def __init__(self, started: float | None = None):
+        """started: time.perf_counter() na začátku procesu (jinak okamžik vytvoření)."""
+        self.started = time.perf_counter() if started is None else started
+        self.phases: dict[str, float] = {}
+        self.finished = False
+        self._last = self.started
+
+    # ----------------------------------------------------
+    # VEŘEJNÉ METODY
+    # ----------------------------------------------------
+
+    def mark(self, phase: str) -> float:
+        """Ukončí fázi a vrátí její délku v sekundách."""
+        now = time.perf_counter()
+        duration = now - self._last
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+        self._last = now
+        return duration
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def summary(self) -> str:
+        return ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in self.phases.items())
+
+    def finish(self):
+        """Start je hotový: zaloguje report a zapíše metriky."""
+        self.finished = True
+        for phase, seconds in self.phases.items():
+            metrics.set_gauge("startup_phase_seconds", round(seconds, 3), phase=phase)
+        metrics.set_gauge("startup_seconds", round(self.total, 3))
+        logger.info("Start bota za %.2f s (%s).", self.total, self.summary())
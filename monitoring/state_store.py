@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Odběr "všechny servery": města přidaná mimo server (výchozí, převedená ze starého
+# JSON, příkaz v soukromé zprávě) se hlásí všem. Discord ID nikdy není 0.
+ALL_GUILDS = 0
+
+
+class StateStore:
+    """
+    Perzistentní stav bota v SQLite (režim WAL).
+    Obsahuje sledovaná města, odběry jednotlivých serverů a stav
+    posledních alertů (ochrana proti opakovaným alertům přežije restart).
+    Město se sleduje, dokud ho odebírá aspoň jeden server (nebo ALL_GUILDS).
+    Každá změna je samostatná malá transakce - nepřepisuje se celý soubor.
+    """
+
+    DEFAULT_CITIES = ["Praha"]
+
+    def __init__(self, db_path: str, legacy_json_path: str | None = None):
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                " key TEXT PRIMARY KEY, value TEXT);"
+                "CREATE TABLE IF NOT EXISTS cities ("
+                " position INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " name TEXT NOT NULL UNIQUE,"
+                " added_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                " guild_id INTEGER NOT NULL, city TEXT NOT NULL,"
+                " PRIMARY KEY (guild_id, city));"
+                "CREATE INDEX IF NOT EXISTS subscriptions_city ON subscriptions (city);"
+                "CREATE TABLE IF NOT EXISTS alert_state ("
+                " city TEXT PRIMARY KEY, weather_code INTEGER,"
+                " updated_at REAL NOT NULL);"
+            )
+        self._initialize(legacy_json_path)
+        self._backfill_broadcast()
+
+        self.alerts = AlertStates(self._db)
+        self.cities = MonitoredCities(self._db, self.alerts)
+
+    def _initialize(self, legacy_json_path: str | None):
+        """Jednorázová migrace z monitored_cities.json (nebo výchozí seznam měst)."""
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'initialized'").fetchone():
+            return
+
+        cities = self.DEFAULT_CITIES
+        migrated = legacy_json_path is not None and os.path.exists(legacy_json_path)
+        if migrated:
+            with open(legacy_json_path, "r", encoding="utf-8") as f:
+                cities = json.load(f)
+
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO cities (name, added_at) VALUES (?, ?)",
+                [(city, now) for city in cities])
+            self._db.execute("INSERT INTO meta VALUES ('initialized', ?)", (str(now),))
+
+        if migrated:
+            # Původní soubor ponecháme jako zálohu, ale už se nenačítá
+            os.replace(legacy_json_path, legacy_json_path + ".migrated")
+            logger.info("Stav: %d měst převedeno z %s.", len(cities), legacy_json_path)
+
+    def _backfill_broadcast(self):
+        """
+        Města bez jediného odběru (výchozí, převedená z JSON, databáze ze starší
+        verze bota) dostanou odběr ALL_GUILDS - zůstanou hlášená všem serverům
+        i poté, co si je některý server přidá sám.
+        """
+        with self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO subscriptions (guild_id, city)"
+                " SELECT ?, name FROM cities"
+                " WHERE name NOT IN (SELECT city FROM subscriptions)", (ALL_GUILDS,))
+
+    def close(self):
+        self._db.close()
+
+
+class MonitoredCities:
+    """
+    Seznam sledovaných měst. Čtení jde z paměti (množina pro O(1) dotaz
+    na členství), zápisy jdou rovnou do databáze jako malé transakce.
+    """
+
+    def __init__(self, db: sqlite3.Connection, alerts: "AlertStates"):
+        self._db = db
+        self._alerts = alerts
+        self.reload()
+
+    def reload(self):
+        """Znovu načte seznam z databáze (mohl ho změnit jiný proces bota)."""
+        self._names = [row[0] for row in self._db.execute(
+            "SELECT name FROM cities ORDER BY position")]
+        self._index = set(self._names)
+
+    def __contains__(self, city: str) -> bool:
+        return city in self._index
+
+    def __iter__(self):
+        return iter(list(self._names))
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, city: str, guild_id: int | None = None) -> bool:
+        """
+        Přidá odběr města serverem (bez serveru = ALL_GUILDS), město případně
+        začne sledovat. Vrací False, pokud už město bylo sledováno.
+        """
+        subscriber = ALL_GUILDS if guild_id is None else guild_id
+        if city in self._index:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO subscriptions VALUES (?, ?)", (subscriber, city))
+            return False
+
+        with self._db:
+            # OR IGNORE: město mezitím mohl přidat jiný shard
+            added = self._db.execute(
+                "INSERT OR IGNORE INTO cities (name, added_at) VALUES (?, ?)",
+                (city, time.time())).rowcount > 0
+            self._db.execute(
+                "INSERT OR IGNORE INTO subscriptions VALUES (?, ?)", (subscriber, city))
+        self._names.append(city)
+        self._index.add(city)
+        return added
+
+    def remove(self, city: str, guild_id: int | None = None) -> bool:
+        """
+        Zruší odběr města serverem (bez serveru = ALL_GUILDS). Město i se stavem
+        alertů se smaže, až ho neodebírá nikdo. Vrací False, pokud odběr neexistoval.
+        """
+        if city not in self._index:
+            return False
+
+        subscriber = ALL_GUILDS if guild_id is None else guild_id
+        with self._db:
+            removed = self._db.execute(
+                "DELETE FROM subscriptions WHERE guild_id = ? AND city = ?",
+                (subscriber, city)).rowcount > 0
+            remaining = self._db.execute(
+                "SELECT 1 FROM subscriptions WHERE city = ? LIMIT 1", (city,)).fetchone()
+            if removed and remaining is None:
+                self._db.execute("DELETE FROM cities WHERE name = ?", (city,))
+                # Stav alertů ve stejné transakci - vnořené "with" commitne až po tomto posledním příkazu
+                self._alerts.discard(city)
+        if removed and remaining is None:
+            self._names.remove(city)
+            self._index.discard(city)
+        return removed
+
+    def subscribers(self, city: str) -> list[int]:
+        """Servery, které si město přidaly, případně ALL_GUILDS (indexovaný dotaz)."""
+        return [row[0] for row in self._db.execute(
+            "SELECT guild_id FROM subscriptions WHERE city = ?", (city,))]
+
+
+class AlertStates:
+    """
+    Poslední nahlášený WMO kód pro každé město (město -> kód).
+    Chová se jako slovník, každý zápis se hned uloží do databáze.
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+        self.reload()
+
+    def reload(self):
+        """Znovu načte stav z databáze (např. po převzetí monitoringu jiným procesem)."""
+        self._codes = dict(self._db.execute("SELECT city, weather_code FROM alert_state"))
+
+    def get(self, city: str, default=None):
+        return self._codes.get(city, default)
+
+    def __getitem__(self, city: str):
+        return self._codes[city]
+
+    def __contains__(self, city: str) -> bool:
+        return city in self._codes
+
+    def discard(self, city: str):
+        """Zapomene stav města v paměti i v databázi (např. po odebrání z monitoringu)."""
+        with self._db:
+            self._db.execute("DELETE FROM alert_state WHERE city = ?", (city,))
+        self._codes.pop(city, None)
+
+    def __setitem__(self, city: str, weather_code: int | None):
+        if city in self._codes and self._codes[city] == weather_code:
+            return
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO alert_state VALUES (?, ?, ?)",
+                (city, weather_code, time.time()))
+        self._codes[city] = weather_code
@@ -0,0 +1,30 @@
+# tests/conftest.py
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_bot_files(tmp_path_factory):
+    """
+    Stav bota, cache a metriky v dočasném adresáři - testy, které importují main,
+    nesmí zapisovat do produkčních souborů v pracovním adresáři.
+    """
+    root = tmp_path_factory.mktemp("bot")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("BOT_STATE_FILE", str(root / "bot_state.db"))
+        mp.setenv("BOT_COORDINATION_FILE", str(root / "bot_coordination.db"))
+        mp.setenv("MONITORED_CITIES_FILE", str(root / "monitored_cities.json"))
+        mp.setenv("GEOCODE_CACHE_FILE", str(root / "geocode_cache.db"))
+        mp.setenv("HISTORICAL_STORE_FILE", str(root / "era5_archive.db"))
+        mp.setenv("CLIMATOLOGY_DIR", str(root / "climatology"))
+        mp.setenv("GAZETTEER_FILE", str(root / "gazetteer.npz"))
+        mp.setenv("METRICS_FILE", str(root / "metrics.prom"))
+        yield root
+
+
+@pytest.fixture
+def bot_main(isolated_bot_files):
+    """Modul main s inicializovanými službami (stav, cache, klienti) nad dočasnými soubory."""
+    import main
+    main.init_services()
+    return main
@@ -0,0 +1,75 @@
+# tests/test_benchmarks.py
+
+import asyncio
+
+import pytest
+
+from api_clients.air_quality_client import AirQualityClient
+from api_clients.http_session import HttpSessionManager
+from api_clients.weather_client import WeatherClient
+from benchmarks.run_benchmarks import percentile
+from benchmarks.stub_server import StubUpstreams
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_stub_upstreams_serve_real_client_calls():
+    """Klienti proti lokálnímu stubu projdou celou HTTP cestou bez sítě."""
+    stub = StubUpstreams(latency=0, jitter=0)
+    await stub.start()
+    http = HttpSessionManager(rate_limits={})
+    weather = WeatherClient(http)
+    aqi = AirQualityClient(http)
+    stub.configure_clients(weather, aqi)
+    try:
+        result, error = await weather.get_weather_data("Praha")
+        currents = await weather.get_current_many([(50.0, 14.0), (49.0, 16.0)])
+        aqi_value = await aqi.get_current_aqi("praha")
+        stations = await aqi.refresh_bulk([(50.0, 14.0)])
+    finally:
+        await http.close()
+        await stub.stop()
+
+    assert error is None
+    assert result.city_name == "Praha"
+    assert result.historical.max_temp is not None
+    assert all(current is not None for current in currents)
+    assert isinstance(aqi_value, int)
+    assert stations > 0
+    assert stub.request_counts["/v1/forecast"] == 2
+
+
+@pytest.mark.asyncio
+async def test_load_simulator_measures_latency_and_loop_stalls():
+    """Simulátor změří latenci do ctx.send a odhalí blokující kód na event loopu."""
+    import time
+    from types import SimpleNamespace
+    from benchmarks.load_simulator import LoopLagMonitor, build_plan, simulate
+
+    async def pocasi(ctx, *, city):
+        await ctx.send(f"Počasí pro {city}")
+
+    async def list_cities(ctx):
+        time.sleep(0.08)  # blokující I/O na event loopu
+        await ctx.send("Sledovaná města")
+
+    bot_main = SimpleNamespace(pocasi=SimpleNamespace(callback=pocasi),
+                               list_cities=SimpleNamespace(callback=list_cities))
+    plan = build_plan({"pocasi": 3, "list": 1}, 20, cities=5, seed=1)
+
+    lag = LoopLagMonitor(interval=0.005, stall_threshold=0.05)
+    lag.start()
+    await asyncio.sleep(0.01)  # měření běží dřív, než přijdou příkazy
+    latencies, errors, _ = await simulate(bot_main, plan, concurrency=5, guilds=2)
+    await lag.stop()
+
+    assert errors == {}
+    assert sum(len(values) for values in latencies.values()) == 20
+    assert max(latencies["list"]) >= 0.08
+    assert lag.report()["stalls"] >= 1
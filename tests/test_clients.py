@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch, AsyncMock
 
 # Důležité: Import vašich tříd
 from api_clients.air_quality_client import AirQualityClient
+from api_clients.models import CurrentWeather, HistoricalWeather, Station, WeatherReport
 from api_clients.weather_client import WeatherClient
 
 # Je nutné pro asynchronní testy v Pytestu
@@ -31,15 +32,27 @@ def test_aqi_status_spatna():
     assert status == "Nevhodná"
     assert color == "#ff0000"  # Ověříme i barvu podle Vašeho kódu
 
+
+def test_weather_models_use_slots_and_lookup():
+    """Výsledky jsou kompaktní (bez __dict__) a popis jde z předpočítané tabulky WMO."""
+    current = CurrentWeather(temperature=21.5, precipitation=0.4, weather_code=63)
+    assert not hasattr(current, "__dict__")
+    assert current.description == "Déšť 🌧️"
+    assert CurrentWeather(10, 0.0, 42).description == "Neznámý jev ❓"
+
+    report = WeatherReport("Praha", 50.08, 14.43, current, HistoricalWeather("2024-06-01", 19.0), None)
+    assert not hasattr(report, "__dict__")
+    assert report.current.weather_code == 63
+
+
 # --- B) ASYNCHRONNÍ TEST S MOCKINGEM (Simulace Úspěšného API Toku) ---
 
 
 # 1. Definice simulovaných dat pro všechny volané interní metody
 MOCK_GEOCODE_SUCCESS = (50.08, 14.43, "MockMěsto")  # lat, lon, validated_name
-MOCK_CURRENT_DATA_SUCCESS = {"temperature": 12.5,
-                             "precipitation": 0.0, "description": "Polojasno ☁️"}
+MOCK_CURRENT_DATA_SUCCESS = CurrentWeather(temperature=12.5, precipitation=0.0, weather_code=2)
 # Simulované historické srovnání
-MOCK_HISTORICAL_DATA_SUCCESS = {"date": "2020-12-13", "max_temp": 15.0}
+MOCK_HISTORICAL_DATA_SUCCESS = HistoricalWeather(date="2020-12-13", max_temp=15.0)
 
 
 @pytest.mark.asyncio
@@ -61,10 +74,11 @@ async def test_full_weather_data_success(mock_geocode, mock_current, mock_histor
     assert error is None
     assert result is not None
 
-    # 2. Ověření, že se data správně poskládala do finálního slovníku
-    assert result['city_name'] == "MockMěsto"
-    assert result['current']['temperature'] == 12.5
-    assert result['historical']['max_temp'] == 15.0
+    # 2. Ověření, že se data správně poskládala do výsledku
+    assert result.city_name == "MockMěsto"
+    assert result.current.temperature == 12.5
+    assert result.current.description == "Polojasno / Zataženo ☁️"
+    assert result.historical.max_temp == 15.0
 
     # 3. Ověření, že byly skutečně volány interní metody
     mock_geocode.assert_called_once()
@@ -87,18 +101,624 @@ async def test_full_weather_data_geocode_failure(mock_geocode):
 
 
 @pytest.mark.asyncio
-async def test_monitor_deduplication():
+async def test_monitor_deduplication(bot_main):
     # Simulujeme, že v Praze už jedna bouřka (95) byla nahlášena
-    from main import last_alerts, weather_monitor_task
-    last_alerts["Praha"] = 95
+    from api_clients.metrics import metrics
+    bot_main.last_alerts["Praha"] = 95
+    tick_errors = metrics.counter("monitor_tick_errors_total")
 
     # Nastavíme mock data, která vrací stejný kód (95)
-    mock_data = {"current": {"weather_code": 95,
-                             "temperature": 15}, "city_name": "Praha"}
+    mock_current = CurrentWeather(temperature=15, precipitation=0.0, weather_code=95)
 
-    with patch('api_clients.weather_client.WeatherClient.get_weather_data', AsyncMock(return_value=(mock_data, None))):
-        with patch('discord.utils.get') as mock_get_channel:
+    with patch('api_clients.weather_client.WeatherClient.geocode_many', AsyncMock(return_value=[MOCK_GEOCODE_SUCCESS])), \
+            patch('api_clients.weather_client.WeatherClient.get_current_many', AsyncMock(return_value=[mock_current])), \
+            patch('api_clients.weather_client.WeatherClient.get_hourly_many', AsyncMock(return_value=[None])), \
+            patch('api_clients.air_quality_client.AirQualityClient.refresh_bulk', AsyncMock(return_value=0)), \
+            patch('main.monitored_cities', ["Praha"]), \
+            patch('main.leader_lease.try_acquire', return_value=True):
+        with patch('discord.utils.get') as mock_get_channel, \
+                patch('main.alert_dispatcher.dispatch', AsyncMock()) as mock_dispatch:
             # Spustíme jeden průchod monitoru
-            await weather_monitor_task.coro()
+            await bot_main.weather_monitor_task.coro()
             # Ověříme, že kanál pro alerty nebyl získán (protože by neměl být odeslán žádný alert)
             assert mock_get_channel.called is False
+            assert mock_dispatch.called is False
+    # Tik doběhl bez chyby (výjimku by tik jen zalogoval)
+    assert metrics.counter("monitor_tick_errors_total") == tick_errors
+
+
+# --- C) SDÍLENÁ HTTP VRSTVA ---
+
+
+@pytest.mark.asyncio
+async def test_http_session_is_shared_and_closed():
+    """Oba klienti používají stejný pool spojení, který se po close() uzavře."""
+    from api_clients.http_session import HttpSessionManager
+    http = HttpSessionManager()
+    weather = WeatherClient(http)
+    aqi = AirQualityClient(http)
+
+    session = weather.http.get_session()
+    assert aqi.http.get_session() is session
+    assert session.connector.limit_per_host == HttpSessionManager.PER_HOST_CONNECTION_LIMIT
+
+    await http.close()
+    assert session.closed
+
+
+# --- D) CACHE GEOKÓDOVÁNÍ ---
+
+
+def test_geocode_cache_persists_and_normalizes(tmp_path):
+    """Záznam přežije "restart" (nová instance nad stejným souborem) a klíč ignoruje velikost písmen."""
+    from api_clients.geocode_cache import GeocodeCache
+    db_path = str(tmp_path / "geo.db")
+    cache = GeocodeCache(db_path)
+    cache.put("Praha", (50.08, 14.43, "Praha"))
+    cache.close()
+
+    reopened = GeocodeCache(db_path)
+    assert reopened.get("  PRAHA ") == (50.08, 14.43, "Praha")
+    assert reopened.get("Brno") is None
+
+
+def test_geocode_cache_lru_and_negative_ttl():
+    """LRU vyřazuje nejstarší záznamy, negativní záznam po TTL vyprší."""
+    from api_clients.geocode_cache import GeocodeCache
+    cache = GeocodeCache()
+    cache.MAX_MEMORY_ENTRIES = 2
+    cache.put("A", (1, 1, "A"))
+    cache.put("B", (2, 2, "B"))
+    cache.get("A")
+    cache.put("C", (3, 3, "C"))
+    assert cache.get("B") is None
+    assert cache.get("A") == (1, 1, "A")
+
+    cache.put("Prahaa", None)
+    assert cache.get("prahaa") is GeocodeCache.NOT_FOUND
+    cache.NEGATIVE_TTL = -1
+    assert cache.get("prahaa") is None
+
+
+@pytest.mark.asyncio
+async def test_geocode_uses_cache_after_first_lookup():
+    """Druhé geokódování stejného města už nevolá API."""
+    client = WeatherClient()
+    payload = {"results": [{"latitude": 49.19, "longitude": 16.61, "name": "Brno"}]}
+    with patch.object(client.http, 'get_json', AsyncMock(return_value=payload)) as mock_get:
+        assert await client._geocode_city("Brno") == (49.19, 16.61, "Brno")
+        assert await client._geocode_city("brno") == (49.19, 16.61, "Brno")
+    mock_get.assert_called_once()
+
+
+# --- E) HROMADNÉ DOTAZY NA AKTUÁLNÍ POČASÍ ---
+
+
+@pytest.mark.asyncio
+async def test_get_current_many_batches_coordinates():
+    """Souřadnice se posílají po dávkách v jednom víc-souřadnicovém dotazu."""
+    client = WeatherClient()
+    client.BATCH_SIZE = 2
+    coords = [(50.0, 14.0), (49.2, 16.6), (49.8, 18.3)]
+
+    async def fake_get_json(url, deadline=None, endpoint=None):
+        count = url.split("latitude=")[1].split("&")[0].count(",") + 1
+        items = [{"current": {"temperature": 10 + i, "weathercode": 95}}
+                 for i in range(count)]
+        return items if count > 1 else items[0]
+
+    with patch.object(client.http, 'get_json', AsyncMock(side_effect=fake_get_json)) as mock_get:
+        results = await client.get_current_many(coords)
+
+    assert mock_get.call_count == 2
+    assert "latitude=50.0,49.2&longitude=14.0,16.6" in mock_get.call_args_list[0].args[0]
+    assert [r.temperature for r in results] == [10, 11, 10]
+    assert all(r.weather_code == 95 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_get_hourly_many_returns_forecast_columns():
+    """Hodinová předpověď jde stejnými dávkami; místo bez bloku 'hourly' vrací None."""
+    client = WeatherClient()
+    hourly = {"time": ["2024-06-01T15:00", "2024-06-01T16:00"],
+              "weather_code": [3, 95], "precipitation": [0.0, 12.5],
+              "wind_gusts_10m": [20.0, 80.0]}
+
+    with patch.object(client.http, 'get_json',
+                      AsyncMock(return_value=[{"hourly": hourly}, {}])) as mock_get:
+        results = await client.get_hourly_many([(50.0, 14.0), (49.2, 16.6)], hours=2)
+
+    assert "forecast_hours=2" in mock_get.call_args.args[0]
+    assert results[0].weather_code == [3, 95]
+    assert results[0].wind_gusts == [20.0, 80.0]
+    assert results[1] is None
+
+
+# --- F) LOKÁLNÍ ARCHIV ERA5 ---
+
+
+@pytest.mark.asyncio
+async def test_historical_fetches_year_once_then_reads_from_store():
+    """První dotaz stáhne celý rok, další dny se čtou z lokálního archivu."""
+    from datetime import date, timedelta
+    client = WeatherClient()
+
+    async def fake_get_json(url, deadline=None, endpoint=None):
+        start = date.fromisoformat(url.split("start_date=")[1].split("&")[0])
+        end = date.fromisoformat(url.split("end_date=")[1].split("&")[0])
+        days = [(start + timedelta(days=i)).isoformat()
+                for i in range((end - start).days + 1)]
+        return {"daily": {"time": days, "temperature_2m_max": [20.5] * len(days)}}
+
+    with patch.object(client.http, 'get_json', AsyncMock(side_effect=fake_get_json)) as mock_get:
+        first = await client._fetch_historical_weather_open_meteo(50.081, 14.428)
+        again = await client._fetch_historical_weather_open_meteo(50.08, 14.43)
+
+    assert first.max_temp == 20.5
+    assert again == first
+    mock_get.assert_called_once()
+
+    target = date.fromisoformat(first.date)
+    assert client.historical_store.get_max_temp(50.08, 14.43, target + timedelta(days=100)) == 20.5
+
+
+# --- G) TTL CACHE SE SLUČOVÁNÍM POŽADAVKŮ ---
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_coalesces_concurrent_requests():
+    """Souběžné dotazy na stejné město vyvolají jediné volání AQI API."""
+    client = AirQualityClient()
+    started = asyncio.Event()
+
+    async def slow_fetch(city):
+        started.set()
+        await asyncio.sleep(0.01)
+        return 42
+
+    with patch.object(client, '_fetch_aqi', AsyncMock(side_effect=slow_fetch)) as mock_fetch:
+        results = await asyncio.gather(*(client.get_current_aqi("Praha") for _ in range(5)))
+        assert await client.get_current_aqi("praha") == 42
+
+    assert results == [42] * 5
+    mock_fetch.assert_called_once()
+    stats = client.aqi_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_serves_stale_while_revalidating():
+    """Zastaralá hodnota se vrátí hned a na pozadí proběhne obnovení."""
+    from api_clients.ttl_cache import TTLCache
+    cache = TTLCache(ttl=0, stale_ttl=60)
+    cache.put("k", "stará")
+    fetch = AsyncMock(return_value="nová")
+
+    assert await cache.get_or_fetch("k", fetch) == "stará"
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    fetch.assert_called_once()
+    cache.ttl = 60
+    assert await cache.get_or_fetch("k", fetch) == "nová"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_ttl_cache_peek_counts_hits_and_misses():
+    """peek nespouští požadavek, ale započítá se do úspěšnosti cache."""
+    from api_clients.ttl_cache import TTLCache
+    cache = TTLCache(ttl=60)
+    cache.put("k", "hodnota")
+
+    assert cache.peek("k") == "hodnota"
+    assert cache.peek("jiný") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+# --- H) HROMADNÉ AQI Z WAQI MAP/BOUNDS ---
+
+
+def test_station_index_finds_nearest_station():
+    """Prostorový index vrátí nejbližší stanici a ignoruje příliš vzdálené."""
+    from api_clients.station_index import StationIndex
+    index = StationIndex([
+        Station(50.08, 14.42, 30, "Praha"),
+        Station(49.20, 16.60, 70, "Brno"),
+        Station(50.10, 14.60, 40, "Praha-východ"),
+    ])
+    assert index.nearest(50.07, 14.43, max_km=25).name == "Praha"
+    assert index.nearest(49.19, 16.61, max_km=25).aqi == 70
+    assert index.nearest(48.15, 17.11, max_km=25) is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_bulk_builds_snapshot_from_bounds_query():
+    """Jeden dotaz na map/bounds pokryje všechna města; AQI se pak čte ze snímku."""
+    client = AirQualityClient()
+    payload = {"status": "ok", "data": [
+        {"lat": 50.08, "lon": 14.42, "aqi": "35", "station": {"name": "Praha"}},
+        {"lat": 49.20, "lon": 16.60, "aqi": "-", "station": {"name": "Brno"}},
+    ]}
+    with patch.object(client.http, 'get_json', AsyncMock(return_value=payload)) as mock_get:
+        count = await client.refresh_bulk([(50.08, 14.43), (49.19, 16.61)])
+
+    mock_get.assert_called_once()
+    assert "map/bounds?latlng=" in mock_get.call_args.args[0]
+    assert count == 1
+    assert client.get_snapshot_aqi(50.08, 14.43) == 35
+    assert client.get_snapshot_aqi(49.19, 16.61) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_bulk_refresh_backs_off():
+    """Po selhání všech dlaždic se hromadný snímek nezkouší v každém tiku znovu."""
+    client = AirQualityClient()
+    assert client.bulk_refresh_due(15 * 60)
+    payload = {"status": "error", "data": "Invalid key"}
+    with patch.object(client.http, 'get_json', AsyncMock(return_value=payload)):
+        assert await client.refresh_bulk([(50.08, 14.43)]) == 0
+        assert not client.bulk_refresh_due(15 * 60)
+        first_retry = client._bulk_retry_at
+
+        client._bulk_retry_at = 0.0
+        await client.refresh_bulk([(50.08, 14.43)])
+    # Opakované selhání odklad prodlouží
+    assert client._bulk_retry_at - first_retry > client.BULK_RETRY_BACKOFF / 2
+
+
+def test_bounds_are_tiled_for_large_regions():
+    """Velká oblast se dělí na dlaždice, prázdné dlaždice se vynechají."""
+    client = AirQualityClient()
+    tiles = client._bounds_tiles([(50.0, 14.0), (40.0, -3.7)])
+    assert len(tiles) == 2
+    for south, west, north, east in tiles:
+        assert north - south <= client.MAX_TILE_SPAN
+        assert east - west <= client.MAX_TILE_SPAN
+
+
+# --- I) METRIKY ---
+
+
+def test_metrics_render_prometheus_histogram_and_counters():
+    """Registr metrik exportuje čítače, gauge z kolektorů i kumulativní histogramy."""
+    from api_clients.metrics import Metrics
+    registry = Metrics()
+    registry.inc("http_errors_total", endpoint="waqi_feed", kind="timeout")
+    registry.observe("http_request_duration_seconds", 0.02, endpoint="waqi_feed")
+    registry.observe("http_request_duration_seconds", 0.3, endpoint="waqi_feed")
+    registry.register_collector(lambda: [("cache_hit_ratio", {"cache": "aqi"}, 0.5)])
+
+    text = registry.render_prometheus()
+    assert 'http_errors_total{endpoint="waqi_feed",kind="timeout"} 1' in text
+    assert 'cache_hit_ratio{cache="aqi"} 0.5' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="waqi_feed",le="0.025"} 1' in text
+    assert 'http_request_duration_seconds_count{endpoint="waqi_feed"} 2' in text
+    assert registry.histogram("http_request_duration_seconds",
+                              endpoint="waqi_feed").quantile(0.5) == 0.025
+
+
+def test_metrics_escape_label_values():
+    """Uvozovky, zpětná lomítka a nové řádky v labelech nerozbijí Prometheus text."""
+    from api_clients.metrics import Metrics
+    registry = Metrics()
+    registry.inc("monitor_tick_errors_total", error='a"b\\c\nd')
+    assert 'monitor_tick_errors_total{error="a\\"b\\\\c\\nd"} 1' in registry.render_prometheus()
+
+
+@pytest.mark.asyncio
+async def test_http_metrics_use_fixed_endpoint_names():
+    """Název města z URL se do labelů nedostane - endpoint je pevný název volání."""
+    from api_clients.http_session import HttpSessionManager
+    http = HttpSessionManager(rate_limits={})
+
+    with patch.object(http, '_request', AsyncMock(return_value={"ok": True})) as mock_request:
+        await http.get_json("https://api.waqi.info/feed/Nové Město/?token=x", endpoint="waqi_feed")
+        await http.get_json("https://api.waqi.info/feed/brno/?token=x")
+    assert mock_request.call_args_list[0].args[1] == "waqi_feed"
+    assert mock_request.call_args_list[1].args[1] == "api.waqi.info"
+
+
+# --- J) ODOLNOST: DEADLINE, OPAKOVÁNÍ, JISTIČE ---
+
+
+def test_circuit_breaker_opens_and_probes_after_timeout():
+    """Po sérii selhání jistič odmítá požadavky, po čase pustí jednu zkoušku."""
+    from api_clients.resilience import CircuitBreaker
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.reset_timeout = 60
+    assert breaker.allow() is False
+
+    breaker.reset_timeout = 0
+    assert breaker.allow() is True  # zkušební požadavek
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_get_json_retries_transient_errors_then_fails_fast():
+    """Přechodné chyby se opakují; po rozpojení jističe se API vůbec nevolá."""
+    import aiohttp
+    from api_clients.http_session import HttpSessionManager
+    from api_clients.resilience import CircuitBreaker, CircuitOpenError
+    http = HttpSessionManager(rate_limits={})
+    http.retry_policy.base_delay = 0
+    error = aiohttp.ClientResponseError(MagicMock(), (), status=503)
+
+    with patch.object(http, '_request', AsyncMock(side_effect=[error, {"ok": True}])) as mock_request:
+        assert await http.get_json("https://api.waqi.info/feed/praha/") == {"ok": True}
+    assert mock_request.call_count == 2
+
+    http.breakers["api.waqi.info"] = CircuitBreaker(failure_threshold=3)
+    with patch.object(http, '_request', AsyncMock(side_effect=error)) as mock_request:
+        with pytest.raises(aiohttp.ClientResponseError):
+            await http.get_json("https://api.waqi.info/feed/praha/")
+        with pytest.raises(CircuitOpenError):
+            await http.get_json("https://api.waqi.info/feed/praha/")
+    # 3 pokusy prvního volání; rozpojený jistič už další požadavek nepustí
+    assert mock_request.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_json_respects_deadline():
+    """Zaseknutý upstream skončí timeoutem nejpozději v deadline."""
+    from api_clients.http_session import HttpSessionManager
+    http = HttpSessionManager(rate_limits={})
+
+    async def hang(*args):
+        await asyncio.sleep(10)
+
+    with patch.object(http, '_request', AsyncMock(side_effect=hang)):
+        with pytest.raises(asyncio.TimeoutError):
+            await http.get_json("https://archive-api.open-meteo.com/v1/era5", deadline=0.05)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_wait_does_not_open_breaker():
+    """Deadline vypršelý při čekání na token není selhání hostu - jistič zůstane sepnutý."""
+    from api_clients.http_session import HttpSessionManager
+    from api_clients.resilience import CircuitBreaker
+    http = HttpSessionManager(rate_limits={"api.waqi.info": (1, 1)})
+    http.breakers["api.waqi.info"] = CircuitBreaker(failure_threshold=1)
+
+    with patch.object(http, '_request', AsyncMock(return_value={"ok": True})) as mock_request:
+        assert await http.get_json("https://api.waqi.info/feed/praha/") == {"ok": True}
+        # Bucket je prázdný, další token přibude až za 1 s
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await http.get_json("https://api.waqi.info/feed/praha/", deadline=0.05)
+    assert mock_request.call_count == 1
+    assert http.breakers["api.waqi.info"].state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+@patch('api_clients.weather_client.WeatherClient._fetch_current_weather', return_value=MOCK_CURRENT_DATA_SUCCESS)
+@patch('api_clients.weather_client.WeatherClient._geocode_city', return_value=MOCK_GEOCODE_SUCCESS)
+async def test_slow_archive_does_not_delay_current_weather(mock_geocode, mock_current):
+    """Pomalý archiv nezdrží odpověď - vrátí se aktuální data bez historie."""
+    client = WeatherClient()
+    client.HISTORICAL_GRACE = 0.01
+
+    async def slow_history(*args):
+        await asyncio.sleep(1)
+
+    with patch.object(client, '_fetch_historical_weather_open_meteo', side_effect=slow_history):
+        result, error = await asyncio.wait_for(client.get_weather_data("Praha"), 0.5)
+
+    assert error is None
+    assert result.current.temperature == 12.5
+    assert result.historical is None
+
+
+@pytest.mark.asyncio
+@patch('api_clients.weather_client.WeatherClient._fetch_current_weather', return_value=MOCK_CURRENT_DATA_SUCCESS)
+@patch('api_clients.weather_client.WeatherClient._geocode_city', return_value=MOCK_GEOCODE_SUCCESS)
+async def test_archive_grace_waits_for_healthy_archive_only(mock_geocode, mock_current):
+    """Zdravý archiv o něco pomalejší než aktuální data se dočká; selhávající ne."""
+    from api_clients.models import HistoricalWeather
+    from api_clients.resilience import CircuitBreaker
+    client = WeatherClient()
+    client.HISTORICAL_GRACE_DEGRADED = 0.01
+    history = HistoricalWeather("2025-10-17", 14.0)
+
+    async def archive_download(*args):
+        await asyncio.sleep(0.4)
+        return history
+
+    with patch.object(client, '_fetch_historical_weather_open_meteo', side_effect=archive_download):
+        result, _ = await client.get_weather_data("Praha")
+        assert result.historical == history
+
+        # Poslední požadavek na archiv selhal - na stahování se nečeká
+        breaker = client.http.breakers["archive-api.open-meteo.com"] = CircuitBreaker()
+        breaker.record_failure()
+        result, _ = await asyncio.wait_for(client.get_weather_data("Praha"), 0.3)
+        assert result.historical is None
+
+
+# --- K) KLIMATOLOGIE Z DLOUHÝCH ŘAD ERA5 ---
+
+
+def _climate_series(years=range(1995, 2025)):
+    """Denní maxima: každý rok stejný průběh posunutý o (rok - 1995) / 10 °C."""
+    from datetime import date, timedelta
+    days, temps = [], []
+    for year in years:
+        day = date(year, 1, 1)
+        while day.year == year:
+            days.append(day.isoformat())
+            temps.append(10.0 + (year - 1995) / 10)
+            day += timedelta(days=1)
+    return days, temps
+
+
+def test_climatology_day_stats_and_percentile(tmp_path):
+    """Statistiky dne a percentil se počítají z matice roky × dny; soubor přežije restart."""
+    from datetime import date
+    from api_clients.climatology import ClimatologyStore
+    store = ClimatologyStore(str(tmp_path))
+    store.put_series(50.08, 14.43, *_climate_series())
+
+    stats = store.day_stats(50.08, 14.43, date(2024, 7, 1))
+    assert stats.record_low == 10.0 and stats.record_high == 12.9
+    assert stats.mean == 11.4
+    assert stats.samples == 30 * 15
+
+    reopened = ClimatologyStore(str(tmp_path))
+    assert reopened.has(50.08, 14.43)
+    assert reopened.percentile_of(50.08, 14.43, date(2024, 7, 1), 11.45) == 50.0
+    assert reopened.percentile_of(50.08, 14.43, date(2024, 7, 1), 20.0) == 100.0
+    assert reopened.day_stats(49.0, 16.0, date(2024, 7, 1)) is None
+
+
+@pytest.mark.asyncio
+async def test_climatology_downloads_once_then_serves_locally():
+    """Řada se stáhne jednou na pozadí, pak get_weather_data vrací klimatologii bez sítě."""
+    client = WeatherClient()
+    days, temps = _climate_series()
+
+    with patch.object(client.http, 'get_json',
+                      AsyncMock(return_value={"daily": {"time": days, "temperature_2m_max": temps}})) as mock_get:
+        assert client.prefetch_climatology([(50.08, 14.43), (50.08, 14.43)]) == 1
+        await asyncio.gather(*client._climate_downloads.values())
+        assert client.prefetch_climatology([(50.08, 14.43)]) == 0
+
+    assert mock_get.call_count == 1
+    assert "start_date=" in mock_get.call_args.args[0]
+    climate = client.get_climatology(50.08, 14.43, 12.95)
+    assert climate.percentile == 100.0
+
+
+# --- L) LOKÁLNÍ REJSTŘÍK OBCÍ (GEONAMES) ---
+
+
+GEONAMES_SAMPLE = [
+    # id, name, asciiname, alternatenames, lat, lon, class, code, country, cc2, adm1-4, population
+    ("3067696", "Prague", "Prague", "Praha,Prag,Прага", "50.08804", "14.42076", "P", "PPLC", "CZ", "", "52", "", "", "", "1165581"),
+    ("3078610", "Brno", "Brno", "Brünn", "49.19522", "16.60796", "P", "PPLA", "CZ", "", "78", "", "", "", "369559"),
+    ("3068160", "Plzeň", "Plzen", "Pilsen", "49.74747", "13.37759", "P", "PPLA", "CZ", "", "87", "", "", "", "164180"),
+    ("3068161", "Plzeň", "Plzen", "", "50.00000", "15.00000", "P", "PPL", "CZ", "", "87", "", "", "", "120"),
+    ("3069011", "Ostrava", "Ostrava", "", "49.83465", "18.28204", "P", "PPLA", "CZ", "", "85", "", "", "", "313088"),
+    ("1234567", "Sněžka", "Snezka", "", "50.73", "15.74", "T", "MT", "CZ", "", "", "", "", "", "0"),
+]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    from api_clients.gazetteer import Gazetteer
+    dump = tmp_path / "CZ.txt"
+    dump.write_text("\n".join("\t".join(row) for row in GEONAMES_SAMPLE) + "\n", encoding="utf-8")
+    path = str(tmp_path / "gazetteer.npz")
+    Gazetteer.from_geonames(str(dump)).save(path)
+    return Gazetteer.load(path)
+
+
+def test_gazetteer_lookup_ignores_diacritics_and_ranks_by_population(gazetteer):
+    """'plzen' i 'PLZEŇ' najdou velkou Plzeň; vrací se vlastní jméno místa s diakritikou."""
+    lat, lon, name = gazetteer.lookup("plzen")
+    assert name == "Plzeň" and round(lat, 2) == 49.75
+    assert gazetteer.lookup("  PLZEŇ ")[2] == "Plzeň"
+    assert gazetteer.lookup("Sněžka") is None  # jen obydlená místa
+    assert gazetteer.lookup("Neexistuje") is None
+
+
+def test_gazetteer_lookup_canonicalizes_alternate_names(gazetteer):
+    """Alternativní zápisy jednoho místa vrátí jedno kanonické jméno (jeden záznam v !add)."""
+    results = {gazetteer.lookup(name) for name in ("Praha", "prague", "PRAG")}
+    assert len(results) == 1
+    assert results.pop()[2] == "Prague"
+    assert gazetteer.lookup("Pilsen")[2] == gazetteer.lookup("plzen")[2] == "Plzeň"
+
+
+def test_gazetteer_prefix_and_fuzzy_matching(gazetteer):
+    assert gazetteer.complete("prah") == ["Praha"]
+    # Lidnatější první, vlastní jméno místa před alternativním, žádné duplicity
+    assert gazetteer.complete("p") == ["Prague", "Plzeň"]
+    assert gazetteer.similar("Brmo") == ["Brno"]
+    assert gazetteer.similar("Ostrva") == ["Ostrava"]
+
+
+@pytest.mark.asyncio
+async def test_geocoding_uses_gazetteer_before_network(gazetteer):
+    """Známé jméno se vyřeší lokálně, neznámé jde na API."""
+    client = WeatherClient(gazetteer=gazetteer)
+    with patch.object(client.http, 'get_json', AsyncMock(return_value={"results": []})) as mock_get:
+        assert (await client.geocode("brno"))[2] == "Brno"
+        assert mock_get.call_count == 0
+        assert await client.geocode("Atlantida") is None
+        assert mock_get.call_count == 1
+    assert client.suggest_cities("Ostrva") == ["Ostrava"]
+
+
+# --- M) PŘÍKAZ !add (OVĚŘENÍ MĚSTA PŘES REJSTŘÍK) ---
+
+
+@pytest.mark.asyncio
+async def test_add_command_validates_and_canonicalizes_city(bot_main):
+    """!add uloží kanonický název, neznámé město odmítne s návrhem."""
+    ctx = AsyncMock()
+    ctx.guild = None
+
+    with patch.object(bot_main.weather_client, 'geocode', AsyncMock(return_value=(49.75, 13.38, "Plzeň"))), \
+            patch.object(bot_main.monitored_cities, 'add', return_value=True) as mock_add:
+        await bot_main.add_city.callback(ctx, city="plzen")
+    mock_add.assert_called_once_with("Plzeň", None)
+
+    with patch.object(bot_main.weather_client, 'geocode', AsyncMock(return_value=None)), \
+            patch.object(bot_main.weather_client, 'suggest_cities', return_value=["Brno"]), \
+            patch.object(bot_main.monitored_cities, 'add') as mock_add:
+        await bot_main.add_city.callback(ctx, city="Brmo")
+    mock_add.assert_not_called()
+    assert "Brno" in ctx.send.call_args.args[0]
+
+
+# --- N) HROMADNÉ POROVNÁNÍ MĚST ---
+
+
+@pytest.mark.asyncio
+async def test_get_weather_data_many_uses_one_forecast_request():
+    """Více měst: souběžné geokódování, jeden dotaz na chybějící aktuální počasí."""
+    client = WeatherClient()
+    locations = {"praha": (50.0, 14.0, "Praha"), "brno": (49.2, 16.6, "Brno"),
+                 "ostrava": (49.8, 18.3, "Ostrava")}
+    client._geocode_city = AsyncMock(side_effect=lambda city: locations.get(city.lower()))
+    client._fetch_historical_weather_open_meteo = AsyncMock(return_value=HistoricalWeather("2020-06-01", 15.0))
+    client.current_cache.put(client.coords_key(49.8, 18.3), CurrentWeather(5, 0.0, 0))  # čerstvé v cache
+    client.get_current_many = AsyncMock(side_effect=lambda coords: [
+        CurrentWeather(20 + i, 0.0, 0) for i in range(len(coords))])
+
+    results = await client.get_weather_data_many(["Praha", "Atlantida", "Brno", "Ostrava"])
+
+    client.get_current_many.assert_called_once_with([(50.0, 14.0), (49.2, 16.6)])
+    assert [r.city_name if r else None for r, _ in results] == ["Praha", None, "Brno", "Ostrava"]
+    assert [r.current.temperature for r, _ in results if r] == [20, 21, 5]
+    assert results[0][0].historical.max_temp == 15.0
+    assert "Atlantida" in results[1][1]
+
+
+@pytest.mark.asyncio
+async def test_porovnej_sends_one_table_embed(bot_main):
+    """!porovnej odpoví jedním embedem s tabulkou a nenalezená města uvede zvlášť."""
+    results = [
+        (WeatherReport("Praha", 50.0, 14.0, CurrentWeather(21.3, 0.0, 0),
+                       HistoricalWeather("2020-06-01", 18.0), None), None),
+        (None, "Chyba: Město 'Atlantida' nebylo nalezeno."),
+        (WeatherReport("Brno", 49.2, 16.6, CurrentWeather(19.0, 1.2, 61), None, None), None),
+    ]
+    ctx = AsyncMock()
+    with patch.object(bot_main.weather_client, 'get_weather_data_many', AsyncMock(return_value=results)) as mock_many, \
+            patch.object(bot_main.aqi_client, 'get_aqi_many', AsyncMock(return_value=[42, None])):
+        await bot_main.porovnej.callback(ctx, cities="Praha, Atlantida, Brno, praha")
+
+    mock_many.assert_called_once_with(["Praha", "Atlantida", "Brno"])
+    ctx.send.assert_called_once()
+    embed = ctx.send.call_args.kwargs["embed"]
+    assert "Praha" in embed.description and "Brno" in embed.description
+    assert "21.3°C" in embed.description and "42" in embed.description
+    assert "Atlantida" in embed.fields[0].value
@@ -0,0 +1,510 @@
+# tests/test_monitoring.py
+
+import pytest
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+from api_clients.air_quality_client import AirQualityClient
+from api_clients.models import CurrentWeather, HistoricalWeather, HourlyForecast, WeatherReport
+from api_clients.weather_client import WeatherClient
+from api_clients.rate_limit import TokenBucket
+from monitoring.engine import MonitorEngine
+
+
+# --- A) ŘÍZENÍ TEMPA POŽADAVKŮ ---
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_after_burst():
+    """Po vyčerpání burstu se požadavky rozloží podle povoleného tempa."""
+    bucket = TokenBucket(rate=100, capacity=2)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    elapsed = time.monotonic() - started
+    # 2 tokeny z burstu, zbylé 4 po 10 ms
+    assert 0.03 <= elapsed < 0.5
+
+
+# --- B) MONITOR ENGINE ---
+
+
+@pytest.mark.asyncio
+async def test_monitor_engine_bounds_concurrency_and_reports_duration():
+    """Dávky běží souběžně nejvýše `concurrency`, AQI snímek se stahuje jednou za cyklus."""
+    weather = WeatherClient()
+    aqi = AirQualityClient()
+    weather.BATCH_SIZE = 2
+    running = 0
+    peak = 0
+
+    async def fake_current_many(coords):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [CurrentWeather(10, 0.0, 0) for _ in coords]
+
+    weather.geocode_many = AsyncMock(side_effect=lambda cities: [(1.0, 2.0, c) for c in cities])
+    weather.get_current_many = AsyncMock(side_effect=fake_current_many)
+    aqi.refresh_bulk = AsyncMock(return_value=0)
+
+    engine = MonitorEngine(weather, aqi, concurrency=2)
+    cities = [f"Město {i}" for i in range(10)]
+    results = await engine.run_cycle(cities, region_cities=cities)
+
+    assert [city for city, _ in results] == cities
+    assert weather.get_current_many.call_count == 5
+    assert peak == 2
+    aqi.refresh_bulk.assert_called_once()
+    assert engine.last_cycle_duration is not None
+    assert engine.last_cycle_cities == 10
+
+
+# --- C) INDEX KANÁLŮ A ROZESÍLÁNÍ ALERTŮ ---
+
+
+def _fake_guild(guild_id, channel_names):
+    from unittest.mock import MagicMock
+    guild = MagicMock()
+    guild.id = guild_id
+    channels = []
+    for name in channel_names:
+        channel = MagicMock()
+        channel.name = name
+        channel.send = AsyncMock()
+        channels.append(channel)
+    guild.text_channels = channels
+    return guild
+
+
+def test_alert_channel_index_tracks_guild_changes():
+    """Index obsahuje jen servery s kanálem #alert a reaguje na změny."""
+    from monitoring.alerts import AlertChannelIndex
+    with_alert = _fake_guild(1, ["general", "alert"])
+    without_alert = _fake_guild(2, ["general"])
+    index = AlertChannelIndex()
+    index.rebuild([with_alert, without_alert])
+    assert len(index) == 1
+
+    without_alert.text_channels[0].name = "alert"
+    index.refresh_guild(without_alert)
+    assert len(index) == 2
+
+    index.remove_guild(with_alert)
+    assert index.channels() == [without_alert.text_channels[0]]
+
+
+@pytest.mark.asyncio
+async def test_alert_dispatcher_sends_one_embed_per_guild():
+    """Více varování z jednoho cyklu odejde jako jeden embed do každého kanálu."""
+    from monitoring.alerts import AlertChannelIndex, AlertDispatcher
+    guilds = [_fake_guild(i, ["alert"]) for i in range(3)]
+    index = AlertChannelIndex()
+    index.rebuild(guilds)
+
+    sent = await AlertDispatcher(index).dispatch(
+        [("Praha", "**Praha**: Bouřka"), ("Brno", "**Brno**: Silný déšť")])
+
+    assert sent == 3
+    for guild in guilds:
+        channel = guild.text_channels[0]
+        channel.send.assert_called_once()
+        embeds = channel.send.call_args.kwargs["embeds"]
+        assert len(embeds) == 1
+        assert "Praha" in embeds[0].description and "Brno" in embeds[0].description
+
+
+@pytest.mark.asyncio
+async def test_alert_dispatcher_respects_guild_subscriptions():
+    """Město s odběry dostanou jen jeho servery, město bez odběrů všechny."""
+    from monitoring.alerts import AlertChannelIndex, AlertDispatcher
+    guilds = [_fake_guild(i, ["alert"]) for i in range(3)]
+    index = AlertChannelIndex()
+    index.rebuild(guilds)
+
+    sent = await AlertDispatcher(index).dispatch(
+        [("Praha", "**Praha**: Bouřka"), ("Brno", "**Brno**: Silný déšť")],
+        {"Praha": set(), "Brno": {guilds[1].id}})
+
+    assert sent == 3
+    descriptions = [guild.text_channels[0].send.call_args.kwargs["embeds"][0].description
+                    for guild in guilds]
+    assert ["Brno" in description for description in descriptions] == [False, True, False]
+    assert all("Praha" in description for description in descriptions)
+
+    # Město s odběrem ALL_GUILDS dostanou všechny servery, i když ho má přidané jen jeden
+    for guild in guilds:
+        guild.text_channels[0].send.reset_mock()
+    from monitoring.state_store import ALL_GUILDS
+    sent = await AlertDispatcher(index).dispatch(
+        [("Praha", "**Praha**: Bouřka")], {"Praha": {ALL_GUILDS, guilds[0].id}})
+    assert sent == 3
+
+
+# --- D) PERZISTENTNÍ STAV BOTA ---
+
+
+def test_state_store_migrates_legacy_json_once(tmp_path):
+    """Seznam měst z monitored_cities.json se převede do SQLite a JSON se odloží."""
+    import json
+    from monitoring.state_store import StateStore
+    legacy = tmp_path / "monitored_cities.json"
+    legacy.write_text(json.dumps(["Praha", "Brno"]), encoding="utf-8")
+    db_path = str(tmp_path / "state.db")
+
+    store = StateStore(db_path, str(legacy))
+    assert list(store.cities) == ["Praha", "Brno"]
+    assert not legacy.exists()
+    store.close()
+
+    # Druhé spuštění už nic nemigruje ani nepřidává výchozí města
+    reopened = StateStore(db_path, str(legacy))
+    assert list(reopened.cities) == ["Praha", "Brno"]
+
+
+def test_state_store_persists_cities_subscriptions_and_alerts(tmp_path):
+    """Změny měst, odběrů i stavu alertů přežijí restart."""
+    from monitoring.state_store import StateStore
+    db_path = str(tmp_path / "state.db")
+    store = StateStore(db_path)
+    assert store.cities.add("Ostrava", guild_id=42) is True
+    assert store.cities.add("Ostrava", guild_id=7) is False
+    assert store.cities.remove("Praha") is True
+    assert store.cities.remove("Praha") is False
+    store.alerts["Ostrava"] = 95
+    store.close()
+
+    reopened = StateStore(db_path)
+    assert "Ostrava" in reopened.cities
+    assert "Praha" not in reopened.cities
+    assert sorted(reopened.cities.subscribers("Ostrava")) == [7, 42]
+    assert reopened.alerts.get("Ostrava") == 95
+
+
+def test_remove_drops_only_callers_subscription(tmp_path):
+    """!remove zruší jen odběr daného serveru; město zmizí, až ho nikdo neodebírá."""
+    from monitoring.state_store import ALL_GUILDS, StateStore
+    store = StateStore(str(tmp_path / "state.db"))
+    store.cities.add("Brno", guild_id=1)
+    store.cities.add("Brno", guild_id=2)
+
+    assert store.cities.remove("Brno", guild_id=3) is False
+    assert store.cities.remove("Brno", guild_id=1) is True
+    assert "Brno" in store.cities
+    assert store.cities.subscribers("Brno") == [2]
+    assert store.cities.remove("Brno", guild_id=2) is True
+    assert "Brno" not in store.cities
+
+    # Výchozí Praha se hlásí všem i poté, co si ji přidá jeden server,
+    # a jeden server ji ostatním nemůže odebrat
+    store.cities.add("Praha", guild_id=1)
+    assert sorted(store.cities.subscribers("Praha")) == [ALL_GUILDS, 1]
+    assert store.cities.remove("Praha", guild_id=1) is True
+    assert store.cities.remove("Praha", guild_id=2) is False
+    assert store.cities.subscribers("Praha") == [ALL_GUILDS]
+
+
+def test_removing_city_forgets_its_alert_state(tmp_path):
+    """Po !remove a novém !add se stejný jev nahlásí znovu (stav nezůstane v paměti)."""
+    from monitoring.state_store import StateStore
+    store = StateStore(str(tmp_path / "state.db"))
+    store.cities.add("Brno")
+    store.alerts["Brno"] = 95
+
+    store.cities.remove("Brno")
+    assert "Brno" not in store.alerts
+    store.cities.add("Brno")
+    assert store.alerts.get("Brno") is None
+    assert StateStore(str(tmp_path / "state.db")).alerts.get("Brno") is None
+
+
+# --- E) PŘÍKAZ !stats ---
+
+
+@pytest.mark.asyncio
+async def test_stats_command_reports_metrics(bot_main):
+    """!stats odpoví jednou zprávou s API, cache, monitorem a alerty."""
+    from api_clients.metrics import metrics
+    metrics.observe("http_request_duration_seconds", 0.04, endpoint="api.open-meteo.com/v1/forecast")
+
+    ctx = AsyncMock()
+    await bot_main.stats.callback(ctx)
+
+    message = ctx.send.call_args.args[0]
+    assert "api.open-meteo.com/v1/forecast" in message
+    assert "Cache" in message and "Monitor" in message and "Alerty" in message
+
+
+# --- F) ROZVRH KONTROL MĚST ---
+
+
+def test_scheduler_spreads_cities_across_slots():
+    """Po první kontrole připadne každé město do svého slotu - ne všechna najednou."""
+    from monitoring.scheduler import CityScheduler
+    scheduler = CityScheduler(interval=1800, slot_seconds=60)
+    cities = [f"Město {i}" for i in range(300)]
+    now = 1_000_000.0
+
+    assert scheduler.due(cities, now) == cities  # první průchod hned
+    for city in cities:
+        scheduler.record(city, severe=False, now=now)
+
+    per_minute = {}
+    for city in cities:
+        due = scheduler.next_due(city)
+        assert now < due <= now + 1800
+        per_minute[int(due // 60)] = per_minute.get(int(due // 60), 0) + 1
+    # 300 měst do 30 slotů: žádný slot není přetížený
+    assert len(per_minute) == 30
+    assert max(per_minute.values()) < 25
+    assert scheduler.due(cities, now + 1) == []
+
+
+def test_scheduler_adapts_frequency_to_weather():
+    """Nebezpečné počasí zkracuje interval, dlouhý klid ho prodlužuje."""
+    from monitoring.scheduler import CityScheduler
+    scheduler = CityScheduler(interval=1800, slot_seconds=60, calm_after=2)
+    scheduler.record("Praha", severe=False, now=0.0)  # zarovnání do slotu
+    slot = scheduler.next_due("Praha")
+
+    scheduler.record("Praha", severe=True, now=slot)
+    assert scheduler.next_due("Praha") == slot + 450
+
+    for _ in range(2):
+        scheduler.record("Praha", severe=False, now=slot)
+    assert scheduler.next_due("Praha") == slot + 1800
+    scheduler.record("Praha", severe=False, now=slot)
+    assert scheduler.next_due("Praha") == slot + 3600
+
+    scheduler.mark_severe_forecast("Praha", now=slot)
+    assert scheduler.next_due("Praha") == slot + 450
+
+
+def test_scheduler_keeps_city_in_its_slot_across_cycles():
+    """Doba kontroly neposouvá město do dalších slotů - termíny drží fázi slotu."""
+    from monitoring.scheduler import CityScheduler
+    scheduler = CityScheduler(interval=1800, slot_seconds=60, calm_after=10)
+    scheduler.record("Brno", severe=False, now=1_000_000.0)
+    slot = scheduler.next_due("Brno")
+    assert (slot % 1800) == scheduler.slot_of("Brno") * 60
+
+    # Každá kontrola skončí 45 s po začátku slotu (síť, pomalé API)
+    for cycle in range(1, 6):
+        due = scheduler.next_due("Brno")
+        assert scheduler.due(["Brno"], due) == ["Brno"]
+        scheduler.record("Brno", severe=False, now=due + 45)
+        assert scheduler.next_due("Brno") == slot + cycle * 1800
+
+    # Nebezpečné počasí zkrátí periodu, ale kontroly dál vychází z fáze slotu
+    due = scheduler.next_due("Brno")
+    scheduler.record("Brno", severe=True, now=due + 45)
+    scheduler.record("Brno", severe=True, now=due + 450 + 45)
+    assert scheduler.next_due("Brno") == due + 900
+    scheduler.record("Brno", severe=False, now=due + 900 + 45)
+    assert scheduler.next_due("Brno") == due + 1800
+
+
+# --- G) VÍCE PROCESŮ (SHARDY) ---
+
+
+def test_leader_lease_single_holder_and_takeover(tmp_path):
+    """Pronájem drží jen jeden proces; po vypršení nebo uvolnění ho převezme jiný."""
+    from monitoring.leader import LeaderLease
+    db = str(tmp_path / "coordination.db")
+    first = LeaderLease(db, "proces-1", ttl=180)
+    second = LeaderLease(db, "proces-2", ttl=180)
+
+    assert first.try_acquire(now=0) is True
+    assert second.try_acquire(now=10) is False
+    assert first.try_acquire(now=100) is True  # obnovení prodlouží pronájem
+    assert second.try_acquire(now=250) is False
+    assert second.try_acquire(now=281) is True  # lídr mlčel déle než TTL
+    assert first.try_acquire(now=290) is False
+
+    second.release()
+    assert first.try_acquire(now=291) is True
+
+
+def test_alert_feed_delivers_batches_to_every_process(tmp_path):
+    """Dávku alertů od lídra přečte každý proces právě jednou, starší alerty se nepřehrávají."""
+    from monitoring.leader import AlertFeed
+    db = str(tmp_path / "coordination.db")
+    leader = AlertFeed(db)
+    leader.publish([("Praha", "**Praha**: starý alert")])
+
+    shard = AlertFeed(db)  # proces spuštěný později
+    leader.publish([("Brno", "**Brno**: Bouřka (mírná) ⛈️ (15°C)")])
+    assert shard.fetch_new() == [[("Brno", "**Brno**: Bouřka (mírná) ⛈️ (15°C)")]]
+    assert shard.fetch_new() == []
+    assert len(leader.fetch_new()) == 2
+
+
+@pytest.mark.asyncio
+async def test_monitor_tick_survives_locked_coordination_db(bot_main):
+    """Zamčený sdílený soubor (jiný proces) zaloguje chybu, smyčka monitoringu běží dál."""
+    import sqlite3
+    from unittest.mock import patch
+    from api_clients.metrics import metrics
+    before = metrics.counter("monitor_tick_errors_total")
+
+    with patch.object(bot_main.leader_lease, 'try_acquire',
+                      side_effect=sqlite3.OperationalError("database is locked")):
+        await bot_main.weather_monitor_task.coro()
+
+    assert metrics.counter("monitor_tick_errors_total") == before + 1
+
+
+# --- H) VČASNÁ VAROVÁNÍ Z PŘEDPOVĚDI ---
+
+
+def _forecast(codes, precipitation=None, gusts=None, start_hour=12):
+    hours = len(codes)
+    return HourlyForecast([f"2024-06-01T{start_hour + h:02d}:00" for h in range(hours)],
+                          codes, precipitation or [0.0] * hours, gusts or [10.0] * hours)
+
+
+def test_forecast_scanner_finds_first_severe_hour_per_city():
+    """Vektorová detekce najde první nebezpečnou hodinu podle kódu i prahů srážek a větru."""
+    from monitoring.forecast import ForecastScanner
+    scanner = ForecastScanner({95, 65}, horizon_hours=6)
+    cities = ["Praha", "Brno", "Ostrava", "Plzeň", "Zlín"]
+    forecasts = [
+        _forecast([0, 0, 0, 0, 0, 0]),
+        _forecast([0, 2, 3, 95, 95, 3]),
+        _forecast([0, 0, 61, 0], precipitation=[0.0, 0.0, 14.0, None]),
+        _forecast([3, 3, 3, 3, 3, 3], gusts=[30.0, 90.0, None, 10.0, 10.0, 10.0]),
+        None,
+    ]
+
+    alerts = scanner.scan(cities, forecasts)
+
+    assert [(a.city, a.time.hour) for a in alerts] == [
+        ("Brno", 15), ("Ostrava", 14), ("Plzeň", 13)]
+    assert alerts[0].weather_code == 95
+    assert alerts[1].precipitation == 14.0
+
+
+def test_forecast_scanner_deduplicates_by_window():
+    """Stejné okno se nehlásí znovu, jev v dalším okně ano."""
+    from monitoring.forecast import ForecastScanner
+    scanner = ForecastScanner({95}, horizon_hours=6)
+
+    assert len(scanner.scan(["Brno"], [_forecast([0, 0, 0, 0, 95, 0])])) == 1  # 16:00
+    assert scanner.scan(["Brno"], [_forecast([0, 0, 0, 95, 0, 0])]) == []  # 15:00, stejné okno
+    assert len(scanner.scan(["Brno"], [_forecast([0, 0, 0, 0, 0, 0], start_hour=14)])) == 0
+    assert len(scanner.scan(["Brno"], [_forecast([0, 0, 0, 0, 0, 95], start_hour=14)])) == 1  # 19:00
+
+
+# --- I) PREFETCH POPULÁRNÍCH MĚST ---
+
+
+def _prefetcher(top_k=2, budget=100):
+    from monitoring.prefetcher import UsagePrefetcher
+    weather = WeatherClient()
+    aqi = AirQualityClient()
+    weather.geocode_many = AsyncMock(side_effect=lambda keys: [(50.0, 14.0, k.title()) for k in keys])
+    weather.get_current_many = AsyncMock(side_effect=lambda coords: [CurrentWeather(20, 0.0, 0) for _ in coords])
+    weather.get_weather_data = AsyncMock(side_effect=lambda name: (
+        WeatherReport(name, 50.0, 14.0, CurrentWeather(20, 0.0, 0),
+                      HistoricalWeather("2020-06-01", 18), None), None))
+    aqi.get_current_aqi = AsyncMock(return_value=42)
+    return UsagePrefetcher(weather, aqi, top_k=top_k, budget_per_hour=budget), weather
+
+
+def test_prefetcher_ranks_cities_by_decaying_frequency():
+    """Starší dotazy váží méně - čerstvě populární město předběhne dřívější."""
+    prefetcher, _ = _prefetcher()
+    for _ in range(4):
+        prefetcher.record("Brno", now=0)
+    for _ in range(2):
+        prefetcher.record(" praha ", now=prefetcher.HALF_LIFE * 2)  # Brno mezitím na 1/4
+    prefetcher.record("Ostrava", now=prefetcher.HALF_LIFE * 2)
+    assert prefetcher.top(now=prefetcher.HALF_LIFE * 2) == ["praha", "brno"]
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_serves_top_cities_from_memory():
+    """Obnova stáhne top-K města hromadně, !pocasi je pak dostane z paměti."""
+    prefetcher, weather = _prefetcher()
+    for city in ("Praha", "Praha", "Brno", "Brno", "Zlín"):
+        prefetcher.record(city, now=0)
+
+    assert await prefetcher.refresh(now=0) == 2
+    weather.get_current_many.assert_called_once()
+    assert prefetcher.get("praha", now=10)[0].city_name == "Praha"
+    assert prefetcher.get("Zlín", now=10) is None
+    assert prefetcher.get("Praha", now=prefetcher.max_age + 1) is None  # příliš staré
+    assert prefetcher.hit_ratio() == pytest.approx(1 / 3)
+    # Čerstvé záznamy se znovu nestahují
+    assert await prefetcher.refresh(now=10) == 0
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_respects_upstream_budget():
+    """Co se nevejde do hodinového rozpočtu, počká - po uplynutí okna se obnoví."""
+    prefetcher, _ = _prefetcher(top_k=3, budget=5)
+    for city in ("Praha", "Brno", "Zlín"):
+        prefetcher.record(city, now=0)
+
+    # Dávka (1) + AQI a archiv po jednom za město: 3 + 2 = 5, na Zlín už nezbývá
+    assert await prefetcher.refresh(now=0) == 2
+    assert prefetcher.budget_used(now=0) == 5
+    assert await prefetcher.refresh(now=1) == 0
+    # Nové okno; archiv už je stažený, takže se vejdou všechna tři města (2 + 1 + 2)
+    assert await prefetcher.refresh(now=prefetcher.BUDGET_WINDOW + 1) == 3
+
+
+# --- J) START BOTA ---
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fills_cache_so_first_cycle_skips_fetch():
+    """Zahřátí po startu naplní cache - první cyklus monitoru už počasí nestahuje."""
+    weather = WeatherClient()
+    aqi = AirQualityClient()
+    weather.BATCH_SIZE = 2
+    weather.geocode_many = AsyncMock(side_effect=lambda cities: [
+        (float(i), 2.0, c) if c != "Atlantida" else None for i, c in enumerate(cities)])
+    weather._fetch_current_batch = AsyncMock(side_effect=lambda coords: [
+        CurrentWeather(10, 0.0, 0) for _ in coords])
+
+    engine = MonitorEngine(weather, aqi, concurrency=2)
+    cities = ["Praha", "Brno", "Atlantida", "Zlín"]
+    assert await engine.warm_up(cities) == 3
+    assert weather._fetch_current_batch.call_count == 2
+
+    results = await engine.run_cycle(cities)
+    assert len(results) == 3
+    assert weather._fetch_current_batch.call_count == 2
+
+
+def test_startup_report_measures_phases():
+    from monitoring.startup import StartupReport
+    from api_clients.metrics import metrics
+    report = StartupReport(started=time.perf_counter() - 0.5)
+    report.mark("import knihoven")
+    report.mark("inicializace")
+    report.finish()
+
+    assert list(report.phases) == ["import knihoven", "inicializace"]
+    assert report.phases["import knihoven"] >= 0.5
+    assert report.total == pytest.approx(sum(report.phases.values()))
+    assert "inicializace" in report.summary()
+    assert 'startup_phase_seconds{phase="inicializace"}' in metrics.render_prometheus()
+
+
+def test_importing_main_has_no_filesystem_side_effects(tmp_path):
+    """Import main (testy, benchmarky) nevytvoří žádný soubor - stav a cache až init_services."""
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root}
+    for name in ("BOT_STATE_FILE", "BOT_COORDINATION_FILE", "GEOCODE_CACHE_FILE",
+                 "HISTORICAL_STORE_FILE", "CLIMATOLOGY_DIR", "METRICS_FILE"):
+        env.pop(name, None)  # výchozí relativní cesty - do tmp_path
+    subprocess.run([sys.executable, "-c", "import main"], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []